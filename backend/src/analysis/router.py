@@ -0,0 +1,92 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.responses import StreamingResponse
+from typing import AsyncIterator, Dict, List
+import json
+import logging
+import chess
+from src.auth.dependencies import get_current_user
+from src.core.config import settings
+from src.utils.chess_engine import get_adaptive_stats, stream_analysis
+from src.utils.engine_pool import EnginePoolError
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter()
+
+
+def _event(name: str, data: object) -> str:
+    """Format a server-sent event."""
+    return f"event: {name}\ndata: {json.dumps(data)}\n\n"
+
+
+@router.get("/stream")
+async def stream_position_analysis(
+    fen: str = Query(..., description="FEN notation of the position"),
+    depth: int = Query(settings.ANALYSIS_DEFAULT_DEPTH, ge=1, le=40, description="Maximum analysis depth"),
+    multipv: int = Query(3, ge=1, le=5, description="Number of principal variations"),
+    time_limit: float = Query(
+        settings.ANALYSIS_DEFAULT_TIME_SECONDS,
+        gt=0,
+        le=settings.ANALYSIS_STREAM_MAX_SECONDS,
+        description="Time limit in seconds"
+    ),
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    Stream an engine analysis as server-sent events.
+    
+    An "info" event carrying the current lines is sent each time the engine
+    completes a depth, followed by a "done" event with the final lines, or
+    an "error" event if the analysis fails. The search is stopped and its
+    engine released as soon as the client disconnects.
+    Requires authentication, since each stream holds an engine.
+    """
+    try:
+        chess.Board(fen)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Invalid FEN: {e}"
+        )
+    
+    async def events() -> AsyncIterator[str]:
+        results: List[dict] = []
+        updates = stream_analysis(fen, depth, multipv, time_limit)
+        
+        try:
+            async for results in updates:
+                yield _event("info", results)
+            
+            yield _event("done", results)
+        except EnginePoolError as e:
+            logger.warning(f"Chess engine not available for streamed analysis: {e}")
+            yield _event("error", {"detail": "Chess engine is busy, try again later"})
+        except Exception as e:
+            logger.error(f"Error streaming analysis: {e}")
+            yield _event("error", {"detail": "Analysis failed"})
+        finally:
+            # Also runs when the client disconnects; stops the search
+            await updates.aclose()
+    
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@router.get("/stats", response_model=Dict[str, float])
+async def get_analysis_stats(
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    Get counters of adaptive analyses and the engine time they saved.
+    Requires admin privileges.
+    """
+    if not current_user.get("is_admin", False):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not authorized to view analysis statistics"
+        )
+    
+    return get_adaptive_stats()
@@ -1,16 +1,76 @@
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from jose import jwt, JWTError
-from typing import Dict, Optional
+from typing import Any, Dict, Optional
+import asyncio
 import logging
+import time
 from src.core.config import settings
-from src.db.client import get_supabase_client
+from src.db.client import get_supabase_client, get_query_executor
+from src.utils.cache import LRUCache
 
 logger = logging.getLogger(__name__)
 
 # Security scheme for JWT authentication
 security = HTTPBearer()
 
+# Same scheme for endpoints where signing in is optional
+optional_security = HTTPBearer(auto_error=False)
+
+# Verified users keyed by token, bounded by the token's own expiry
+_token_cache = LRUCache(
+    maxsize=settings.AUTH_CACHE_SIZE,
+    ttl=settings.AUTH_CACHE_TTL_SECONDS
+)
+
+
+def decode_access_token(token: str) -> Dict[str, Any]:
+    """
+    Verify a Supabase access token locally and return its claims.
+    
+    Args:
+        token: Encoded JWT
+        
+    Returns:
+        Decoded token claims
+        
+    Raises:
+        JWTError: If the signature, expiry or audience is invalid
+    """
+    return jwt.decode(
+        token,
+        settings.JWT_SECRET.get_secret_value(),
+        algorithms=[settings.JWT_ALGORITHM],
+        audience=settings.JWT_AUDIENCE or None,
+        options={"verify_aud": bool(settings.JWT_AUDIENCE)}
+    )
+
+
+async def _verify_with_supabase(token: str) -> Optional[Dict]:
+    """
+    Verify a token with Supabase Auth.
+    
+    Used only when no JWT secret is configured.
+    
+    Args:
+        token: Encoded JWT
+        
+    Returns:
+        User data if the token is valid, None otherwise
+    """
+    client = get_supabase_client()
+    loop = asyncio.get_running_loop()
+    response = await loop.run_in_executor(get_query_executor(), client.auth.get_user, token)
+    
+    if not response.user:
+        return None
+    
+    return {
+        "id": response.user.id,
+        "email": response.user.email,
+        "is_admin": is_admin_user(response.user.id),
+    }
+
 
 async def get_current_user(
     credentials: HTTPAuthorizationCredentials = Depends(security)
@@ -18,6 +78,9 @@ async def get_current_user(
     """
     Dependency to get the current authenticated user from the JWT token.
     
+    Tokens are verified locally with settings.JWT_SECRET and the result is
+    cached until the token expires (at most settings.AUTH_CACHE_TTL_SECONDS).
+    
     Args:
         credentials: HTTP Authorization credentials
         
@@ -27,35 +90,70 @@ async def get_current_user(
     Raises:
         HTTPException: If authentication fails
     """
+    # Get token from credentials
+    token = credentials.credentials
+    
+    user = _token_cache.get(token)
+    
+    if user is not None:
+        return user
+    
+    ttl = settings.AUTH_CACHE_TTL_SECONDS
+    
     try:
-        # Get token from credentials
-        token = credentials.credentials
+        if settings.JWT_SECRET.get_secret_value():
+            claims = decode_access_token(token)
         
-        # Verify token with Supabase
-        client = get_supabase_client()
-        response = client.auth.get_user(token)
+            user = {
+                "id": claims["sub"],
+                "email": claims.get("email"),
+                "is_admin": is_admin_user(claims["sub"]),
+                # Add other user data as needed
+            }
         
-        if not response.user:
-            raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="Invalid authentication credentials",
-                headers={"WWW-Authenticate": "Bearer"},
-            )
-        
-        # Return user data
-        return {
-            "id": response.user.id,
-            "email": response.user.email,
-            "is_admin": is_admin_user(response.user.id),
-            # Add other user data as needed
-        }
+            if "exp" in claims:
+                ttl = min(ttl, claims["exp"] - time.time())
+        else:
+            user = await _verify_with_supabase(token)
+    except (JWTError, KeyError) as e:
+        logger.info(f"Rejected access token: {e}")
+        user = None
     except Exception as e:
         logger.error(f"Authentication error: {e}")
+        user = None
+    
+    if user is None:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid authentication credentials",
             headers={"WWW-Authenticate": "Bearer"},
         )
+    
+    if ttl > 0:
+        _token_cache.set(token, user, ttl=ttl)
+    
+    return user
+
+
+async def get_optional_user(
+    credentials: Optional[HTTPAuthorizationCredentials] = Depends(optional_security)
+) -> Optional[Dict]:
+    """
+    Dependency to get the current user if a token is sent.
+    
+    Args:
+        credentials: HTTP Authorization credentials, if any
+        
+    Returns:
+        User data from the JWT token, or None for anonymous requests
+        
+    Raises:
+        HTTPException: If a token is sent and authentication fails
+    """
+    if credentials is None:
+        return None
+    
+    return await get_current_user(credentials)
 
 
 def is_admin_user(user_id: str) -> bool:
@@ -1,6 +1,7 @@
 from pydantic import Field, SecretStr
 from pydantic_settings import BaseSettings
-from typing import List
+from typing import List, Literal
+import os
 
 
 class Settings(BaseSettings):
@@ -29,6 +30,18 @@ class Settings(BaseSettings):
         description="Supabase service key"
     )
     
+    # Database settings
+    DB_POOL_SIZE: int = Field(
+        default=10,
+        ge=1,
+        description="Maximum number of Supabase queries executed concurrently"
+    )
+    DB_QUERY_TIMEOUT_SECONDS: float = Field(
+        default=10.0,
+        gt=0,
+        description="Default timeout for a single Supabase query in seconds"
+    )
+    
     # JWT settings
     JWT_SECRET: SecretStr = Field(
         default="",
@@ -36,15 +49,318 @@ class Settings(BaseSettings):
     )
     JWT_ALGORITHM: str = "HS256"
     JWT_EXPIRATION_MINUTES: int = 60 * 24 * 7  # 1 week
+    JWT_AUDIENCE: str = Field(
+        default="authenticated",
+        description="Expected audience of Supabase access tokens (empty to skip the check)"
+    )
+    
+    # Auth cache settings
+    AUTH_CACHE_SIZE: int = Field(
+        default=10000,
+        ge=0,
+        description="Maximum number of verified tokens kept in memory"
+    )
+    AUTH_CACHE_TTL_SECONDS: float = Field(
+        default=300.0,
+        gt=0,
+        description="Maximum time a verified token is trusted without re-verification"
+    )
     
     # Puzzle settings
     DEFAULT_PUZZLE_LIMIT: int = 10
     MAX_PUZZLE_LIMIT: int = 100
+    PUZZLE_COUNT_MODE: Literal["exact", "planned", "estimated"] = Field(
+        default="exact",
+        description="How puzzle list totals are counted (PostgREST count mode)"
+    )
+    PUZZLE_COUNT_CACHE_TTL_SECONDS: float = Field(
+        default=60.0,
+        ge=0,
+        description="How long puzzle list totals are reused before being recounted (0 to disable)"
+    )
+    
+    # Puzzle cache settings
+    PUZZLE_CACHE_SIZE: int = Field(
+        default=5000,
+        ge=0,
+        description="Maximum number of puzzles kept in the in-process cache"
+    )
+    PUZZLE_CACHE_TTL_SECONDS: float = Field(
+        default=600.0,
+        gt=0,
+        description="Maximum age of a cached puzzle (bounds staleness across workers)"
+    )
+    
+    PUZZLE_BATCH_WINDOW_MS: float = Field(
+        default=2.0,
+        ge=0,
+        description="Time puzzle lookups are collected before being fetched in one query"
+    )
+    
+    # Puzzle catalog settings
+    PUZZLE_CATALOG_ENABLED: bool = Field(
+        default=False,
+        description="Answer filtered puzzle listings from an in-process columnar catalog"
+    )
+    PUZZLE_CATALOG_REFRESH_SECONDS: int = Field(
+        default=600,
+        gt=0,
+        description="Seconds before the puzzle catalog is reloaded to pick up other workers' writes"
+    )
+    PUZZLE_SNAPSHOT_PATH: str = Field(
+        default="",
+        description="Catalog snapshot file mapped at startup instead of loading from the database "
+                    "(build with python -m src.puzzles.snapshot build)"
+    )
+    
+    # Chess engine settings
+    STOCKFISH_PATH: str = Field(
+        default="stockfish",
+        description="Path to the UCI engine executable"
+    )
+    ENGINE_POOL_SIZE: int = Field(
+        default_factory=lambda: os.cpu_count() or 1,
+        ge=1,
+        description="Number of engine processes in the pool (defaults to CPU count)"
+    )
+    ENGINE_MAX_QUEUE: int = Field(
+        default=64,
+        ge=0,
+        description="Maximum number of requests waiting for a free engine"
+    )
+    ENGINE_QUEUE_TIMEOUT_SECONDS: float = Field(
+        default=5.0,
+        gt=0,
+        description="Maximum time a background analysis request waits for a free engine"
+    )
+    ENGINE_INTERACTIVE_BUDGET_SECONDS: float = Field(
+        default=1.0,
+        gt=0,
+        description="Maximum time interactive move feedback waits for a free engine"
+    )
+    ENGINE_BATCH_TIMEOUT_SECONDS: float = Field(
+        default=600.0,
+        gt=0,
+        description="Maximum time a batch job (puzzle generation, solution trees) waits for a free engine"
+    )
+    ENGINE_BACKGROUND_LIMIT: int = Field(
+        default=0,
+        ge=0,
+        description="Maximum engines held by background analysis at once (0 for all but one)"
+    )
+    ENGINE_BATCH_LIMIT: int = Field(
+        default=0,
+        ge=0,
+        description="Maximum engines held by batch jobs at once (0 for all but one)"
+    )
+    ENGINE_NON_INTERACTIVE_LIMIT: int = Field(
+        default=0,
+        ge=0,
+        description="Maximum engines held by background and batch work together (0 for all but one)"
+    )
+    ENGINE_WARMUP_COUNT: int = Field(
+        default=1,
+        ge=0,
+        description="Number of engines started at application startup"
+    )
+    ENGINE_PING_INTERVAL_SECONDS: float = Field(
+        default=30.0,
+        gt=0,
+        description="Idle time after which an engine is pinged before use; also the supervision period"
+    )
+    ENGINE_PING_TIMEOUT_SECONDS: float = Field(
+        default=2.0,
+        gt=0,
+        description="Time an engine has to answer a liveness ping before it is replaced"
+    )
+    ENGINE_START_TIMEOUT_SECONDS: float = Field(
+        default=10.0,
+        gt=0,
+        description="Time a new engine has to finish its UCI handshake and accept options"
+    )
+    ENGINE_CALL_TIMEOUT_SECONDS: float = Field(
+        default=120.0,
+        gt=0,
+        description="Wall-clock timeout for engine searches without a time limit"
+    )
+    ENGINE_TIMEOUT_GRACE_SECONDS: float = Field(
+        default=2.0,
+        ge=0,
+        description="Time allowed beyond a search's time limit before the engine is considered wedged"
+    )
+    
+    # Engine resource profile, applied to every engine in the pool
+    ENGINE_THREADS: int = Field(
+        default=1,
+        ge=1,
+        description="Search threads per engine process"
+    )
+    ENGINE_HASH_MB: int = Field(
+        default=16,
+        ge=1,
+        description="Transposition table size per engine process in MB"
+    )
+    ENGINE_SKILL_LEVEL: int = Field(
+        default=20,
+        ge=0,
+        le=20,
+        description="Engine skill level (20 for full strength)"
+    )
+    ENGINE_MAX_NODES: int = Field(
+        default=0,
+        ge=0,
+        description="Node limit applied to every search (0 for none)"
+    )
+    
+    # Search budgets per endpoint; a search stops at the first bound reached.
+    # Time limits are always set, since they also bound the hard timeouts;
+    # depth and node limits marked below may be 0 for none
+    MOVE_EVALUATION_TIME_SECONDS: float = Field(
+        default=0.1,
+        gt=0,
+        description="Time limit for evaluating a played move"
+    )
+    MOVE_EVALUATION_DEPTH: int = Field(
+        default=0,
+        ge=0,
+        description="Depth limit for evaluating a played move (0 for none)"
+    )
+    MOVE_EVALUATION_NODES: int = Field(
+        default=0,
+        ge=0,
+        description="Node limit for evaluating a played move (0 for none)"
+    )
+    ANALYSIS_DEFAULT_DEPTH: int = Field(
+        default=20,
+        ge=1,
+        description="Default depth of a streamed analysis"
+    )
+    ANALYSIS_DEFAULT_TIME_SECONDS: float = Field(
+        default=10.0,
+        gt=0,
+        description="Default time limit of a streamed analysis"
+    )
+    ANALYSIS_NODES: int = Field(
+        default=0,
+        ge=0,
+        description="Node limit for position analysis (0 for none)"
+    )
+    GENERATION_DEPTH: int = Field(
+        default=20,
+        ge=1,
+        description="Depth of the search choosing a generated puzzle's first move"
+    )
+    GENERATION_TIME_SECONDS: float = Field(
+        default=1.0,
+        gt=0,
+        description="Time limit of the searches checking a generated puzzle's continuation"
+    )
+    GENERATION_NODES: int = Field(
+        default=0,
+        ge=0,
+        description="Node limit for puzzle generation searches (0 for none)"
+    )
+    
+    # Adaptive analysis: stop once the best move has settled
+    ADAPTIVE_ANALYSIS_ENABLED: bool = Field(
+        default=True,
+        description="Stop analysis and generation searches early once the best move is stable"
+    )
+    ADAPTIVE_STABLE_DEPTHS: int = Field(
+        default=4,
+        ge=2,
+        description="Consecutive depths with the same best move and score needed to stop"
+    )
+    ADAPTIVE_MIN_DEPTH: int = Field(
+        default=10,
+        ge=1,
+        description="Depth before which a stable search is not stopped, unless a mate is found"
+    )
+    ADAPTIVE_SCORE_MARGIN: int = Field(
+        default=15,
+        ge=0,
+        description="Largest change in centipawns between depths for the score to count as stable"
+    )
+    
+    # Puzzle generation pre-filter
+    PREFILTER_ENABLED: bool = Field(
+        default=True,
+        description="Reject quiet candidate positions before engine analysis during puzzle generation"
+    )
+    PREFILTER_MIN_GAIN: int = Field(
+        default=200,
+        ge=0,
+        description="Material in centipawns a tactic must win for a position to pass the pre-filter"
+    )
+    PREFILTER_CAPTURE_DEPTH: int = Field(
+        default=4,
+        ge=1,
+        description="Maximum number of captures in the pre-filter's capture sequence search"
+    )
+    
+    # Analysis cache settings
+    ANALYSIS_CACHE_SIZE: int = Field(
+        default=10000,
+        ge=0,
+        description="Maximum number of analysed positions kept in memory"
+    )
+    ANALYSIS_CACHE_DB_PATH: str = Field(
+        default="",
+        description="SQLite file for the persistent analysis cache (empty to disable)"
+    )
+    
+    # Streaming analysis settings
+    ANALYSIS_STREAM_MAX_SECONDS: float = Field(
+        default=30.0,
+        gt=0,
+        description="Maximum time limit a client may request for a streamed analysis"
+    )
     
     # Spaced repetition settings
     MIN_INTERVAL_DAYS: int = 1
     MAX_INTERVAL_DAYS: int = 365
     DEFAULT_EASE_FACTOR: float = 2.5
+    DUE_QUEUE_MAX_USERS: int = Field(
+        default=10000,
+        ge=0,
+        description="Maximum number of users whose due-review queue is cached in process"
+    )
+    DUE_QUEUE_TTL_SECONDS: int = Field(
+        default=300,
+        gt=0,
+        description="Seconds before a cached due-review queue is reloaded from the database"
+    )
+    DUE_QUEUE_LOAD_LIMIT: int = Field(
+        default=500,
+        ge=1,
+        description="Maximum number of scheduled reviews loaded per user"
+    )
+    
+    # Recommendation settings
+    PUZZLE_INDEX_REFRESH_SECONDS: int = Field(
+        default=600,
+        gt=0,
+        description="Seconds before the in-memory puzzle difficulty index is reloaded"
+    )
+    DEFAULT_USER_RATING: float = Field(
+        default=1500.0,
+        description="Rating assumed for users without any attempts"
+    )
+    RATING_K_FACTOR: float = Field(
+        default=32.0,
+        gt=0,
+        description="Elo K-factor used to update a user's estimated rating after each attempt"
+    )
+    USER_PROFILE_CACHE_SIZE: int = Field(
+        default=10000,
+        ge=0,
+        description="Maximum number of user rating profiles cached in process"
+    )
+    USER_PROFILE_TTL_SECONDS: int = Field(
+        default=600,
+        gt=0,
+        description="Seconds before a cached user rating profile is rebuilt from the database"
+    )
     
     class Config:
         env_file = ".env"
@@ -1,13 +1,20 @@
 from supabase import create_client, Client
+from supabase.lib.client_options import ClientOptions
 from src.core.config import settings
+from src.core.exceptions import DatabaseException
+import asyncio
 import logging
-from typing import Optional
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Optional
 
 logger = logging.getLogger(__name__)
 
 # Global Supabase client instance
 _supabase_client: Optional[Client] = None
 
+# Bounded worker pool the blocking Supabase calls are offloaded to
+_query_executor: Optional[ThreadPoolExecutor] = None
+
 
 def get_supabase_client() -> Client:
     """
@@ -25,28 +32,74 @@ def get_supabase_client() -> Client:
             logger.error("Supabase URL or key not set")
             raise ValueError("Supabase URL and key must be set")
         
+        # The client keeps a single HTTP session, so every worker thread
+        # reuses the same keep-alive connection pool
         _supabase_client = create_client(
             settings.SUPABASE_URL,
-            settings.SUPABASE_KEY.get_secret_value()
+            settings.SUPABASE_KEY.get_secret_value(),
+            options=ClientOptions(
+                postgrest_client_timeout=settings.DB_QUERY_TIMEOUT_SECONDS
+            )
         )
     
     return _supabase_client
 
 
+def get_query_executor() -> ThreadPoolExecutor:
+    """
+    Get or initialize the thread pool used to run Supabase queries.
+    
+    Returns:
+        ThreadPoolExecutor: Executor sized by settings.DB_POOL_SIZE
+    """
+    global _query_executor
+    
+    if _query_executor is None:
+        logger.info(f"Initializing database query pool ({settings.DB_POOL_SIZE} workers)")
+        _query_executor = ThreadPoolExecutor(
+            max_workers=settings.DB_POOL_SIZE,
+            thread_name_prefix="supabase-query"
+        )
+    
+    return _query_executor
+
+
+def close_query_executor() -> None:
+    """Shut down the database query pool."""
+    global _query_executor
+    
+    if _query_executor is not None:
+        _query_executor.shutdown(wait=False, cancel_futures=True)
+        _query_executor = None
+        logger.info("Database query pool closed")
+
+
 async def execute_query(table: str, query_fn, **kwargs):
     """
     Execute a query against Supabase.
     
+    The query is built on the event loop but executed on the bounded
+    database pool, so a slow round trip never blocks other requests.
+    
     Args:
         table: Table name
         query_fn: Function to apply to the query (e.g., select, insert)
-        **kwargs: Additional query parameters
+        **kwargs: Additional query parameters (filters, or_filter, order,
+            limit, offset); ``timeout`` overrides
+            settings.DB_QUERY_TIMEOUT_SECONDS for this query and
+            ``return_count`` returns the row count requested via
+            ``select(..., count=...)`` alongside the data
         
     Returns:
-        Query result
+        Query result, or a tuple of (result, count) if return_count is set
+        
+    Raises:
+        DatabaseException: If the query times out
     """
     client = get_supabase_client()
     query = client.table(table)
+    timeout = kwargs.pop("timeout", None) or settings.DB_QUERY_TIMEOUT_SECONDS
+    return_count = kwargs.pop("return_count", False)
     
     # Apply the query function (e.g., select, insert)
     query = query_fn(query)
@@ -58,18 +111,78 @@ async def execute_query(table: str, query_fn, **kwargs):
                 if len(filter_tuple) == 3:
                     column, operator, filter_value = filter_tuple
                     query = query.filter(column, operator, filter_value)
+        elif key == "or_filter":
+            query = query.or_(value)
         elif key == "order":
-            query = query.order(value[0], desc=value[1] if len(value) > 1 else False)
+            # Either [column, desc] or a list of [column, desc] pairs
+            orderings = value if value and isinstance(value[0], (list, tuple)) else [value]
+            for ordering in orderings:
+                query = query.order(ordering[0], desc=ordering[1] if len(ordering) > 1 else False)
         elif key == "limit":
             query = query.limit(value)
         elif key == "offset":
             query = query.offset(value)
     
-    # Execute the query
-    response = query.execute()
+    response = await _execute(query, table, timeout)
+    
+    if return_count:
+        return response.data, response.count
+    
+    return response.data
+
+
+async def execute_rpc(function: str, params: Dict[str, Any], timeout: Optional[float] = None):
+    """
+    Call a Postgres function through Supabase.
+    
+    Args:
+        function: Function name
+        params: Function arguments
+        timeout: Overrides settings.DB_QUERY_TIMEOUT_SECONDS for this call
+        
+    Returns:
+        Function result
+        
+    Raises:
+        DatabaseException: If the call times out
+    """
+    client = get_supabase_client()
+    query = client.rpc(function, params)
+    
+    response = await _execute(query, function, timeout or settings.DB_QUERY_TIMEOUT_SECONDS)
+    
+    return response.data
+
+
+async def _execute(query, name: str, timeout: float):
+    """
+    Execute a built Supabase request on the database pool.
+    
+    Args:
+        query: Request builder
+        name: Table or function name, for error messages
+        timeout: Timeout in seconds
+        
+    Returns:
+        Supabase response
+        
+    Raises:
+        DatabaseException: If the request times out
+    """
+    # Execute the query off the event loop
+    loop = asyncio.get_running_loop()
+    
+    try:
+        response = await asyncio.wait_for(
+            loop.run_in_executor(get_query_executor(), query.execute),
+            timeout=timeout
+        )
+    except asyncio.TimeoutError:
+        logger.error(f"Supabase query on {name} timed out after {timeout}s")
+        raise DatabaseException(f"Query on {name} timed out")
     
     if hasattr(response, "error") and response.error:
         logger.error(f"Supabase query error: {response.error}")
         raise Exception(f"Supabase query error: {response.error}")
     
-    return response.data 
\ No newline at end of file
+    return response
\ No newline at end of file
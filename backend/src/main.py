@@ -5,12 +5,16 @@ import logging
 from typing import AsyncGenerator
 
 # Import routers
+from src.analysis.router import router as analysis_router
 from src.auth.router import router as auth_router
 from src.puzzles.router import router as puzzles_router
 from src.user_progress.router import router as user_progress_router
 
 # Import config
 from src.core.config import settings
+from src.db.client import close_query_executor
+from src.puzzles.catalog import get_puzzle_catalog
+from src.utils.chess_engine import close_engine, start_engines
 
 # Configure logging
 logging.basicConfig(
@@ -28,12 +32,25 @@ async def lifespan(app: FastAPI) -> AsyncGenerator[None, None]:
     # Startup: Initialize connections and resources
     logger.info("Starting up Chess Puzzle API")
     # Initialize Supabase client or other resources here
+    if settings.PUZZLE_CATALOG_ENABLED:
+        try:
+            await get_puzzle_catalog()
+        except Exception as e:
+            # The load is retried by the first listing request
+            logger.error(f"Error loading puzzle catalog: {e}")
+    
+    try:
+        await start_engines()
+    except Exception as e:
+        # Engines are still started on demand by the first request
+        logger.error(f"Error warming up chess engines: {e}")
     
     yield
     
     # Shutdown: Close connections and clean up resources
     logger.info("Shutting down Chess Puzzle API")
-    # Close connections and clean up resources here
+    await close_engine()
+    close_query_executor()
 
 # Initialize FastAPI app
 app = FastAPI(
@@ -56,6 +73,7 @@ app.add_middleware(
 app.include_router(auth_router, prefix="/auth", tags=["Authentication"])
 app.include_router(puzzles_router, prefix="/puzzles", tags=["Puzzles"])
 app.include_router(user_progress_router, prefix="/user-progress", tags=["User Progress"])
+app.include_router(analysis_router, prefix="/analysis", tags=["Analysis"])
 
 @app.get("/", tags=["Health"])
 async def root():
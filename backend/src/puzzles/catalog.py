@@ -0,0 +1,328 @@
+import asyncio
+import logging
+import time
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+import numpy as np
+from src.core.config import settings
+from src.puzzles.index import IndexRow, ThemeRegistry, load_puzzle_rows
+from src.puzzles.snapshot import NO_DIFFICULTY, PuzzleSnapshot, SnapshotError
+from src.utils.singleflight import SingleFlight
+
+logger = logging.getLogger(__name__)
+
+
+class PuzzleCatalog:
+    """
+    Columnar in-memory copy of the puzzle metadata used for filtering.
+    
+    IDs, difficulties and theme masks are stored in NumPy columns, so a
+    listing filter is a handful of vectorized comparisons over the whole
+    catalog. Writes update rows in place or append to the columns; deleted
+    rows are only marked dead, and the (difficulty, id) ordering is rebuilt
+    lazily on the next query after a write.
+    
+    Columns may be read-only views of a memory-mapped snapshot; they are
+    copied on the first write.
+    """
+    
+    def __init__(
+        self,
+        ids: np.ndarray,
+        difficulties: np.ndarray,
+        masks: np.ndarray,
+        themes: ThemeRegistry,
+        order: Optional[np.ndarray] = None
+    ):
+        """
+        Args:
+            ids: Puzzle IDs in ascending order
+            difficulties: Difficulties, NO_DIFFICULTY where unset
+            masks: Theme masks
+            themes: Registry the theme masks were built with
+            order: Rows in (difficulty, id) order, if already known
+        """
+        self.themes = themes
+        self._ids = ids
+        self._difficulties = difficulties
+        self._masks = masks
+        self._size = self._base = len(ids)
+        self._live = np.ones(self._size, dtype=bool)
+        self._count = self._size
+        self._order = order
+        
+        # Rows appended after construction; the first _base rows are found by bisection
+        self._appended: Dict[int, int] = {}
+    
+    @classmethod
+    def from_rows(cls, rows: Iterable[IndexRow]) -> "PuzzleCatalog":
+        """Build a catalog from (id, difficulty, themes) rows."""
+        themes = ThemeRegistry()
+        rows = sorted(rows, key=lambda row: row[0])
+        
+        return cls(
+            np.fromiter((row[0] for row in rows), dtype=np.int64, count=len(rows)),
+            np.fromiter(
+                (NO_DIFFICULTY if row[1] is None else row[1] for row in rows),
+                dtype=np.int32,
+                count=len(rows)
+            ),
+            np.fromiter((themes.mask(row[2]) for row in rows), dtype=np.uint64, count=len(rows)),
+            themes
+        )
+    
+    @classmethod
+    def from_snapshot(cls, snapshot: PuzzleSnapshot) -> "PuzzleCatalog":
+        """Build a catalog sharing the columns of a mapped snapshot."""
+        return cls(
+            snapshot.ids,
+            snapshot.difficulties,
+            snapshot.masks,
+            ThemeRegistry(snapshot.theme_names),
+            order=snapshot.order
+        )
+    
+    def __len__(self) -> int:
+        return self._count
+    
+    def _find(self, puzzle_id: int) -> Optional[int]:
+        row = self._appended.get(puzzle_id)
+        
+        if row is None:
+            row = int(np.searchsorted(self._ids[:self._base], puzzle_id))
+            
+            if row >= self._base or self._ids[row] != puzzle_id:
+                return None
+        
+        return row if self._live[row] else None
+    
+    def _ensure_capacity(self, size: int) -> None:
+        if self._ids.flags.writeable and size <= len(self._ids):
+            return
+        
+        capacity = max(16, 2 * size) if size > len(self._ids) else len(self._ids)
+        
+        for name in ("_ids", "_difficulties", "_masks", "_live"):
+            column = getattr(self, name)
+            grown = np.zeros(capacity, dtype=column.dtype)
+            grown[:self._size] = column[:self._size]
+            setattr(self, name, grown)
+    
+    def upsert(self, puzzle_id: int, difficulty: Optional[int], themes: Optional[List[str]] = None) -> None:
+        """
+        Add a puzzle or replace its metadata.
+        
+        Args:
+            puzzle_id: Puzzle ID
+            difficulty: Puzzle difficulty
+            themes: Puzzle themes
+        """
+        row = self._find(puzzle_id)
+        
+        if row is None:
+            self._ensure_capacity(self._size + 1)
+            row = self._size
+            self._size += 1
+            self._count += 1
+            self._appended[puzzle_id] = row
+            self._ids[row] = puzzle_id
+            self._live[row] = True
+        else:
+            self._ensure_capacity(self._size)
+        
+        self._difficulties[row] = NO_DIFFICULTY if difficulty is None else difficulty
+        self._masks[row] = self.themes.mask(themes)
+        self._order = None
+    
+    def remove(self, puzzle_id: int) -> None:
+        """Remove a puzzle if present."""
+        row = self._find(puzzle_id)
+        
+        if row is not None:
+            self._appended.pop(puzzle_id, None)
+            self._live[row] = False
+            self._count -= 1
+            self._order = None
+    
+    def _sorted_rows(self) -> np.ndarray:
+        if self._order is None:
+            live = np.flatnonzero(self._live[:self._size])
+            keys = (self._ids[live], self._difficulties[live])
+            self._order = live[np.lexsort(keys)]
+        
+        return self._order
+    
+    def query(
+        self,
+        min_difficulty: Optional[int] = None,
+        max_difficulty: Optional[int] = None,
+        themes: Optional[List[str]] = None,
+        offset: int = 0,
+        limit: Optional[int] = None
+    ) -> Optional[Tuple[List[int], int]]:
+        """
+        Find the puzzles matching a listing filter, ordered by (difficulty, id).
+        
+        Args:
+            min_difficulty: Minimum difficulty (inclusive)
+            max_difficulty: Maximum difficulty (inclusive)
+            themes: Themes every puzzle must have
+            offset: Number of matches to skip
+            limit: Maximum number of IDs returned
+            
+        Returns:
+            Tuple of (page of puzzle IDs, total matches), or None if the
+            filter cannot be answered from the catalog
+        """
+        rows = self._sorted_rows()
+        keep = np.ones(len(rows), dtype=bool)
+        
+        if themes:
+            theme_mask = self.themes.lookup(themes)
+            
+            if theme_mask is None:
+                # A theme without a bit matches nothing, unless it was dropped for lack of bits
+                return None if self.themes.overflowed else ([], 0)
+            
+            theme_mask = np.uint64(theme_mask)
+            keep &= (self._masks[rows] & theme_mask) == theme_mask
+        
+        if min_difficulty is not None or max_difficulty is not None:
+            difficulties = self._difficulties[rows]
+            keep &= difficulties != NO_DIFFICULTY
+            
+            if min_difficulty is not None:
+                keep &= difficulties >= min_difficulty
+            
+            if max_difficulty is not None:
+                keep &= difficulties <= max_difficulty
+        
+        matches = rows[keep]
+        end = None if limit is None else offset + limit
+        
+        return self._ids[matches[offset:end]].tolist(), len(matches)
+
+
+# Global puzzle catalog and when it was loaded
+_catalog: Optional[PuzzleCatalog] = None
+_loaded_at = 0.0
+_catalog_flight = SingleFlight()
+
+# Background reload, and the writes made while a load is in flight, which
+# are replayed onto the new catalog
+_refresh_task: Optional[asyncio.Task] = None
+_pending_writes: Optional[List[Callable[[PuzzleCatalog], None]]] = None
+
+# (mtime, size) of the snapshot file the catalog was mapped from, if any
+_snapshot_stamp: Optional[Tuple[int, int]] = None
+
+
+def _stat_snapshot() -> Optional[Tuple[int, int]]:
+    """Get the (mtime, size) of the configured snapshot file, or None if there is none."""
+    if not settings.PUZZLE_SNAPSHOT_PATH:
+        return None
+    
+    try:
+        stat = Path(settings.PUZZLE_SNAPSHOT_PATH).stat()
+    except OSError:
+        return None
+    
+    return stat.st_mtime_ns, stat.st_size
+
+
+async def _load_catalog() -> PuzzleCatalog:
+    global _catalog, _loaded_at, _pending_writes, _snapshot_stamp
+    
+    started = time.monotonic()
+    catalog = None
+    source = "database"
+    stamp = _stat_snapshot()
+    _pending_writes = []
+    
+    try:
+        if stamp is not None:
+            try:
+                catalog = PuzzleCatalog.from_snapshot(PuzzleSnapshot(settings.PUZZLE_SNAPSHOT_PATH))
+                source = settings.PUZZLE_SNAPSHOT_PATH
+            except SnapshotError as e:
+                logger.error(f"Error opening puzzle snapshot, loading from the database: {e}")
+        
+        if catalog is None:
+            catalog = PuzzleCatalog.from_rows(await load_puzzle_rows())
+        
+        for write in _pending_writes:
+            write(catalog)
+    finally:
+        _pending_writes = None
+    
+    _catalog, _loaded_at = catalog, time.monotonic()
+    _snapshot_stamp = stamp if source != "database" else None
+    
+    logger.info(f"Puzzle catalog loaded from {source}: {len(catalog)} puzzles in {_loaded_at - started:.2f}s")
+    return catalog
+
+
+async def _refresh_catalog() -> None:
+    global _loaded_at
+    
+    # Remapping an unchanged snapshot would drop this worker's writes since
+    # it was mapped; keep the live catalog until the snapshot is rebuilt
+    if _snapshot_stamp is not None and _stat_snapshot() == _snapshot_stamp:
+        _loaded_at = time.monotonic()
+        return
+    
+    try:
+        await _catalog_flight.do("catalog", _load_catalog)
+    except Exception as e:
+        # Keep serving the current catalog and retry after another interval
+        _loaded_at = time.monotonic()
+        logger.error(f"Error reloading puzzle catalog: {e}")
+
+
+async def get_puzzle_catalog() -> Optional[PuzzleCatalog]:
+    """
+    Get the puzzle catalog, loading it on first use.
+    
+    The catalog is mapped from settings.PUZZLE_SNAPSHOT_PATH when that file
+    exists and loaded from the database otherwise. It is kept current by
+    the puzzle write functions and reloaded from the same source in the
+    background after settings.PUZZLE_CATALOG_REFRESH_SECONDS, serving the
+    current catalog until the reload finishes. A snapshot is only remapped
+    once the file has changed, so other workers' writes appear when it is
+    rebuilt and this worker's writes are kept until then.
+    
+    Returns:
+        PuzzleCatalog instance, or None if settings.PUZZLE_CATALOG_ENABLED is off
+    """
+    global _refresh_task
+    
+    if not settings.PUZZLE_CATALOG_ENABLED:
+        return None
+    
+    if _catalog is None:
+        return await _catalog_flight.do("catalog", _load_catalog)
+    
+    stale = time.monotonic() - _loaded_at > settings.PUZZLE_CATALOG_REFRESH_SECONDS
+    
+    if stale and (_refresh_task is None or _refresh_task.done()):
+        _refresh_task = asyncio.create_task(_refresh_catalog())
+    
+    return _catalog
+
+
+def catalog_puzzle(puzzle_id: int, difficulty: Optional[int], themes: Optional[List[str]] = None) -> None:
+    """Apply a puzzle write to the catalog if it is loaded."""
+    if _pending_writes is not None:
+        _pending_writes.append(lambda catalog: catalog.upsert(puzzle_id, difficulty, themes))
+    
+    if _catalog is not None:
+        _catalog.upsert(puzzle_id, difficulty, themes)
+
+
+def uncatalog_puzzle(puzzle_id: int) -> None:
+    """Apply a puzzle deletion to the catalog if it is loaded."""
+    if _pending_writes is not None:
+        _pending_writes.append(lambda catalog: catalog.remove(puzzle_id))
+    
+    if _catalog is not None:
+        _catalog.remove(puzzle_id)
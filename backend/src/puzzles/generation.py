@@ -0,0 +1,260 @@
+"""
+Batch puzzle generation.
+
+Streams candidate positions from PGN or FEN files, drops quiet ones with a
+cheap python-chess pre-filter (see src/puzzles/prefilter.py), runs the rest
+through the engine pool with bounded concurrency and stores accepted
+puzzles in bulk.
+
+The job starts its own engine pool of settings.ENGINE_POOL_SIZE engines,
+which the API server's scheduler does not see. By default it runs as
+many tasks as batch work may hold (all engines but one); on a host that
+also serves the API, lower --concurrency or ENGINE_POOL_SIZE.
+
+Usage:
+    python -m src.puzzles.generation games.pgn positions.fen --concurrency 8
+"""
+import argparse
+import asyncio
+import logging
+import time
+from pathlib import Path
+from typing import AsyncIterator, Iterable, Iterator, List, Optional, Union
+import chess
+import chess.pgn
+from src.core.config import settings
+from src.puzzles.prefilter import prefilter_position
+from src.puzzles.schemas import PuzzleCreate, PuzzleGenerationStats
+from src.puzzles.service import create_puzzles
+from src.utils.chess_engine import batch_concurrency, generate_puzzle, close_engine
+
+logger = logging.getLogger(__name__)
+
+# Default number of accepted puzzles written per insert
+DEFAULT_BATCH_SIZE = 100
+
+# Default number of opening plies skipped in each game
+DEFAULT_MIN_PLY = 10
+
+
+def iter_positions(path: Union[str, Path], min_ply: int = DEFAULT_MIN_PLY) -> Iterator[str]:
+    """
+    Stream candidate positions from a file.
+    
+    PGN files (``.pgn``) yield every mainline position from ``min_ply`` on,
+    one game at a time. Any other file is read as one FEN per line, with
+    blank lines and ``#`` comments ignored.
+    
+    Args:
+        path: PGN or FEN file
+        min_ply: Number of opening plies to skip in each PGN game
+        
+    Returns:
+        Iterator of FEN strings
+    """
+    path = Path(path)
+    
+    with path.open(encoding="utf-8", errors="replace") as handle:
+        if path.suffix.lower() != ".pgn":
+            for line in handle:
+                line = line.strip()
+                
+                if line and not line.startswith("#"):
+                    yield line
+            return
+        
+        while True:
+            game = chess.pgn.read_game(handle)
+            
+            if game is None:
+                return
+            
+            board = game.board()
+            
+            for ply, move in enumerate(game.mainline_moves(), start=1):
+                board.push(move)
+                
+                if ply >= min_ply and not board.is_game_over():
+                    yield board.fen()
+
+
+def _prefilter(fen: str, stats: PuzzleGenerationStats) -> bool:
+    """Pre-filter a candidate position, counting the outcome in stats."""
+    try:
+        passed, reason = prefilter_position(chess.Board(fen))
+    except ValueError:
+        passed, reason = False, "invalid_position"
+    
+    stats.prefilter_reasons[reason] = stats.prefilter_reasons.get(reason, 0) + 1
+    
+    if not passed:
+        stats.prefiltered += 1
+    
+    return passed
+
+
+async def _flush(buffer: List[PuzzleCreate], stats: PuzzleGenerationStats, dry_run: bool) -> None:
+    """Insert buffered puzzles, emptying the buffer before the insert is awaited."""
+    puzzles = buffer[:]
+    buffer.clear()
+    
+    if not puzzles or dry_run:
+        return
+    
+    try:
+        created = await create_puzzles(puzzles)
+        stats.inserted += len(created)
+    except Exception as e:
+        logger.error(f"Error inserting {len(puzzles)} generated puzzles: {e}")
+
+
+async def generate_puzzles_from_positions(
+    positions: Union[Iterable[str], AsyncIterator[str]],
+    concurrency: Optional[int] = None,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    dry_run: bool = False,
+    prefilter: Optional[bool] = None
+) -> PuzzleGenerationStats:
+    """
+    Generate puzzles from a stream of candidate positions.
+    
+    Positions are fanned out to ``concurrency`` workers sharing the engine
+    pool; the input is consumed lazily so arbitrarily large collections run
+    in constant memory. Positions rejected by the pre-filter never reach
+    the engine.
+    
+    Args:
+        positions: Iterable of FEN strings
+        concurrency: Number of positions analysed at once, defaults to the batch engine limit
+        batch_size: Number of accepted puzzles written per insert
+        dry_run: Generate puzzles without writing them
+        prefilter: Pre-filter positions, defaults to settings.PREFILTER_ENABLED
+        
+    Returns:
+        Generation statistics
+    """
+    concurrency = concurrency or batch_concurrency()
+    prefilter = settings.PREFILTER_ENABLED if prefilter is None else prefilter
+    queue: asyncio.Queue = asyncio.Queue(maxsize=concurrency * 2)
+    stats = PuzzleGenerationStats()
+    accepted: List[PuzzleCreate] = []
+    started = time.monotonic()
+    
+    async def produce() -> None:
+        if hasattr(positions, "__aiter__"):
+            async for fen in positions:
+                await queue.put(fen)
+        else:
+            for fen in positions:
+                await queue.put(fen)
+        
+        for _ in range(concurrency):
+            await queue.put(None)
+    
+    async def work() -> None:
+        while True:
+            fen = await queue.get()
+            
+            if fen is None:
+                return
+            
+            puzzle = await generate_puzzle(fen) if not prefilter or _prefilter(fen, stats) else None
+            stats.positions += 1
+            
+            if puzzle is not None:
+                stats.accepted += 1
+                accepted.append(PuzzleCreate.model_validate(puzzle))
+                
+                if len(accepted) >= batch_size:
+                    await _flush(accepted, stats, dry_run)
+            
+            if stats.positions % 100 == 0:
+                elapsed = time.monotonic() - started
+                logger.info(
+                    f"Processed {stats.positions} positions, {stats.prefiltered} pre-filtered, "
+                    f"{stats.accepted} accepted ({stats.positions / elapsed:.1f} positions/s)"
+                )
+    
+    await asyncio.gather(produce(), *(work() for _ in range(concurrency)))
+    await _flush(accepted, stats, dry_run)
+    
+    stats.elapsed_seconds = time.monotonic() - started
+    return stats
+
+
+async def generate_puzzles_from_files(
+    paths: Iterable[Union[str, Path]],
+    concurrency: Optional[int] = None,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    min_ply: int = DEFAULT_MIN_PLY,
+    dry_run: bool = False,
+    prefilter: Optional[bool] = None
+) -> PuzzleGenerationStats:
+    """
+    Generate puzzles from PGN/FEN files.
+    
+    Args:
+        paths: PGN or FEN files
+        concurrency: Number of positions analysed at once
+        batch_size: Number of accepted puzzles written per insert
+        min_ply: Number of opening plies to skip in each PGN game
+        dry_run: Generate puzzles without writing them
+        prefilter: Pre-filter positions, defaults to settings.PREFILTER_ENABLED
+        
+    Returns:
+        Generation statistics
+    """
+    def positions() -> Iterator[str]:
+        for path in paths:
+            logger.info(f"Reading candidate positions from {path}")
+            yield from iter_positions(path, min_ply=min_ply)
+    
+    return await generate_puzzles_from_positions(
+        positions(),
+        concurrency=concurrency,
+        batch_size=batch_size,
+        dry_run=dry_run,
+        prefilter=prefilter
+    )
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    """Command line entry point."""
+    parser = argparse.ArgumentParser(description="Generate puzzles from PGN/FEN files")
+    parser.add_argument("paths", nargs="+", help="PGN (.pgn) or FEN (one per line) files")
+    parser.add_argument("--concurrency", type=int, default=batch_concurrency(), help="Positions analysed at once")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE, help="Puzzles written per insert")
+    parser.add_argument("--min-ply", type=int, default=DEFAULT_MIN_PLY, help="Opening plies skipped per game")
+    parser.add_argument("--dry-run", action="store_true", help="Do not write puzzles to the database")
+    parser.add_argument("--no-prefilter", action="store_true", help="Send every position to the engine")
+    args = parser.parse_args(argv)
+    
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+    )
+    
+    async def run() -> PuzzleGenerationStats:
+        try:
+            return await generate_puzzles_from_files(
+                args.paths,
+                concurrency=args.concurrency,
+                batch_size=args.batch_size,
+                min_ply=args.min_ply,
+                dry_run=args.dry_run,
+                prefilter=False if args.no_prefilter else None
+            )
+        finally:
+            await close_engine()
+    
+    stats = asyncio.run(run())
+    logger.info(
+        f"Done: {stats.positions} positions, {stats.prefiltered} pre-filtered "
+        f"({stats.rejection_rate:.0%}), {stats.accepted} accepted, {stats.inserted} inserted "
+        f"in {stats.elapsed_seconds:.1f}s ({stats.positions_per_second:.1f} positions/s)"
+    )
+    logger.info(f"Pre-filter outcomes: {stats.prefilter_reasons}")
+
+
+if __name__ == "__main__":
+    main()
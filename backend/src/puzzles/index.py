@@ -0,0 +1,366 @@
+import asyncio
+import logging
+import time
+from array import array
+from bisect import bisect_left, bisect_right
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+from src.core.config import settings
+from src.db.client import execute_query
+from src.utils.singleflight import SingleFlight
+
+logger = logging.getLogger(__name__)
+
+# Table name
+PUZZLES_TABLE = "puzzles"
+
+# Number of rows fetched per query while loading the index
+LOAD_PAGE_SIZE = 1000
+
+# Theme masks are stored as unsigned 64-bit integers
+MAX_THEMES = 64
+
+# Indexed row: (id, difficulty, themes)
+IndexRow = Tuple[int, Optional[int], Optional[List[str]]]
+
+
+class ThemeRegistry:
+    """
+    Assigns each theme a bit so a puzzle's themes fit in one integer mask.
+    
+    Bits are handed out in order of first appearance. Themes seen after all
+    MAX_THEMES bits are taken are not indexed.
+    """
+    
+    def __init__(self, names: Iterable[str] = ()):
+        """
+        Args:
+            names: Themes already assigned bits, in bit order
+        """
+        self._bits: Dict[str, int] = {}
+        self._overflow = set()
+        self.mask(names)
+    
+    def mask(self, themes: Optional[Iterable[str]]) -> int:
+        """
+        Get the mask of a puzzle's themes, registering new themes.
+        
+        Args:
+            themes: Puzzle themes
+            
+        Returns:
+            Theme bitmask
+        """
+        mask = 0
+        
+        for theme in themes or ():
+            bit = self._bits.get(theme)
+            
+            if bit is None:
+                if len(self._bits) >= MAX_THEMES:
+                    if theme not in self._overflow:
+                        self._overflow.add(theme)
+                        logger.warning(f"Theme '{theme}' not indexed: all {MAX_THEMES} theme bits are in use")
+                    continue
+                
+                bit = self._bits[theme] = len(self._bits)
+            
+            mask |= 1 << bit
+        
+        return mask
+    
+    def lookup(self, themes: Iterable[str]) -> Optional[int]:
+        """
+        Get the mask of a theme filter without registering anything.
+        
+        Args:
+            themes: Required themes
+            
+        Returns:
+            Theme bitmask, or None if some theme is not indexed
+        """
+        mask = 0
+        
+        for theme in themes:
+            bit = self._bits.get(theme)
+            
+            if bit is None:
+                return None
+            
+            mask |= 1 << bit
+        
+        return mask
+    
+    def names(self) -> List[str]:
+        """Get the registered themes in bit order."""
+        return list(self._bits)
+    
+    @property
+    def overflowed(self) -> bool:
+        """Whether some themes could not be given a bit."""
+        return bool(self._overflow)
+    
+    def __len__(self) -> int:
+        return len(self._bits)
+
+
+class PuzzleIndex:
+    """
+    In-memory index of puzzle IDs sorted by difficulty.
+    
+    Difficulties, IDs and theme masks are kept in parallel typed arrays
+    ordered by (difficulty, id), so range and nearest-difficulty lookups are
+    bisections over a few bytes per puzzle. Puzzles without a difficulty are
+    not indexed.
+    """
+    
+    def __init__(self, rows: Iterable[IndexRow] = ()):
+        """
+        Args:
+            rows: Initial (id, difficulty, themes) rows
+        """
+        self.themes = ThemeRegistry()
+        self._difficulties = array("i")
+        self._ids = array("q")
+        self._masks = array("Q")
+        self._difficulty_by_id: Dict[int, int] = {}
+        
+        entries = sorted(
+            (difficulty, puzzle_id, self.themes.mask(themes))
+            for puzzle_id, difficulty, themes in rows
+            if difficulty is not None
+        )
+        
+        for difficulty, puzzle_id, mask in entries:
+            self._difficulties.append(difficulty)
+            self._ids.append(puzzle_id)
+            self._masks.append(mask)
+            self._difficulty_by_id[puzzle_id] = difficulty
+    
+    def __len__(self) -> int:
+        return len(self._ids)
+    
+    def __contains__(self, puzzle_id: int) -> bool:
+        return puzzle_id in self._difficulty_by_id
+    
+    def difficulty(self, puzzle_id: int) -> Optional[int]:
+        """Get the indexed difficulty of a puzzle."""
+        return self._difficulty_by_id.get(puzzle_id)
+    
+    def _position(self, puzzle_id: int, difficulty: int) -> int:
+        lo = bisect_left(self._difficulties, difficulty)
+        hi = bisect_right(self._difficulties, difficulty)
+        return lo + self._ids[lo:hi].index(puzzle_id)
+    
+    def add(self, puzzle_id: int, difficulty: Optional[int], themes: Optional[List[str]] = None) -> None:
+        """
+        Index a new or updated puzzle.
+        
+        Args:
+            puzzle_id: Puzzle ID
+            difficulty: Puzzle difficulty (None removes the puzzle)
+            themes: Puzzle themes
+        """
+        self.remove(puzzle_id)
+        
+        if difficulty is None:
+            return
+        
+        lo = bisect_left(self._difficulties, difficulty)
+        hi = bisect_right(self._difficulties, difficulty)
+        position = bisect_left(self._ids, puzzle_id, lo, hi)
+        
+        self._difficulties.insert(position, difficulty)
+        self._ids.insert(position, puzzle_id)
+        self._masks.insert(position, self.themes.mask(themes))
+        self._difficulty_by_id[puzzle_id] = difficulty
+    
+    def remove(self, puzzle_id: int) -> None:
+        """Remove a puzzle from the index if present."""
+        difficulty = self._difficulty_by_id.pop(puzzle_id, None)
+        
+        if difficulty is None:
+            return
+        
+        position = self._position(puzzle_id, difficulty)
+        del self._difficulties[position]
+        del self._ids[position]
+        del self._masks[position]
+    
+    def range(self, min_difficulty: Optional[int] = None, max_difficulty: Optional[int] = None) -> List[int]:
+        """
+        Get the IDs of puzzles within a difficulty range, easiest first.
+        
+        Args:
+            min_difficulty: Minimum difficulty (inclusive)
+            max_difficulty: Maximum difficulty (inclusive)
+            
+        Returns:
+            Puzzle IDs
+        """
+        lo = 0 if min_difficulty is None else bisect_left(self._difficulties, min_difficulty)
+        hi = len(self._ids) if max_difficulty is None else bisect_right(self._difficulties, max_difficulty)
+        return self._ids[lo:hi].tolist()
+    
+    def nearest(
+        self,
+        difficulty: float,
+        count: int,
+        exclude: Optional[Callable[[int], bool]] = None,
+        theme_mask: int = 0
+    ) -> List[int]:
+        """
+        Get the puzzles closest in difficulty to a target.
+        
+        Walks outwards from the target in both directions, so the cost is
+        proportional to the number of puzzles inspected rather than the
+        size of the index.
+        
+        Args:
+            difficulty: Target difficulty
+            count: Maximum number of puzzles
+            exclude: Predicate for puzzle IDs to skip
+            theme_mask: Themes every returned puzzle must have
+            
+        Returns:
+            Puzzle IDs, closest first
+        """
+        difficulties, ids, masks = self._difficulties, self._ids, self._masks
+        below = bisect_left(difficulties, difficulty) - 1
+        above = below + 1
+        found = []
+        
+        while len(found) < count and (below >= 0 or above < len(ids)):
+            if above >= len(ids) or (below >= 0 and difficulty - difficulties[below] <= difficulties[above] - difficulty):
+                position = below
+                below -= 1
+            else:
+                position = above
+                above += 1
+            
+            if masks[position] & theme_mask != theme_mask:
+                continue
+            
+            if exclude is not None and exclude(ids[position]):
+                continue
+            
+            found.append(ids[position])
+        
+        return found
+
+
+async def load_puzzle_rows() -> List[IndexRow]:
+    """
+    Load (id, difficulty, themes) for every puzzle, paging by ID.
+    
+    Returns:
+        List of index rows in ID order
+    """
+    rows: List[IndexRow] = []
+    last_id = None
+    
+    while True:
+        filters = [] if last_id is None else [("id", "gt", last_id)]
+        page = await execute_query(
+            PUZZLES_TABLE,
+            lambda q: q.select("id,difficulty,themes"),
+            filters=filters,
+            order=["id", False],
+            limit=LOAD_PAGE_SIZE
+        )
+        
+        rows.extend((row["id"], row.get("difficulty"), row.get("themes")) for row in page)
+        
+        if len(page) < LOAD_PAGE_SIZE:
+            return rows
+        
+        last_id = page[-1]["id"]
+
+
+# Global puzzle index and when it was loaded
+_puzzle_index: Optional[PuzzleIndex] = None
+_loaded_at = 0.0
+_index_flight = SingleFlight()
+
+# Background reload, and the writes made while a load is in flight, which
+# are replayed onto the new index
+_refresh_task: Optional[asyncio.Task] = None
+_pending_writes: Optional[List[IndexRow]] = None
+
+
+async def _load_index() -> PuzzleIndex:
+    global _puzzle_index, _loaded_at, _pending_writes
+    
+    started = time.monotonic()
+    _pending_writes = []
+    
+    try:
+        index = PuzzleIndex(await load_puzzle_rows())
+        
+        for puzzle_id, difficulty, themes in _pending_writes:
+            index.add(puzzle_id, difficulty, themes)
+    finally:
+        _pending_writes = None
+    
+    _puzzle_index, _loaded_at = index, time.monotonic()
+    
+    logger.info(f"Puzzle index loaded: {len(index)} puzzles, {len(index.themes)} themes in {_loaded_at - started:.2f}s")
+    return index
+
+
+async def _refresh_index() -> None:
+    global _loaded_at
+    
+    try:
+        await _index_flight.do("index", _load_index)
+    except Exception as e:
+        # Keep serving the current index and retry after another interval
+        _loaded_at = time.monotonic()
+        logger.error(f"Error reloading puzzle index: {e}")
+
+
+async def get_puzzle_index() -> PuzzleIndex:
+    """
+    Get the puzzle index, loading it on first use.
+    
+    The index is kept current by the puzzle write functions and reloaded
+    in the background after settings.PUZZLE_INDEX_REFRESH_SECONDS to pick
+    up writes made by other workers; the current index is served until
+    the reload finishes.
+    
+    Returns:
+        PuzzleIndex instance
+    """
+    global _refresh_task
+    
+    if _puzzle_index is None:
+        return await _index_flight.do("index", _load_index)
+    
+    stale = time.monotonic() - _loaded_at > settings.PUZZLE_INDEX_REFRESH_SECONDS
+    
+    if stale and (_refresh_task is None or _refresh_task.done()):
+        _refresh_task = asyncio.create_task(_refresh_index())
+    
+    return _puzzle_index
+
+
+def loaded_puzzle_index() -> Optional[PuzzleIndex]:
+    """Get the puzzle index if it is loaded, without loading or refreshing it."""
+    return _puzzle_index
+
+
+def index_puzzle(puzzle_id: int, difficulty: Optional[int], themes: Optional[List[str]] = None) -> None:
+    """Apply a puzzle write to the index if it is loaded."""
+    if _pending_writes is not None:
+        _pending_writes.append((puzzle_id, difficulty, themes))
+    
+    if _puzzle_index is not None:
+        _puzzle_index.add(puzzle_id, difficulty, themes)
+
+
+def unindex_puzzle(puzzle_id: int) -> None:
+    """Apply a puzzle deletion to the index if it is loaded."""
+    if _pending_writes is not None:
+        _pending_writes.append((puzzle_id, None, None))
+    
+    if _puzzle_index is not None:
+        _puzzle_index.remove(puzzle_id)
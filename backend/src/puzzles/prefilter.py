@@ -0,0 +1,203 @@
+"""
+Cheap tactical pre-filter for puzzle generation.
+
+Rejects candidate positions that are obviously quiet using python-chess
+only, before they cost several deep engine searches. A position passes
+when the side to move has a mate in one, a piece to win by static
+exchange evaluation, a short capture sequence that wins material, or a
+safe check that also attacks a valuable piece.
+"""
+from typing import Optional, Tuple
+import chess
+from src.core.config import settings
+
+# Piece values in centipawns; the king only orders attackers
+PIECE_VALUES = {
+    chess.PAWN: 100,
+    chess.KNIGHT: 300,
+    chess.BISHOP: 300,
+    chess.ROOK: 500,
+    chess.QUEEN: 900,
+    chess.KING: 20000
+}
+
+# More material than either side can win, the initial capture search window
+MAX_GAIN = 10000
+
+# Outcome reasons
+MATE_IN_ONE = "mate_in_one"
+HANGING_PIECE = "hanging_piece"
+CAPTURE_SEQUENCE = "capture_sequence"
+FORKING_CHECK = "forking_check"
+NO_FORCING_MOVES = "no_forcing_moves"
+QUIET = "quiet"
+
+
+def _capture_gain(board: chess.Board, move: chess.Move) -> int:
+    """Material won immediately by a move: the captured piece plus any promotion."""
+    gain = 0
+    
+    if board.is_en_passant(move):
+        gain = PIECE_VALUES[chess.PAWN]
+    elif board.piece_type_at(move.to_square):
+        gain = PIECE_VALUES[board.piece_type_at(move.to_square)]
+    
+    if move.promotion:
+        gain += PIECE_VALUES[move.promotion] - PIECE_VALUES[chess.PAWN]
+    
+    return gain
+
+
+def _least_valuable_capture(board: chess.Board, square: chess.Square) -> Optional[chess.Move]:
+    captures = board.generate_legal_captures(to_mask=chess.BB_SQUARES[square])
+    return min(captures, key=lambda move: PIECE_VALUES[board.piece_type_at(move.from_square)], default=None)
+
+
+def see(board: chess.Board, move: chess.Move) -> int:
+    """
+    Static exchange evaluation of a move.
+    
+    Plays out the exchange on the move's destination square, each side
+    recapturing with its least valuable legal attacker and free to stop
+    when continuing would lose material. Pins and x-ray attackers are
+    respected because only legal recaptures are considered.
+    
+    Args:
+        board: Position the move is played in
+        move: Legal move
+        
+    Returns:
+        Material won by the mover in centipawns, negative if it loses material
+    """
+    gain = _capture_gain(board, move)
+    board.push(move)
+    
+    try:
+        reply = _least_valuable_capture(board, move.to_square)
+        return gain - (0 if reply is None else max(0, see(board, reply)))
+    finally:
+        board.pop()
+
+
+def capture_sequence_gain(board: chess.Board, depth: int) -> int:
+    """
+    Material the side to move can win with a short sequence of captures.
+    
+    A capture-only search with stand-pat: either side may stop capturing
+    at any point, and captures losing material by static exchange
+    evaluation are skipped.
+    
+    Args:
+        board: Position
+        depth: Maximum number of captures played
+        
+    Returns:
+        Material won in centipawns, at least 0
+    """
+    return _quiesce(board, depth, 0, MAX_GAIN)
+
+
+def _quiesce(board: chess.Board, depth: int, alpha: int, beta: int) -> int:
+    # Negamax over captures; scores are material won from the current
+    # position by the side to move, who may always stop (stand-pat 0)
+    best = 0
+    
+    if best >= beta or depth == 0:
+        return best
+    
+    alpha = max(alpha, best)
+    captures = [move for move in board.generate_legal_captures() if see(board, move) >= 0]
+    captures.sort(key=lambda move: _capture_gain(board, move), reverse=True)
+    
+    for move in captures:
+        gain = _capture_gain(board, move)
+        board.push(move)
+        
+        try:
+            score = gain - _quiesce(board, depth - 1, gain - beta, gain - alpha)
+        finally:
+            board.pop()
+        
+        if score > best:
+            best = score
+            alpha = max(alpha, best)
+            
+            if alpha >= beta:
+                break
+    
+    return best
+
+
+def _is_forking_check(board: chess.Board, move: chess.Move, min_gain: int) -> bool:
+    """Whether a checking move keeps its piece and attacks a piece worth winning."""
+    if see(board, move) < 0:
+        return False
+    
+    mover = board.piece_type_at(move.from_square)
+    board.push(move)
+    
+    try:
+        targets = board.attacks_mask(move.to_square) & board.occupied_co[board.turn] & ~board.kings
+        
+        for square in chess.scan_forward(targets):
+            value = PIECE_VALUES[board.piece_type_at(square)]
+            
+            if value >= min_gain and (value > PIECE_VALUES[mover] or not board.is_attacked_by(board.turn, square)):
+                return True
+        
+        return False
+    finally:
+        board.pop()
+
+
+def prefilter_position(
+    board: chess.Board,
+    min_gain: Optional[int] = None,
+    capture_depth: Optional[int] = None
+) -> Tuple[bool, str]:
+    """
+    Decide whether a position is worth an engine search for a puzzle.
+    
+    Args:
+        board: Candidate position
+        min_gain: Material in centipawns a tactic must win, defaults to
+            settings.PREFILTER_MIN_GAIN
+        capture_depth: Maximum captures in a sequence, defaults to
+            settings.PREFILTER_CAPTURE_DEPTH
+            
+    Returns:
+        Tuple of (whether the position passed, reason it passed or was rejected)
+    """
+    min_gain = settings.PREFILTER_MIN_GAIN if min_gain is None else min_gain
+    capture_depth = settings.PREFILTER_CAPTURE_DEPTH if capture_depth is None else capture_depth
+    checks = []
+    captures = []
+    
+    for move in board.legal_moves:
+        if board.gives_check(move):
+            checks.append(move)
+        
+        if board.is_capture(move) or move.promotion:
+            captures.append(move)
+    
+    if not checks and not captures:
+        return False, NO_FORCING_MOVES
+    
+    for move in checks:
+        board.push(move)
+        mate = board.is_checkmate()
+        board.pop()
+        
+        if mate:
+            return True, MATE_IN_ONE
+    
+    if any(see(board, move) >= min_gain for move in captures):
+        return True, HANGING_PIECE
+    
+    if captures and capture_sequence_gain(board, capture_depth) >= min_gain:
+        return True, CAPTURE_SEQUENCE
+    
+    if any(_is_forking_check(board, move, min_gain) for move in checks):
+        return True, FORKING_CHECK
+    
+    return False, QUIET
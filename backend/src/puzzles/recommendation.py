@@ -0,0 +1,223 @@
+import logging
+from array import array
+from bisect import bisect_left
+from typing import Dict, List, Optional, Tuple
+from src.core.config import settings
+from src.db.client import execute_query
+from src.puzzles.index import PuzzleIndex, get_puzzle_index, loaded_puzzle_index
+from src.user_progress.due_queue import get_due_queue
+from src.utils.cache import LRUCache
+from src.utils.singleflight import SingleFlight
+
+logger = logging.getLogger(__name__)
+
+# Table name
+USER_PROGRESS_TABLE = "user_progress"
+
+# Number of progress rows fetched per query while loading a profile
+LOAD_PAGE_SIZE = 1000
+
+
+class SeenSet:
+    """
+    Set of puzzle IDs kept as a sorted array of 64-bit integers.
+    
+    Takes 8 bytes per ID a user has attempted, however large the IDs are.
+    """
+    
+    def __init__(self):
+        self._ids = array("q")
+    
+    def add(self, puzzle_id: int) -> None:
+        position = bisect_left(self._ids, puzzle_id)
+        
+        if position == len(self._ids) or self._ids[position] != puzzle_id:
+            self._ids.insert(position, puzzle_id)
+    
+    def __contains__(self, puzzle_id: int) -> bool:
+        position = bisect_left(self._ids, puzzle_id)
+        return position < len(self._ids) and self._ids[position] == puzzle_id
+    
+    def __len__(self) -> int:
+        return len(self._ids)
+
+
+class UserProfile:
+    """A user's estimated rating and the puzzles they have already attempted."""
+    
+    def __init__(self, rating: float):
+        self.rating = rating
+        self.seen = SeenSet()
+    
+    def record(self, puzzle_id: int, difficulty: Optional[int], solved: bool) -> None:
+        """
+        Record an attempt, updating the rating Elo-style against the puzzle's difficulty.
+        
+        Args:
+            puzzle_id: Puzzle ID
+            difficulty: Puzzle difficulty (None leaves the rating unchanged)
+            solved: Whether the puzzle was solved
+        """
+        self.seen.add(puzzle_id)
+        
+        if difficulty is not None:
+            expected = 1 / (1 + 10 ** ((difficulty - self.rating) / 400))
+            self.rating += settings.RATING_K_FACTOR * (solved - expected)
+
+
+async def _load_progress_rows(user_id: str) -> List[Tuple[int, bool]]:
+    """Load a user's (puzzle_id, solved) history, oldest first."""
+    rows: List[Tuple[int, bool]] = []
+    offset = 0
+    
+    while True:
+        page = await execute_query(
+            USER_PROGRESS_TABLE,
+            lambda q: q.select("puzzle_id,solved"),
+            filters=[("user_id", "eq", user_id)],
+            order=[["updated_at", False], ["id", False]],
+            limit=LOAD_PAGE_SIZE,
+            offset=offset
+        )
+        
+        rows.extend((row["puzzle_id"], row["solved"]) for row in page)
+        
+        if len(page) < LOAD_PAGE_SIZE:
+            return rows
+        
+        offset += LOAD_PAGE_SIZE
+
+
+# User profiles keyed by user ID; kept current by record_attempt
+_profiles = LRUCache(maxsize=settings.USER_PROFILE_CACHE_SIZE, ttl=settings.USER_PROFILE_TTL_SECONDS)
+
+# Concurrent profile loads for the same user share one query
+_profile_flight = SingleFlight()
+
+# Attempts recorded while a user's profile is loading, applied once it has loaded
+_pending_attempts: Dict[str, List[Tuple[int, bool]]] = {}
+
+
+async def _load_profile(user_id: str) -> UserProfile:
+    pending = _pending_attempts[user_id] = []
+    
+    try:
+        index = await get_puzzle_index()
+        rows = await _load_progress_rows(user_id)
+    finally:
+        del _pending_attempts[user_id]
+    
+    profile = UserProfile(settings.DEFAULT_USER_RATING)
+    
+    for puzzle_id, solved in rows + pending:
+        profile.record(puzzle_id, index.difficulty(puzzle_id), solved)
+    
+    _profiles.set(user_id, profile)
+    return profile
+
+
+async def get_user_profile(user_id: str) -> UserProfile:
+    """
+    Get a user's profile, building it from their progress history on first use.
+    
+    Args:
+        user_id: User ID
+        
+    Returns:
+        UserProfile instance
+    """
+    profile = _profiles.get(user_id)
+    
+    if profile is None:
+        profile = await _profile_flight.do(user_id, lambda: _load_profile(user_id))
+    
+    return profile
+
+
+def record_attempt(user_id: str, puzzle_id: int, solved: bool) -> None:
+    """
+    Apply a puzzle attempt to the user's cached or loading profile, if any.
+    
+    Called from the progress write path, so it never waits for the puzzle
+    index; a cached profile implies the index has already been loaded.
+    
+    Args:
+        user_id: User ID
+        puzzle_id: Puzzle ID
+        solved: Whether the puzzle was solved
+    """
+    if user_id in _pending_attempts:
+        _pending_attempts[user_id].append((puzzle_id, solved))
+    
+    profile = _profiles.get(user_id)
+    index = loaded_puzzle_index()
+    
+    if profile is not None:
+        profile.record(puzzle_id, None if index is None else index.difficulty(puzzle_id), solved)
+
+
+def select_new_puzzles(
+    index: PuzzleIndex,
+    profile: UserProfile,
+    count: int,
+    exclude: Optional[set] = None,
+    themes: Optional[List[str]] = None
+) -> List[int]:
+    """
+    Select unseen puzzles closest in difficulty to the user's rating.
+    
+    Args:
+        index: Puzzle index
+        profile: User profile
+        count: Maximum number of puzzles
+        exclude: Further puzzle IDs to skip
+        themes: Themes every puzzle must have
+        
+    Returns:
+        Puzzle IDs, closest to the user's rating first
+    """
+    theme_mask = index.themes.lookup(themes) if themes else 0
+    
+    if theme_mask is None:
+        return []
+    
+    exclude = exclude or set()
+    
+    return index.nearest(
+        profile.rating,
+        count,
+        exclude=lambda puzzle_id: puzzle_id in profile.seen or puzzle_id in exclude,
+        theme_mask=theme_mask
+    )
+
+
+async def recommend_puzzle_ids(
+    user_id: str,
+    count: int,
+    themes: Optional[List[str]] = None
+) -> List[int]:
+    """
+    Recommend puzzles for a user.
+    
+    Puzzles due for review come first, most overdue first. Remaining slots
+    are filled with puzzles the user has not attempted, closest in
+    difficulty to their estimated rating and optionally restricted to
+    themes.
+    
+    Args:
+        user_id: User ID
+        count: Number of puzzles to recommend
+        themes: Themes new puzzles must have
+        
+    Returns:
+        Puzzle IDs in recommendation order
+    """
+    due_ids = await get_due_queue().next_due(user_id, count)
+    
+    if len(due_ids) >= count:
+        return due_ids
+    
+    index = await get_puzzle_index()
+    profile = await get_user_profile(user_id)
+    
+    return due_ids + select_new_puzzles(index, profile, count - len(due_ids), set(due_ids), themes)
@@ -1,16 +1,30 @@
 from fastapi import APIRouter, Depends, HTTPException, Query, Path, status
-from typing import List, Optional
+from typing import Dict, List, Optional
 import logging
-from src.puzzles.schemas import Puzzle, PuzzleCreate, PuzzleUpdate, PuzzleList, PuzzleFilter
+import chess
+from src.puzzles.schemas import (
+    Puzzle,
+    PuzzleCreate,
+    PuzzleUpdate,
+    PuzzleList,
+    PuzzleFilter,
+    SolutionCheckRequest,
+    SolutionCheckResult
+)
 from src.puzzles.service import (
     get_puzzles,
+    get_puzzles_by_cursor,
     get_puzzle_by_id,
+    get_puzzles_by_ids,
     create_puzzle,
     update_puzzle,
     delete_puzzle,
-    get_recommended_puzzles
+    get_recommended_puzzles,
+    get_puzzle_cache_stats
 )
-from src.auth.dependencies import get_current_user
+from src.puzzles.solution import check_solution
+from src.auth.dependencies import get_current_user, get_optional_user
+from src.utils.chess_engine import evaluate_position
 from src.core.config import settings
 
 logger = logging.getLogger(__name__)
@@ -24,10 +38,18 @@ async def list_puzzles(
     size: int = Query(settings.DEFAULT_PUZZLE_LIMIT, ge=1, le=settings.MAX_PUZZLE_LIMIT, description="Page size"),
     min_difficulty: Optional[int] = Query(None, ge=0, le=3000, description="Minimum difficulty rating"),
     max_difficulty: Optional[int] = Query(None, ge=0, le=3000, description="Maximum difficulty rating"),
-    themes: Optional[List[str]] = Query(None, description="List of themes to filter by")
+    themes: Optional[List[str]] = Query(None, description="List of themes to filter by"),
+    cursor: Optional[str] = Query(
+        None,
+        description="Keyset pagination cursor from a previous response's next_cursor; "
+                    "pass an empty value to request the first page"
+    )
 ):
     """
     Get a paginated list of puzzles with optional filtering.
+    
+    Supplying `cursor` switches to keyset pagination ordered by difficulty
+    and ID, which stays fast at any depth; `page` is then ignored.
     """
     # Create filter object
     filters = PuzzleFilter(
@@ -36,6 +58,28 @@ async def list_puzzles(
         themes=themes
     )
     
+    if cursor is not None:
+        try:
+            puzzles, total, next_cursor = await get_puzzles_by_cursor(
+                cursor=cursor or None,
+                size=size,
+                filters=filters
+            )
+        except ValueError:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Invalid pagination cursor"
+            )
+        
+        return PuzzleList(
+            items=puzzles,
+            total=total,
+            page=page,
+            size=size,
+            pages=(total + size - 1) // size,
+            next_cursor=next_cursor
+        )
+    
     # Get puzzles
     puzzles, total = await get_puzzles(page=page, size=size, filters=filters)
     
@@ -54,15 +98,50 @@ async def list_puzzles(
 @router.get("/recommended", response_model=List[Puzzle])
 async def get_recommended(
     count: int = Query(5, ge=1, le=20, description="Number of puzzles to recommend"),
+    themes: Optional[List[str]] = Query(None, description="Themes new puzzles must have"),
     current_user: dict = Depends(get_current_user)
 ):
     """
     Get recommended puzzles for the current user based on their progress and the spaced repetition algorithm.
     """
-    puzzles = await get_recommended_puzzles(user_id=current_user["id"], count=count)
+    puzzles = await get_recommended_puzzles(user_id=current_user["id"], count=count, themes=themes)
     return puzzles
 
 
+@router.get("/batch", response_model=List[Puzzle])
+async def get_puzzle_batch(
+    ids: List[int] = Query(..., description="Puzzle IDs to fetch")
+):
+    """
+    Get several puzzles by ID in one request.
+    Unknown IDs are omitted from the result.
+    """
+    if len(ids) > settings.MAX_PUZZLE_LIMIT:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"At most {settings.MAX_PUZZLE_LIMIT} puzzles can be fetched at once"
+        )
+    
+    return await get_puzzles_by_ids(ids)
+
+
+@router.get("/cache/stats", response_model=Dict[str, int])
+async def get_cache_stats(
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    Get hit/miss counters of the puzzle cache.
+    Requires admin privileges.
+    """
+    if not current_user.get("is_admin", False):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not authorized to view cache statistics"
+        )
+    
+    return get_puzzle_cache_stats()
+
+
 @router.get("/{puzzle_id}", response_model=Puzzle)
 async def get_puzzle(
     puzzle_id: int = Path(..., ge=1, description="Puzzle ID")
@@ -81,6 +160,47 @@ async def get_puzzle(
     return puzzle
 
 
+@router.post("/{puzzle_id}/check", response_model=SolutionCheckResult)
+async def check_puzzle_solution(
+    request: SolutionCheckRequest,
+    puzzle_id: int = Path(..., ge=1, description="Puzzle ID"),
+    current_user: Optional[dict] = Depends(get_optional_user)
+):
+    """
+    Check moves against a puzzle's solution tree without consulting the engine.
+    The engine evaluation of the resulting position is only run if requested,
+    which requires authentication.
+    """
+    if request.evaluate and current_user is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Authentication required for engine evaluation",
+            headers={"WWW-Authenticate": "Bearer"}
+        )
+    
+    puzzle = await get_puzzle_by_id(puzzle_id)
+    
+    if not puzzle:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Puzzle with ID {puzzle_id} not found"
+        )
+    
+    try:
+        result = check_solution(puzzle.fen, puzzle.solution_moves, request.moves, puzzle.solution_tree)
+    except ValueError as e:
+        logger.error(f"Invalid solution for puzzle {puzzle_id}: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Puzzle solution is invalid"
+        )
+    
+    if request.evaluate:
+        result.evaluation = await evaluate_position(chess.Board(result.fen))
+    
+    return result
+
+
 @router.post("/", response_model=Puzzle, status_code=status.HTTP_201_CREATED)
 async def create_new_puzzle(
     puzzle: PuzzleCreate,
@@ -125,22 +245,13 @@ async def update_existing_puzzle(
             detail="Not authorized to update puzzles"
         )
     
-    # Check if puzzle exists
-    existing_puzzle = await get_puzzle_by_id(puzzle_id)
-    
-    if not existing_puzzle:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail=f"Puzzle with ID {puzzle_id} not found"
-        )
-    
-    # Update puzzle
+    # Update puzzle; a missing puzzle updates no rows
     updated_puzzle = await update_puzzle(puzzle_id, puzzle)
     
     if not updated_puzzle:
         raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail="Failed to update puzzle"
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Puzzle with ID {puzzle_id} not found"
         )
     
     return updated_puzzle
@@ -162,22 +273,13 @@ async def delete_existing_puzzle(
             detail="Not authorized to delete puzzles"
         )
     
-    # Check if puzzle exists
-    existing_puzzle = await get_puzzle_by_id(puzzle_id)
-    
-    if not existing_puzzle:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail=f"Puzzle with ID {puzzle_id} not found"
-        )
-    
-    # Delete puzzle
+    # Delete puzzle; a missing puzzle deletes no rows
     success = await delete_puzzle(puzzle_id)
     
     if not success:
         raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail="Failed to delete puzzle"
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Puzzle with ID {puzzle_id} not found"
         )
     
     return None 
\ No newline at end of file
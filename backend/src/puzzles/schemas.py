@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field, field_validator
-from typing import List, Optional
+from typing import Any, Dict, List, Optional
 
 
 class PuzzleBase(BaseModel):
@@ -8,6 +8,10 @@ class PuzzleBase(BaseModel):
     solution_moves: str = Field(..., description="Solution moves in algebraic notation")
     difficulty: Optional[int] = Field(None, description="Puzzle difficulty rating")
     themes: Optional[List[str]] = Field(None, description="List of puzzle themes")
+    solution_tree: Optional[Dict[str, Any]] = Field(
+        None,
+        description="Accepted solver moves (UCI) mapped to the opponent's reply and the next node"
+    )
 
 
 class PuzzleCreate(PuzzleBase):
@@ -21,6 +25,7 @@ class PuzzleUpdate(BaseModel):
     solution_moves: Optional[str] = None
     difficulty: Optional[int] = None
     themes: Optional[List[str]] = None
+    solution_tree: Optional[Dict[str, Any]] = None
 
 
 class PuzzleInDB(PuzzleBase):
@@ -42,6 +47,7 @@ class PuzzleList(BaseModel):
     page: int
     size: int
     pages: int
+    next_cursor: Optional[str] = Field(None, description="Cursor for the next page in keyset pagination mode")
 
 
 class PuzzleFilter(BaseModel):
@@ -56,4 +62,47 @@ class PuzzleFilter(BaseModel):
         """Validate difficulty is within reasonable bounds"""
         if value is not None and (value < 0 or value > 3000):
             raise ValueError("Difficulty must be between 0 and 3000")
-        return value 
\ No newline at end of file
+        return value
+
+
+class SolutionCheckRequest(BaseModel):
+    """Schema for checking moves against a puzzle's solution"""
+    moves: List[str] = Field(
+        ...,
+        min_length=1,
+        description="Solver's moves so far in UCI or SAN, without the opponent's replies"
+    )
+    evaluate: bool = Field(False, description="Also return an engine evaluation of the resulting position")
+
+
+class SolutionCheckResult(BaseModel):
+    """Schema for the outcome of a solution check"""
+    correct: bool = Field(..., description="Whether every move submitted is correct")
+    complete: bool = Field(..., description="Whether the puzzle is solved")
+    failed_move: Optional[int] = Field(None, description="Index of the first incorrect move")
+    reply: Optional[str] = Field(None, description="Opponent's reply to the last correct move (UCI)")
+    fen: str = Field(..., description="Position after the last correct move and its reply")
+    evaluation: Optional[int] = Field(None, description="Engine evaluation of fen in centipawns, if requested")
+
+
+class PuzzleGenerationStats(BaseModel):
+    """Schema for the outcome of a batch puzzle generation run"""
+    positions: int = Field(0, description="Number of candidate positions processed")
+    prefiltered: int = Field(0, description="Number of positions rejected by the pre-filter without engine analysis")
+    prefilter_reasons: Dict[str, int] = Field(
+        default_factory=dict,
+        description="Number of positions passed or rejected by the pre-filter, by reason"
+    )
+    accepted: int = Field(0, description="Number of positions that produced a puzzle")
+    inserted: int = Field(0, description="Number of puzzles written to the database")
+    elapsed_seconds: float = Field(0.0, description="Wall-clock duration of the run")
+    
+    @property
+    def positions_per_second(self) -> float:
+        """Candidate positions processed per second"""
+        return self.positions / self.elapsed_seconds if self.elapsed_seconds > 0 else 0.0
+    
+    @property
+    def rejection_rate(self) -> float:
+        """Share of candidate positions rejected by the pre-filter"""
+        return self.prefiltered / self.positions if self.positions else 0.0
\ No newline at end of file
@@ -1,14 +1,36 @@
-from typing import List, Optional, Dict, Any, Tuple
+from typing import List, Optional, Dict, Any, Set, Tuple
+import base64
+import binascii
+import json
 import logging
 from src.db.client import execute_query
 from src.puzzles.schemas import Puzzle, PuzzleCreate, PuzzleUpdate, PuzzleFilter
 from src.core.config import settings
+from src.puzzles.catalog import catalog_puzzle, get_puzzle_catalog, uncatalog_puzzle
+from src.puzzles.index import index_puzzle, unindex_puzzle
+from src.puzzles.recommendation import recommend_puzzle_ids
+from src.utils.batch_loader import BatchLoader
+from src.utils.cache import LRUCache
+from src.utils.singleflight import SingleFlight
 
 logger = logging.getLogger(__name__)
 
 # Table name
 PUZZLES_TABLE = "puzzles"
 
+# Recently computed list totals keyed by query filters
+_count_cache = LRUCache(maxsize=256, ttl=settings.PUZZLE_COUNT_CACHE_TTL_SECONDS)
+
+# Validated puzzles keyed by ID; kept current by the write functions below
+_puzzle_cache = LRUCache(maxsize=settings.PUZZLE_CACHE_SIZE, ttl=settings.PUZZLE_CACHE_TTL_SECONDS)
+
+# Concurrent cache misses for the same puzzle share one query
+_puzzle_flight = SingleFlight()
+
+# Puzzle IDs written while each batch fetch is in flight; a fetch does not
+# cache those rows, which may predate the write
+_fetch_writes: List[Set[int]] = []
+
 
 async def get_puzzles(
     page: int = 1,
@@ -33,7 +55,157 @@ async def get_puzzles(
     # Calculate offset
     offset = (page - 1) * size
     
+    # Filter in process when the catalog is enabled, fetching only the page
+    catalog = await get_puzzle_catalog()
+    
+    if catalog is not None:
+        filters = filters or PuzzleFilter()
+        found = catalog.query(
+            min_difficulty=filters.min_difficulty,
+            max_difficulty=filters.max_difficulty,
+            themes=filters.themes,
+            offset=offset,
+            limit=size
+        )
+        
+        if found is not None:
+            puzzle_ids, total = found
+            return await get_puzzles_by_ids(puzzle_ids), total
+    
     # Build query filters
+    query_filters = _build_query_filters(filters)
+    
+    # Get puzzles and their total in one request
+    puzzles_data, total = await _fetch_puzzles_with_total(
+        query_filters,
+        order=[["difficulty", False], ["id", False]],  # Order by difficulty ascending
+        limit=size,
+        offset=offset
+    )
+    
+    # Convert to Puzzle objects
+    puzzles = [Puzzle.model_validate(puzzle) for puzzle in puzzles_data]
+    
+    return puzzles, total
+
+
+async def get_puzzles_by_cursor(
+    cursor: Optional[str] = None,
+    size: int = settings.DEFAULT_PUZZLE_LIMIT,
+    filters: Optional[PuzzleFilter] = None
+) -> Tuple[List[Puzzle], int, Optional[str]]:
+    """
+    Get a page of puzzles using keyset pagination on (difficulty, id).
+    
+    Unlike offset pagination, the cost of a page does not grow with its
+    depth and pages do not shift when puzzles are inserted.
+    
+    Args:
+        cursor: Cursor returned with the previous page, None for the first page
+        size: Page size
+        filters: Optional filters
+        
+    Returns:
+        Tuple of (puzzles list, total count, cursor of the next page or None)
+        
+    Raises:
+        ValueError: If the cursor is malformed
+    """
+    # Ensure size doesn't exceed maximum
+    if size > settings.MAX_PUZZLE_LIMIT:
+        size = settings.MAX_PUZZLE_LIMIT
+    
+    # Build query filters
+    query_filters = _build_query_filters(filters)
+    
+    # Continue after the last row of the previous page; ascending order
+    # places puzzles without a difficulty last
+    page_filters = list(query_filters)
+    or_filter = None
+    
+    if cursor:
+        last_difficulty, last_id = decode_puzzle_cursor(cursor)
+        
+        if last_difficulty is None:
+            page_filters.append(("difficulty", "is", "null"))
+            page_filters.append(("id", "gt", last_id))
+        else:
+            or_filter = (
+                f"difficulty.gt.{last_difficulty},"
+                f"and(difficulty.eq.{last_difficulty},id.gt.{last_id}),"
+                f"difficulty.is.null"
+            )
+    
+    query_kwargs = {"or_filter": or_filter} if or_filter else {}
+    
+    # Fetch one extra row to know whether another page follows
+    puzzles_data, total = await _fetch_puzzles_with_total(
+        page_filters,
+        count_filters=query_filters,
+        order=[["difficulty", False], ["id", False]],
+        limit=size + 1,
+        **query_kwargs
+    )
+    
+    puzzles = [Puzzle.model_validate(puzzle) for puzzle in puzzles_data[:size]]
+    
+    next_cursor = None
+    if len(puzzles_data) > size:
+        next_cursor = encode_puzzle_cursor(puzzles[-1].difficulty, puzzles[-1].id)
+    
+    return puzzles, total, next_cursor
+
+
+def encode_puzzle_cursor(difficulty: Optional[int], puzzle_id: int) -> str:
+    """
+    Encode a keyset position as an opaque cursor.
+    
+    Args:
+        difficulty: Difficulty of the last puzzle on the page
+        puzzle_id: ID of the last puzzle on the page
+        
+    Returns:
+        URL-safe cursor string
+    """
+    raw = json.dumps([difficulty, puzzle_id], separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_puzzle_cursor(cursor: str) -> Tuple[Optional[int], int]:
+    """
+    Decode a cursor produced by encode_puzzle_cursor.
+    
+    Args:
+        cursor: Cursor string
+        
+    Returns:
+        Tuple of (difficulty, puzzle ID)
+        
+    Raises:
+        ValueError: If the cursor is malformed
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        difficulty, puzzle_id = json.loads(raw)
+    except (binascii.Error, ValueError, TypeError) as e:
+        raise ValueError("Invalid cursor") from e
+    
+    if not isinstance(puzzle_id, int) or not (difficulty is None or isinstance(difficulty, int)):
+        raise ValueError("Invalid cursor")
+    
+    return difficulty, puzzle_id
+
+
+def _build_query_filters(filters: Optional[PuzzleFilter]) -> List[Tuple[str, str, Any]]:
+    """
+    Translate a PuzzleFilter into execute_query filters.
+    
+    Args:
+        filters: Optional filters
+        
+    Returns:
+        List of (column, operator, value) filters
+    """
     query_filters = []
     
     if filters:
@@ -49,51 +221,207 @@ async def get_puzzles(
             for theme in filters.themes:
                 query_filters.append(("themes", "cs", f"{{{theme}}}"))
     
-    # Get count first
-    count_result = await execute_query(
+    return query_filters
+
+
+async def _fetch_puzzles_with_total(
+    query_filters: List[Tuple[str, str, Any]],
+    count_filters: Optional[List[Tuple[str, str, Any]]] = None,
+    **kwargs
+) -> Tuple[List[Dict[str, Any]], int]:
+    """
+    Fetch puzzle rows and the total number of matching puzzles in one request.
+    
+    The total is counted with settings.PUZZLE_COUNT_MODE and reused for
+    settings.PUZZLE_COUNT_CACHE_TTL_SECONDS, during which the page is
+    fetched without counting at all.
+    
+    Args:
+        query_filters: Filters applied to the fetched rows
+        count_filters: Filters defining the total, defaults to query_filters
+        **kwargs: Additional execute_query parameters (order, limit, ...)
+        
+    Returns:
+        Tuple of (puzzle rows, total count)
+    """
+    count_filters = query_filters if count_filters is None else count_filters
+    count_key = tuple(count_filters)
+    total = _count_cache.get(count_key)
+    
+    # The count can only ride along when the page uses the same filters
+    if total is not None or count_filters != query_filters or "or_filter" in kwargs:
+        rows = await execute_query(
+            PUZZLES_TABLE,
+            lambda q: q.select("*"),
+            filters=query_filters,
+            **kwargs
+        )
+        
+        if total is None:
+            total = await _count_puzzles(count_filters)
+            _count_cache.set(count_key, total)
+        
+        return rows, total
+    
+    rows, count = await execute_query(
         PUZZLES_TABLE,
-        lambda q: q.select("count", count="exact"),
-        filters=query_filters
+        lambda q: q.select("*", count=settings.PUZZLE_COUNT_MODE),
+        filters=query_filters,
+        return_count=True,
+        **kwargs
     )
     
-    total = count_result[0]["count"] if count_result else 0
+    total = count or 0
+    _count_cache.set(count_key, total)
+    
+    return rows, total
+
+
+async def _count_puzzles(query_filters: List[Tuple[str, str, Any]]) -> int:
+    """
+    Count the puzzles matching a set of filters.
     
-    # Get puzzles
-    puzzles_data = await execute_query(
+    Args:
+        query_filters: List of (column, operator, value) filters
+        
+    Returns:
+        Number of matching puzzles
+    """
+    _, count = await execute_query(
         PUZZLES_TABLE,
-        lambda q: q.select("*"),
+        lambda q: q.select("id", count=settings.PUZZLE_COUNT_MODE),
         filters=query_filters,
-        order=["difficulty", True],  # Order by difficulty ascending
-        limit=size,
-        offset=offset
+        limit=1,
+        return_count=True
     )
     
-    # Convert to Puzzle objects
-    puzzles = [Puzzle.model_validate(puzzle) for puzzle in puzzles_data]
-    
-    return puzzles, total
+    return count or 0
 
 
 async def get_puzzle_by_id(puzzle_id: int) -> Optional[Puzzle]:
     """
     Get a puzzle by ID.
     
+    Served from the in-process puzzle cache when possible; concurrent
+    misses for the same puzzle wait for a single query.
+    
     Args:
         puzzle_id: Puzzle ID
         
     Returns:
         Puzzle if found, None otherwise
     """
-    result = await execute_query(
-        PUZZLES_TABLE,
-        lambda q: q.select("*"),
-        filters=[("id", "eq", puzzle_id)]
-    )
+    puzzle = _puzzle_cache.get(puzzle_id)
     
-    if not result:
-        return None
+    if puzzle is not None:
+        return puzzle
+    
+    return await _puzzle_flight.do(puzzle_id, lambda: _fetch_puzzle(puzzle_id))
+
+
+async def _fetch_puzzle(puzzle_id: int) -> Optional[Puzzle]:
+    """
+    Fetch a puzzle from the database as part of the next batch.
+    
+    Args:
+        puzzle_id: Puzzle ID
+        
+    Returns:
+        Puzzle if found, None otherwise
+    """
+    return await _puzzle_loader.load(puzzle_id)
+
+
+async def _fetch_puzzles_batch(puzzle_ids: List[int]) -> Dict[int, Puzzle]:
+    """
+    Fetch several puzzles with a single `in` query and cache them.
+    
+    Args:
+        puzzle_ids: Puzzle IDs
+        
+    Returns:
+        Dictionary of found puzzles keyed by ID
+    """
+    written: Set[int] = set()
+    _fetch_writes.append(written)
+    
+    try:
+        result = await execute_query(
+            PUZZLES_TABLE,
+            lambda q: q.select("*"),
+            filters=[("id", "in", f"({','.join(str(puzzle_id) for puzzle_id in puzzle_ids)})")]
+        )
+    finally:
+        _fetch_writes.remove(written)
+    
+    puzzles = {}
+    for row in result:
+        puzzle = Puzzle.model_validate(row)
+        puzzles[puzzle.id] = puzzle
+        
+        if puzzle.id not in written:
+            _puzzle_cache.set(puzzle.id, puzzle)
+    
+    return puzzles
+
+
+def _note_puzzle_write(puzzle_id: int) -> None:
+    """Keep in-flight batch fetches from caching an older copy of a written puzzle."""
+    for written in _fetch_writes:
+        written.add(puzzle_id)
+
+
+# Puzzle lookups made within a short window are fetched together
+_puzzle_loader = BatchLoader(
+    _fetch_puzzles_batch,
+    window=settings.PUZZLE_BATCH_WINDOW_MS / 1000,
+    max_batch=settings.MAX_PUZZLE_LIMIT
+)
+
+
+async def get_puzzles_by_ids(puzzle_ids: List[int]) -> List[Puzzle]:
+    """
+    Get several puzzles by ID.
+    
+    Cached puzzles are returned directly; the rest are fetched in one
+    batched query.
+    
+    Args:
+        puzzle_ids: Puzzle IDs
+        
+    Returns:
+        Found puzzles in the order requested, without duplicates
+    """
+    puzzle_ids = list(dict.fromkeys(puzzle_ids))
+    found = {}
+    missing = []
+    
+    for puzzle_id in puzzle_ids:
+        puzzle = _puzzle_cache.get(puzzle_id)
+        
+        if puzzle is None:
+            missing.append(puzzle_id)
+        else:
+            found[puzzle_id] = puzzle
+    
+    if missing:
+        for puzzle_id, puzzle in zip(missing, await _puzzle_loader.load_many(missing)):
+            if puzzle is not None:
+                found[puzzle_id] = puzzle
     
-    return Puzzle.model_validate(result[0])
+    return [found[puzzle_id] for puzzle_id in puzzle_ids if puzzle_id in found]
+
+
+def get_puzzle_cache_stats() -> Dict[str, int]:
+    """
+    Get hit/miss counters of the puzzle cache.
+    
+    Returns:
+        Dictionary of cache statistics, including coalesced lookups
+    """
+    stats = _puzzle_cache.stats()
+    stats["coalesced"] = _puzzle_flight.shared
+    return stats
 
 
 async def create_puzzle(puzzle: PuzzleCreate) -> Puzzle:
@@ -114,13 +442,56 @@ async def create_puzzle(puzzle: PuzzleCreate) -> Puzzle:
     if not result:
         raise Exception("Failed to create puzzle")
     
-    return Puzzle.model_validate(result[0])
+    _count_cache.clear()
+    
+    created = Puzzle.model_validate(result[0])
+    _puzzle_cache.set(created.id, created)
+    index_puzzle(created.id, created.difficulty, created.themes)
+    catalog_puzzle(created.id, created.difficulty, created.themes)
+    
+    return created
+
+
+async def create_puzzles(puzzles: List[PuzzleCreate]) -> List[Puzzle]:
+    """
+    Create several puzzles with a single insert.
+    
+    Args:
+        puzzles: Puzzle data
+        
+    Returns:
+        Created puzzles
+    """
+    if not puzzles:
+        return []
+    
+    rows = [puzzle.model_dump() for puzzle in puzzles]
+    
+    result = await execute_query(
+        PUZZLES_TABLE,
+        lambda q: q.insert(rows)
+    )
+    
+    if not result:
+        raise Exception("Failed to create puzzles")
+    
+    _count_cache.clear()
+    
+    created = [Puzzle.model_validate(puzzle) for puzzle in result]
+    for puzzle in created:
+        _puzzle_cache.set(puzzle.id, puzzle)
+        index_puzzle(puzzle.id, puzzle.difficulty, puzzle.themes)
+        catalog_puzzle(puzzle.id, puzzle.difficulty, puzzle.themes)
+    
+    return created
 
 
 async def update_puzzle(puzzle_id: int, puzzle: PuzzleUpdate) -> Optional[Puzzle]:
     """
     Update an existing puzzle.
     
+    Returns None for a missing puzzle, so callers need not fetch it first.
+    
     Args:
         puzzle_id: Puzzle ID
         puzzle: Updated puzzle data
@@ -141,10 +512,20 @@ async def update_puzzle(puzzle_id: int, puzzle: PuzzleUpdate) -> Optional[Puzzle
         filters=[("id", "eq", puzzle_id)]
     )
     
+    _note_puzzle_write(puzzle_id)
+    
     if not result:
+        _puzzle_cache.pop(puzzle_id)
         return None
     
-    return Puzzle.model_validate(result[0])
+    _count_cache.clear()
+    
+    updated = Puzzle.model_validate(result[0])
+    _puzzle_cache.set(puzzle_id, updated)
+    index_puzzle(puzzle_id, updated.difficulty, updated.themes)
+    catalog_puzzle(puzzle_id, updated.difficulty, updated.themes)
+    
+    return updated
 
 
 async def delete_puzzle(puzzle_id: int) -> bool:
@@ -155,7 +536,7 @@ async def delete_puzzle(puzzle_id: int) -> bool:
         puzzle_id: Puzzle ID
         
     Returns:
-        True if deleted, False otherwise
+        True if deleted, False if no such puzzle exists
     """
     result = await execute_query(
         PUZZLES_TABLE,
@@ -163,29 +544,41 @@ async def delete_puzzle(puzzle_id: int) -> bool:
         filters=[("id", "eq", puzzle_id)]
     )
     
+    _note_puzzle_write(puzzle_id)
+    _puzzle_cache.pop(puzzle_id)
+    
+    if result:
+        _count_cache.clear()
+        unindex_puzzle(puzzle_id)
+        uncatalog_puzzle(puzzle_id)
+    
     return bool(result)
 
 
 async def get_recommended_puzzles(
     user_id: str,
-    count: int = 5
+    count: int = 5,
+    themes: Optional[List[str]] = None
 ) -> List[Puzzle]:
     """
     Get recommended puzzles for a user based on their progress and the spaced repetition algorithm.
     
+    Puzzles due for review come first; remaining slots are filled with
+    unattempted puzzles near the user's estimated rating. Selection runs
+    in process (see src/puzzles/recommendation.py), only the chosen
+    puzzles are fetched.
+    
     Args:
         user_id: User ID
         count: Number of puzzles to recommend
+        themes: Themes new puzzles must have
         
     Returns:
         List of recommended puzzles
     """
-    # This is a simplified implementation
-    # In a real app, you would:
-    # 1. Get the user's progress
-    # 2. Apply the spaced repetition algorithm
-    # 3. Select puzzles that are due for review or new puzzles at the appropriate difficulty
+    puzzle_ids = await recommend_puzzle_ids(user_id, count, themes)
+    
+    if not puzzle_ids:
+        return []
     
-    # For now, just return some puzzles
-    puzzles, _ = await get_puzzles(size=count)
-    return puzzles 
\ No newline at end of file
+    return await get_puzzles_by_ids(puzzle_ids)
\ No newline at end of file
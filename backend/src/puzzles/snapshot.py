@@ -0,0 +1,281 @@
+"""
+Memory-mapped puzzle catalog snapshots.
+
+A snapshot is a single binary file holding the puzzle table in columns:
+IDs, difficulties, theme masks, the (difficulty, id) listing order, and
+the packed positions and solution moves (see src/utils/chess_encoding.py)
+as blobs with offset arrays. Workers map it read-only, so the operating
+system shares one copy of the pages between all processes and a new
+worker can serve listings without loading the table from the database.
+
+Only the listing columns are used when serving; the packed positions and
+solutions are read through PuzzleSnapshot.board() and solution_moves()
+by offline tools. API responses and solution checks still read FEN and
+UCI text from the puzzle rows, which also carry the solution trees the
+snapshot does not store.
+
+Usage:
+    python -m src.puzzles.snapshot build puzzles.snap
+"""
+import argparse
+import asyncio
+import json
+import logging
+import mmap
+import os
+import struct
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Union
+import chess
+import numpy as np
+from src.db.client import close_query_executor, execute_query
+from src.puzzles.index import ThemeRegistry
+from src.utils.chess_encoding import decode_board, decode_solution, encode_fen, encode_solution
+
+logger = logging.getLogger(__name__)
+
+# Table name
+PUZZLES_TABLE = "puzzles"
+
+# Number of rows fetched per query while building a snapshot
+LOAD_PAGE_SIZE = 1000
+
+# File header: magic, format version, length of the JSON metadata that follows
+MAGIC = b"NPSNAP\x00\x00"
+VERSION = 2
+HEADER = struct.Struct("<8sII")
+
+# Stored difficulty of puzzles without one; sorts them last like NULLs in an ascending ORDER BY
+NO_DIFFICULTY = np.iinfo(np.int32).max
+
+# Column alignment in bytes
+ALIGNMENT = 8
+
+
+class SnapshotError(Exception):
+    """Raised when a snapshot file is missing, truncated or of another format."""
+
+
+def _pack(encode: Callable[[str], bytes], puzzle_id: int, value: str) -> bytes:
+    try:
+        return encode(value)
+    except ValueError as e:
+        logger.warning(f"Puzzle {puzzle_id} stored without packed data: {e}")
+        return b""
+
+
+def write_snapshot(path: Union[str, Path], rows: List[Dict[str, Any]]) -> int:
+    """
+    Write puzzle rows to a snapshot file.
+    
+    The file is written next to its destination and renamed into place, so
+    workers never map a partially written snapshot.
+    
+    Args:
+        path: Snapshot file
+        rows: Puzzle rows with id, difficulty, themes, fen and solution_moves
+        
+    Returns:
+        Number of puzzles written
+    """
+    rows = sorted(rows, key=lambda row: row["id"])
+    themes = ThemeRegistry()
+    positions = [_pack(encode_fen, row["id"], row["fen"]) for row in rows]
+    solutions = [_pack(encode_solution, row["id"], row.get("solution_moves") or "") for row in rows]
+    ids = np.array([row["id"] for row in rows], dtype=np.int64)
+    difficulties = np.array(
+        [NO_DIFFICULTY if row.get("difficulty") is None else row["difficulty"] for row in rows],
+        dtype=np.int32
+    )
+    
+    columns = {
+        "ids": ids,
+        "difficulties": difficulties,
+        "masks": np.array([themes.mask(row.get("themes")) for row in rows], dtype=np.uint64),
+        # Row numbers in listing order, so readers need not sort
+        "order": np.lexsort((ids, difficulties)).astype(np.int64),
+        "position_offsets": np.cumsum([0] + [len(position) for position in positions], dtype=np.uint64),
+        "positions": np.frombuffer(b"".join(positions), dtype=np.uint8),
+        "solution_offsets": np.cumsum([0] + [len(solution) for solution in solutions], dtype=np.uint64),
+        "solutions": np.frombuffer(b"".join(solutions), dtype=np.uint8)
+    }
+    
+    # Lay the columns out after the header, each aligned for direct mapping
+    layout = {}
+    metadata = {"count": len(rows), "themes": themes.names(), "columns": layout}
+    offset = 0
+    
+    for name, column in columns.items():
+        layout[name] = {"dtype": column.dtype.str, "offset": offset, "length": len(column)}
+        offset += -(-column.nbytes // ALIGNMENT) * ALIGNMENT
+    
+    # Column offsets are relative to the end of the padded metadata
+    encoded = json.dumps(metadata).encode()
+    encoded += b" " * (-(HEADER.size + len(encoded)) % ALIGNMENT)
+    
+    path = Path(path)
+    temporary = path.with_name(path.name + ".tmp")
+    
+    with temporary.open("wb") as handle:
+        handle.write(HEADER.pack(MAGIC, VERSION, len(encoded)))
+        handle.write(encoded)
+        
+        for name, column in columns.items():
+            handle.write(column.tobytes())
+            handle.write(b"\0" * (-column.nbytes % ALIGNMENT))
+    
+    os.replace(temporary, path)
+    return len(rows)
+
+
+class PuzzleSnapshot:
+    """
+    Read-only view of a snapshot file.
+    
+    The columns are NumPy arrays backed directly by the mapped file, so
+    nothing is copied when a snapshot is opened. The mapping is released
+    once the snapshot and every array taken from it are garbage collected.
+    """
+    
+    def __init__(self, path: Union[str, Path]):
+        """
+        Args:
+            path: Snapshot file
+            
+        Raises:
+            SnapshotError: If the file cannot be read as a snapshot
+        """
+        self.path = Path(path)
+        
+        try:
+            with self.path.open("rb") as handle:
+                self._mmap = mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError) as e:
+            raise SnapshotError(f"Cannot map puzzle snapshot {self.path}: {e}") from e
+        
+        try:
+            magic, version, metadata_size = HEADER.unpack_from(self._mmap, 0)
+            
+            if magic != MAGIC or version != VERSION:
+                raise SnapshotError(f"{self.path} is not a version {VERSION} puzzle snapshot")
+            
+            metadata = json.loads(self._mmap[HEADER.size:HEADER.size + metadata_size])
+            base = HEADER.size + metadata_size
+            self.count: int = metadata["count"]
+            self.theme_names: List[str] = metadata["themes"]
+            
+            columns = {
+                name: np.frombuffer(
+                    self._mmap,
+                    dtype=np.dtype(column["dtype"]),
+                    count=column["length"],
+                    offset=base + column["offset"]
+                )
+                for name, column in metadata["columns"].items()
+            }
+        except SnapshotError:
+            self._mmap.close()
+            raise
+        except (struct.error, ValueError, KeyError, TypeError) as e:
+            self._mmap.close()
+            raise SnapshotError(f"Corrupt puzzle snapshot {self.path}: {e}") from e
+        
+        self.ids: np.ndarray = columns["ids"]
+        self.difficulties: np.ndarray = columns["difficulties"]
+        self.masks: np.ndarray = columns["masks"]
+        self.order: np.ndarray = columns["order"]
+        self._position_offsets = columns["position_offsets"]
+        self._positions = columns["positions"]
+        self._solution_offsets = columns["solution_offsets"]
+        self._solutions = columns["solutions"]
+    
+    def __len__(self) -> int:
+        return self.count
+    
+    def _row(self, puzzle_id: int) -> Optional[int]:
+        row = int(np.searchsorted(self.ids, puzzle_id))
+        return row if row < self.count and self.ids[row] == puzzle_id else None
+    
+    @staticmethod
+    def _slice(blob: np.ndarray, offsets: np.ndarray, row: int) -> bytes:
+        return blob[offsets[row]:offsets[row + 1]].tobytes()
+    
+    def board(self, puzzle_id: int) -> Optional[chess.Board]:
+        """Get a puzzle's position, or None if it is not in the snapshot."""
+        row = self._row(puzzle_id)
+        data = None if row is None else self._slice(self._positions, self._position_offsets, row)
+        return decode_board(data) if data else None
+    
+    def fen(self, puzzle_id: int) -> Optional[str]:
+        """Get a puzzle's FEN, or None if it is not in the snapshot."""
+        board = self.board(puzzle_id)
+        return None if board is None else board.fen()
+    
+    def solution_moves(self, puzzle_id: int) -> Optional[str]:
+        """Get a puzzle's solution moves as UCI, or None if it is not in the snapshot."""
+        row = self._row(puzzle_id)
+        return None if row is None else decode_solution(self._slice(self._solutions, self._solution_offsets, row))
+
+
+async def _load_snapshot_rows() -> List[Dict[str, Any]]:
+    """Load every puzzle's snapshot columns, paging by ID."""
+    rows: List[Dict[str, Any]] = []
+    last_id = None
+    
+    while True:
+        filters = [] if last_id is None else [("id", "gt", last_id)]
+        page = await execute_query(
+            PUZZLES_TABLE,
+            lambda q: q.select("id,difficulty,themes,fen,solution_moves"),
+            filters=filters,
+            order=["id", False],
+            limit=LOAD_PAGE_SIZE
+        )
+        
+        rows.extend(page)
+        
+        if len(page) < LOAD_PAGE_SIZE:
+            return rows
+        
+        last_id = page[-1]["id"]
+
+
+async def build_snapshot(path: Union[str, Path]) -> int:
+    """
+    Write a snapshot of the puzzles table.
+    
+    Args:
+        path: Snapshot file
+        
+    Returns:
+        Number of puzzles written
+    """
+    return write_snapshot(path, await _load_snapshot_rows())
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    """Command line entry point."""
+    parser = argparse.ArgumentParser(description="Manage puzzle catalog snapshots")
+    commands = parser.add_subparsers(dest="command", required=True)
+    build = commands.add_parser("build", help="Write a snapshot of the puzzles table")
+    build.add_argument("path", help="Snapshot file")
+    args = parser.parse_args(argv)
+    
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+    )
+    
+    started = time.monotonic()
+    
+    try:
+        count = asyncio.run(build_snapshot(args.path))
+    finally:
+        close_query_executor()
+    
+    logger.info(f"Wrote {count} puzzles to {args.path} in {time.monotonic() - started:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
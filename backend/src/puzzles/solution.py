@@ -0,0 +1,126 @@
+from typing import Any, Dict, List, Optional
+import chess
+from src.puzzles.schemas import SolutionCheckResult
+
+# Accepted-move tree: solver move (UCI) -> {"reply": UCI or None, "then": subtree}
+SolutionTree = Dict[str, Any]
+
+
+def parse_move(board: chess.Board, move: str) -> Optional[chess.Move]:
+    """
+    Parse a move in UCI or SAN.
+    
+    Args:
+        board: Position the move is played in
+        move: Move text
+        
+    Returns:
+        Legal move, or None if the text is not a legal move
+    """
+    try:
+        parsed = chess.Move.from_uci(move)
+        return parsed if parsed in board.legal_moves else None
+    except ValueError:
+        pass
+    
+    try:
+        return board.parse_san(move)
+    except ValueError:
+        return None
+
+
+def solution_line_tree(solution_moves: str) -> SolutionTree:
+    """
+    Build the single-line tree of a stored solution.
+    
+    Args:
+        solution_moves: Space-separated UCI solution line
+        
+    Returns:
+        Tree accepting only the stored moves
+        
+    Raises:
+        ValueError: If a move is not valid UCI
+    """
+    moves = [chess.Move.from_uci(move).uci() for move in solution_moves.split()]
+    tree: SolutionTree = {}
+    
+    # Build from the last solver move backwards
+    for ply in reversed(range(0, len(moves), 2)):
+        reply = moves[ply + 1] if ply + 1 < len(moves) else None
+        tree = {moves[ply]: {"reply": reply, "then": tree}}
+    
+    return tree
+
+
+def check_solution(
+    fen: str,
+    solution_moves: str,
+    moves: List[str],
+    tree: Optional[SolutionTree] = None
+) -> SolutionCheckResult:
+    """
+    Check a solver's moves against a puzzle's accepted-move tree.
+    
+    The solver's moves are looked up in the puzzle's precomputed tree, or
+    in the stored solution line if it has none, and the opponent's replies
+    are played from the tree. Any move delivering checkmate is also
+    accepted, so alternative mates are correct. Uses python-chess only,
+    never the engine.
+    
+    Args:
+        fen: Puzzle position
+        solution_moves: Space-separated UCI solution line
+        moves: Solver's moves so far, in UCI or SAN
+        tree: Precomputed solution tree (see src/puzzles/solution_tree.py)
+        
+    Returns:
+        Check result
+        
+    Raises:
+        ValueError: If the puzzle's position, solution or tree is invalid
+    """
+    board = chess.Board(fen)
+    node = tree or solution_line_tree(solution_moves)
+    reply = None
+    complete = not node
+    
+    for index, text in enumerate(moves):
+        move = None if complete else parse_move(board, text)
+        entry = None if move is None else node.get(move.uci())
+        
+        if entry is None:
+            if move is None or not _gives_mate(board, move):
+                return SolutionCheckResult(correct=False, complete=False, failed_move=index, fen=board.fen())
+            
+            entry = {"reply": None, "then": {}}
+        
+        board.push(move)
+        node = entry.get("then") or {}
+        reply = None
+        
+        if entry.get("reply") and not board.is_game_over():
+            reply = chess.Move.from_uci(entry["reply"])
+            
+            if reply not in board.legal_moves:
+                raise ValueError(f"Illegal reply {reply.uci()} in puzzle solution")
+            
+            board.push(reply)
+        
+        complete = not node or board.is_game_over()
+    
+    return SolutionCheckResult(
+        correct=True,
+        complete=complete,
+        reply=reply.uci() if reply else None,
+        fen=board.fen()
+    )
+
+
+def _gives_mate(board: chess.Board, move: chess.Move) -> bool:
+    board.push(move)
+    
+    try:
+        return board.is_checkmate()
+    finally:
+        board.pop()
@@ -0,0 +1,261 @@
+"""
+Offline solution tree building.
+
+For each puzzle, runs one multipv analysis per solver move and stores the
+accepted-move tree in the puzzle's solution_tree column: the stored line
+plus the moves the engine rates as equivalent, each with its expected
+reply. Solution checks then accept those alternatives by tree lookup,
+without the engine (see src/puzzles/solution.py).
+
+The job starts its own engine pool of settings.ENGINE_POOL_SIZE engines,
+which the API server's scheduler does not see. By default it runs as
+many tasks as batch work may hold (all engines but one); on a host that
+also serves the API, lower --concurrency or ENGINE_POOL_SIZE.
+
+Usage:
+    python -m src.puzzles.solution_tree --concurrency 8
+"""
+import argparse
+import asyncio
+import logging
+import time
+from typing import Any, Dict, List, Optional, Tuple
+import chess
+import chess.engine
+from src.db.client import execute_query
+from src.puzzles.schemas import Puzzle, PuzzleUpdate
+from src.puzzles.service import PUZZLES_TABLE, update_puzzle
+from src.puzzles.solution import SolutionTree
+from src.utils.chess_engine import batch_concurrency, checkout_engine, close_engine, run_analysis, search_limit
+from src.utils.engine_pool import EnginePriority
+
+logger = logging.getLogger(__name__)
+
+# Default search depth per analysed position
+DEFAULT_DEPTH = 18
+
+# Default number of engine lines considered per solver move
+DEFAULT_MULTIPV = 3
+
+# Default centipawn distance from the best move within which a move is accepted
+DEFAULT_MARGIN = 50
+
+# Number of puzzles fetched per query
+PAGE_SIZE = 100
+
+
+def _equivalent_moves(analysis: List[dict], margin: int) -> List[Tuple[chess.Move, Optional[chess.Move]]]:
+    """
+    Select the engine lines that are as good as the best one.
+    
+    Against a forced mate only mates at least as short are equivalent;
+    otherwise any non-losing line within margin centipawns is.
+    
+    Returns:
+        List of (move, expected reply) pairs, best first
+    """
+    lines = [line for line in analysis if line["pv"]]
+    
+    if not lines:
+        return []
+    
+    best = lines[0]
+    
+    if best["mate"] is not None and best["mate"] > 0:
+        accepted = [line for line in lines if line["mate"] is not None and 0 < line["mate"] <= best["mate"]]
+    else:
+        accepted = [
+            line for line in lines
+            if (line["mate"] is None or line["mate"] > 0) and line["score"] >= best["score"] - margin
+        ]
+    
+    return [
+        (chess.Move.from_uci(line["pv"][0]), chess.Move.from_uci(line["pv"][1]) if len(line["pv"]) > 1 else None)
+        for line in accepted
+    ]
+
+
+async def build_solution_tree(
+    engine: chess.engine.UciProtocol,
+    board: chess.Board,
+    solution: List[chess.Move],
+    depth: int = DEFAULT_DEPTH,
+    multipv: int = DEFAULT_MULTIPV,
+    margin: int = DEFAULT_MARGIN
+) -> SolutionTree:
+    """
+    Build the accepted-move tree of a puzzle.
+    
+    The stored line is always accepted. At every solver move, engine lines
+    equivalent to the best one are added with the engine's expected reply
+    and explored to the same number of solver moves as the stored line.
+    
+    Args:
+        engine: Engine checked out from the pool
+        board: Puzzle position
+        solution: Stored solution line
+        depth: Search depth per position
+        multipv: Number of engine lines considered per solver move
+        margin: Centipawn margin for equivalent moves
+        
+    Returns:
+        Solution tree
+    """
+    limit = search_limit(depth=depth)
+    return await _build_node(engine, board.copy(), solution, (len(solution) + 1) // 2, limit, multipv, margin)
+
+
+async def _build_node(
+    engine: chess.engine.UciProtocol,
+    board: chess.Board,
+    line: List[chess.Move],
+    remaining: int,
+    limit: chess.engine.Limit,
+    multipv: int,
+    margin: int
+) -> SolutionTree:
+    # (move, reply, rest of the stored line, whether the move is stored)
+    candidates: List[Tuple[chess.Move, Optional[chess.Move], List[chess.Move], bool]] = []
+    
+    if line:
+        candidates.append((line[0], line[1] if len(line) > 1 else None, line[2:], True))
+    
+    analysis = await run_analysis(engine, board, limit, multipv)
+    
+    for move, reply in _equivalent_moves(analysis, margin):
+        if all(move != candidate[0] for candidate in candidates):
+            candidates.append((move, reply, [], False))
+    
+    node: SolutionTree = {}
+    
+    for move, reply, rest, stored in candidates:
+        board.push(move)
+        
+        if board.is_game_over():
+            node[move.uci()] = {"reply": None, "then": {}}
+        elif reply is None or reply not in board.legal_moves:
+            # Without an expected reply an alternative can only end the puzzle
+            if stored or remaining <= 1:
+                node[move.uci()] = {"reply": None, "then": {}}
+        elif remaining <= 1:
+            node[move.uci()] = {"reply": reply.uci(), "then": {}}
+        else:
+            board.push(reply)
+            subtree = await _build_node(engine, board, rest, remaining - 1, limit, multipv, margin)
+            node[move.uci()] = {"reply": reply.uci(), "then": subtree}
+            board.pop()
+        
+        board.pop()
+    
+    return node
+
+
+async def _build_for_puzzle(puzzle: Puzzle, depth: int, multipv: int, margin: int) -> bool:
+    try:
+        board = chess.Board(puzzle.fen)
+        solution = [chess.Move.from_uci(move) for move in puzzle.solution_moves.split()]
+    except ValueError as e:
+        logger.warning(f"Skipping puzzle {puzzle.id} with an invalid position or solution: {e}")
+        return False
+    
+    try:
+        async with checkout_engine(EnginePriority.BATCH) as engine:
+            tree = await build_solution_tree(engine, board, solution, depth, multipv, margin)
+        
+        return await update_puzzle(puzzle.id, PuzzleUpdate(solution_tree=tree)) is not None
+    except Exception as e:
+        logger.error(f"Error building solution tree for puzzle {puzzle.id}: {e}")
+        return False
+
+
+async def build_solution_trees(
+    rebuild: bool = False,
+    concurrency: Optional[int] = None,
+    depth: int = DEFAULT_DEPTH,
+    multipv: int = DEFAULT_MULTIPV,
+    margin: int = DEFAULT_MARGIN
+) -> Dict[str, Any]:
+    """
+    Build and store solution trees for all puzzles.
+    
+    Args:
+        rebuild: Also rebuild puzzles that already have a tree
+        concurrency: Number of puzzles analysed at once, defaults to the batch engine limit
+        depth: Search depth per position
+        multipv: Number of engine lines considered per solver move
+        margin: Centipawn margin for equivalent moves
+        
+    Returns:
+        Dictionary with the number of puzzles processed and built
+    """
+    semaphore = asyncio.Semaphore(concurrency or batch_concurrency())
+    stats = {"processed": 0, "built": 0}
+    last_id = 0
+    
+    async def build(puzzle: Puzzle) -> None:
+        async with semaphore:
+            built = await _build_for_puzzle(puzzle, depth, multipv, margin)
+        
+        stats["processed"] += 1
+        stats["built"] += built
+    
+    while True:
+        filters = [("id", "gt", last_id)]
+        
+        if not rebuild:
+            filters.append(("solution_tree", "is", "null"))
+        
+        page = await execute_query(
+            PUZZLES_TABLE,
+            lambda q: q.select("*"),
+            filters=filters,
+            order=["id", False],
+            limit=PAGE_SIZE
+        )
+        
+        puzzles = [Puzzle.model_validate(row) for row in page]
+        await asyncio.gather(*(build(puzzle) for puzzle in puzzles))
+        logger.info(f"Processed {stats['processed']} puzzles, {stats['built']} trees built")
+        
+        if len(page) < PAGE_SIZE:
+            return stats
+        
+        last_id = puzzles[-1].id
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    """Command line entry point."""
+    parser = argparse.ArgumentParser(description="Build accepted-move trees for puzzles")
+    parser.add_argument("--rebuild", action="store_true", help="Also rebuild existing trees")
+    parser.add_argument("--concurrency", type=int, default=batch_concurrency(), help="Puzzles analysed at once")
+    parser.add_argument("--depth", type=int, default=DEFAULT_DEPTH, help="Search depth per position")
+    parser.add_argument("--multipv", type=int, default=DEFAULT_MULTIPV, help="Engine lines per solver move")
+    parser.add_argument("--margin", type=int, default=DEFAULT_MARGIN, help="Centipawn margin for equivalent moves")
+    args = parser.parse_args(argv)
+    
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+    )
+    
+    async def run() -> Dict[str, Any]:
+        try:
+            return await build_solution_trees(
+                rebuild=args.rebuild,
+                concurrency=args.concurrency,
+                depth=args.depth,
+                multipv=args.multipv,
+                margin=args.margin
+            )
+        finally:
+            await close_engine()
+    
+    started = time.monotonic()
+    stats = asyncio.run(run())
+    logger.info(
+        f"Done: {stats['built']} of {stats['processed']} puzzles in {time.monotonic() - started:.1f}s"
+    )
+
+
+if __name__ == "__main__":
+    main()
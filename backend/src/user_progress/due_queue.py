@@ -0,0 +1,197 @@
+import heapq
+import logging
+from datetime import date
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+from src.core.config import settings
+from src.db.client import execute_query
+from src.utils.cache import LRUCache
+from src.utils.singleflight import SingleFlight
+
+logger = logging.getLogger(__name__)
+
+# Table name
+USER_PROGRESS_TABLE = "user_progress"
+
+# Loads up to `limit` (puzzle_id, next_review_date) pairs for a user, earliest first
+LoadFn = Callable[[str, int], Awaitable[List[Tuple[int, date]]]]
+
+
+class UserDueQueue:
+    """
+    Min-heap of one user's puzzles ordered by next review date.
+    
+    Only the ``limit`` earliest reviews are loaded. If the user has more,
+    ``horizon`` is the latest date loaded and reviews scheduled after it are
+    left to the next reload.
+    """
+    
+    def __init__(self, rows: List[Tuple[int, date]], limit: int):
+        self.heap: List[Tuple[date, int]] = []
+        self.scheduled: Dict[int, date] = {}
+        self.horizon: Optional[date] = rows[-1][1] if len(rows) >= limit else None
+        
+        for puzzle_id, review_date in rows:
+            self.scheduled[puzzle_id] = review_date
+            self.heap.append((review_date, puzzle_id))
+        
+        heapq.heapify(self.heap)
+    
+    def schedule(self, puzzle_id: int, review_date: Optional[date]) -> None:
+        """Record a puzzle's new review date (None to drop it)."""
+        if review_date is None or (self.horizon is not None and review_date > self.horizon):
+            self.scheduled.pop(puzzle_id, None)
+            return
+        
+        self.scheduled[puzzle_id] = review_date
+        heapq.heappush(self.heap, (review_date, puzzle_id))
+    
+    def due(self, count: int, today: date) -> List[int]:
+        """
+        Get up to count puzzles due on or before today, earliest first.
+        
+        Superseded heap entries are discarded lazily; the valid entries
+        popped are pushed back, so a call costs O(count log n).
+        """
+        due = []
+        
+        while self.heap and len(due) < count:
+            review_date, puzzle_id = self.heap[0]
+            
+            if self.scheduled.get(puzzle_id) != review_date or any(p == puzzle_id for _, p in due):
+                heapq.heappop(self.heap)
+                continue
+            
+            if review_date > today:
+                break
+            
+            due.append(heapq.heappop(self.heap))
+        
+        for entry in due:
+            heapq.heappush(self.heap, entry)
+        
+        return [puzzle_id for _, puzzle_id in due]
+
+
+async def _load_due_rows(user_id: str, limit: int) -> List[Tuple[int, date]]:
+    """
+    Load a user's earliest scheduled reviews.
+    
+    Served by the (user_id, next_review_date) index on user_progress.
+    """
+    rows = await execute_query(
+        USER_PROGRESS_TABLE,
+        lambda q: q.select("puzzle_id,next_review_date"),
+        filters=[("user_id", "eq", user_id), ("next_review_date", "not.is", "null")],
+        order=["next_review_date", False],
+        limit=limit
+    )
+    
+    return [(row["puzzle_id"], date.fromisoformat(row["next_review_date"])) for row in rows]
+
+
+class DueQueue:
+    """
+    In-process cache of per-user review queues.
+    
+    Queues are loaded on first use, refreshed after ``ttl`` seconds (which
+    bounds staleness between workers) and kept current by the progress
+    write path through schedule() and remove().
+    """
+    
+    def __init__(
+        self,
+        max_users: int,
+        ttl: float,
+        load_limit: int,
+        load_fn: LoadFn = _load_due_rows
+    ):
+        """
+        Args:
+            max_users: Maximum number of users whose queue is cached
+            ttl: Seconds before a user's queue is reloaded
+            load_limit: Maximum number of reviews loaded per user
+            load_fn: Function loading a user's earliest reviews
+        """
+        self.load_limit = load_limit
+        self.load_fn = load_fn
+        self._queues = LRUCache(maxsize=max_users, ttl=ttl)
+        self._loads = SingleFlight()
+        
+        # Writes made while a user's queue is loading, applied once it has loaded
+        self._pending: Dict[str, List[Tuple[int, Optional[date]]]] = {}
+    
+    async def _queue(self, user_id: str) -> UserDueQueue:
+        queue = self._queues.get(user_id)
+        
+        if queue is None:
+            queue = await self._loads.do(user_id, lambda: self._load(user_id))
+        
+        return queue
+    
+    async def _load(self, user_id: str) -> UserDueQueue:
+        pending = self._pending[user_id] = []
+        
+        try:
+            rows = await self.load_fn(user_id, self.load_limit)
+        finally:
+            del self._pending[user_id]
+        
+        queue = UserDueQueue(rows, self.load_limit)
+        
+        for puzzle_id, review_date in pending:
+            queue.schedule(puzzle_id, review_date)
+        
+        self._queues.set(user_id, queue)
+        return queue
+    
+    async def next_due(self, user_id: str, count: int, today: Optional[date] = None) -> List[int]:
+        """
+        Get the IDs of a user's next puzzles due for review.
+        
+        Args:
+            user_id: User ID
+            count: Maximum number of puzzles
+            today: Reference date, defaults to today
+            
+        Returns:
+            Puzzle IDs, most overdue first
+        """
+        queue = await self._queue(user_id)
+        return queue.due(count, today or date.today())
+    
+    def schedule(self, user_id: str, puzzle_id: int, review_date: Optional[date]) -> None:
+        """Update a cached or loading queue after a progress write."""
+        if user_id in self._pending:
+            self._pending[user_id].append((puzzle_id, review_date))
+        
+        queue = self._queues.get(user_id)
+        
+        if queue is not None:
+            queue.schedule(puzzle_id, review_date)
+    
+    def remove(self, user_id: str, puzzle_id: int) -> None:
+        """Drop a puzzle from a cached queue after its progress is deleted."""
+        self.schedule(user_id, puzzle_id, None)
+
+
+# Global due queue
+_due_queue: Optional[DueQueue] = None
+
+
+def get_due_queue() -> DueQueue:
+    """
+    Get or initialize the due review queue.
+    
+    Returns:
+        DueQueue instance
+    """
+    global _due_queue
+    
+    if _due_queue is None:
+        _due_queue = DueQueue(
+            max_users=settings.DUE_QUEUE_MAX_USERS,
+            ttl=settings.DUE_QUEUE_TTL_SECONDS,
+            load_limit=settings.DUE_QUEUE_LOAD_LIMIT
+        )
+    
+    return _due_queue
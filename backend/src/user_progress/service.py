@@ -1,7 +1,9 @@
 from typing import List, Optional, Dict, Any, Tuple
 import logging
 from datetime import datetime, date, timedelta
-from src.db.client import execute_query
+from src.db.client import execute_query, execute_rpc
+from src.puzzles.recommendation import record_attempt
+from src.user_progress.due_queue import get_due_queue
 from src.user_progress.schemas import (
     UserProgress,
     UserProgressCreate,
@@ -15,6 +17,10 @@ logger = logging.getLogger(__name__)
 # Table name
 USER_PROGRESS_TABLE = "user_progress"
 
+# Database functions (see supabase/migrations)
+RECORD_ATTEMPT_FUNCTION = "record_puzzle_attempt"
+USER_STATS_FUNCTION = "get_user_progress_stats"
+
 
 async def get_user_progress(
     user_id: str,
@@ -40,25 +46,19 @@ async def get_user_progress(
     if puzzle_id is not None:
         filters.append(("puzzle_id", "eq", puzzle_id))
     
-    # Get count first
-    count_result = await execute_query(
-        USER_PROGRESS_TABLE,
-        lambda q: q.select("count", count="exact"),
-        filters=filters
-    )
-    
-    total = count_result[0]["count"] if count_result else 0
-    
-    # Get progress entries
-    progress_data = await execute_query(
+    # Get progress entries and their total count in one request
+    progress_data, total = await execute_query(
         USER_PROGRESS_TABLE,
-        lambda q: q.select("*"),
+        lambda q: q.select("*", count="exact"),
         filters=filters,
         order=["updated_at", True],  # Order by updated_at descending
         limit=limit,
-        offset=offset
+        offset=offset,
+        return_count=True
     )
     
+    total = total or 0
+    
     # Convert to UserProgress objects
     progress_entries = [UserProgress.model_validate(entry) for entry in progress_data]
     
@@ -124,6 +124,10 @@ async def create_or_update_user_progress(
     """
     Create or update user progress for a puzzle.
     
+    Runs as a single atomic upsert on (user_id, puzzle_id) through the
+    record_puzzle_attempt database function, which applies the same
+    spaced repetition transition as calculate_next_review.
+    
     Args:
         user_id: User ID
         progress: Progress data
@@ -131,53 +135,28 @@ async def create_or_update_user_progress(
     Returns:
         Created or updated progress entry
     """
-    # Check if progress already exists for this user and puzzle
-    existing_progress = await get_user_progress_for_puzzle(user_id, progress.puzzle_id)
-    
-    if existing_progress:
-        # Update existing progress
-        update_data = progress.model_dump()
-        
-        # Calculate next review date using spaced repetition algorithm
-        next_review_date, ease_factor, interval = calculate_next_review(
-            existing_progress.ease_factor,
-            existing_progress.interval,
-            progress.solved
-        )
-        
-        update_data.update({
-            "next_review_date": next_review_date.isoformat(),
-            "ease_factor": ease_factor,
-            "interval": interval,
-            "updated_at": datetime.now().isoformat()
-        })
-        
-        result = await execute_query(
-            USER_PROGRESS_TABLE,
-            lambda q: q.update(update_data),
-            filters=[("id", "eq", existing_progress.id)]
-        )
-    else:
-        # Create new progress entry
-        create_data = progress.model_dump()
-        create_data.update({
-            "user_id": user_id,
-            "next_review_date": (date.today() + timedelta(days=1)).isoformat(),  # Default to tomorrow
-            "ease_factor": settings.DEFAULT_EASE_FACTOR,
-            "interval": settings.MIN_INTERVAL_DAYS,
-            "created_at": datetime.now().isoformat(),
-            "updated_at": datetime.now().isoformat()
-        })
-        
-        result = await execute_query(
-            USER_PROGRESS_TABLE,
-            lambda q: q.insert(create_data)
-        )
+    result = await execute_rpc(
+        RECORD_ATTEMPT_FUNCTION,
+        {
+            "p_user_id": user_id,
+            "p_puzzle_id": progress.puzzle_id,
+            "p_solved": progress.solved,
+            "p_time_taken": progress.time_taken,
+            "p_attempts": progress.attempts,
+            "p_default_ease_factor": settings.DEFAULT_EASE_FACTOR,
+            "p_min_interval": settings.MIN_INTERVAL_DAYS,
+            "p_max_interval": settings.MAX_INTERVAL_DAYS
+        }
+    )
     
     if not result:
         raise Exception("Failed to create or update user progress")
     
-    return UserProgress.model_validate(result[0])
+    entry = UserProgress.model_validate(result[0])
+    get_due_queue().schedule(user_id, entry.puzzle_id, entry.next_review_date)
+    record_attempt(user_id, entry.puzzle_id, progress.solved)
+    
+    return entry
 
 
 async def update_user_progress(
@@ -235,7 +214,13 @@ async def update_user_progress(
     if not result:
         return None
     
-    return UserProgress.model_validate(result[0])
+    entry = UserProgress.model_validate(result[0])
+    get_due_queue().schedule(user_id, entry.puzzle_id, entry.next_review_date)
+    
+    if "solved" in update_data:
+        record_attempt(user_id, entry.puzzle_id, update_data["solved"])
+    
+    return entry
 
 
 async def delete_user_progress(
@@ -264,6 +249,9 @@ async def delete_user_progress(
         filters=[("id", "eq", progress_id)]
     )
     
+    if result:
+        get_due_queue().remove(user_id, existing_progress.puzzle_id)
+    
     return bool(result)
 
 
@@ -271,34 +259,34 @@ async def get_user_progress_stats(user_id: str) -> UserProgressStats:
     """
     Get statistics about a user's progress.
     
+    Reads the per-user aggregates that a database trigger keeps up to date
+    on every progress write, so the cost does not depend on history size.
+    
     Args:
         user_id: User ID
         
     Returns:
         UserProgressStats object
     """
-    # Get all progress entries for the user
-    progress_entries, _ = await get_user_progress(user_id, limit=1000)
+    result = await execute_rpc(
+        USER_STATS_FUNCTION,
+        {"p_user_id": user_id, "p_today": date.today().isoformat()}
+    )
+    
+    aggregates = result[0] if result else {}
     
     # Calculate statistics
-    total_puzzles_attempted = len(progress_entries)
-    total_puzzles_solved = sum(1 for entry in progress_entries if entry.solved)
+    total_puzzles_attempted = aggregates.get("puzzles_attempted", 0)
+    total_puzzles_solved = aggregates.get("puzzles_solved", 0)
     
     success_rate = total_puzzles_solved / total_puzzles_attempted if total_puzzles_attempted > 0 else 0
     
     # Calculate average time and attempts
-    times = [entry.time_taken for entry in progress_entries if entry.time_taken is not None]
-    attempts = [entry.attempts for entry in progress_entries if entry.attempts is not None]
+    time_count = aggregates.get("time_taken_count", 0)
+    attempts_count = aggregates.get("attempts_count", 0)
     
-    average_time = sum(times) / len(times) if times else None
-    average_attempts = sum(attempts) / len(attempts) if attempts else None
-    
-    # Count puzzles due for review
-    today = date.today()
-    puzzles_due_for_review = sum(
-        1 for entry in progress_entries 
-        if entry.next_review_date is not None and entry.next_review_date <= today
-    )
+    average_time = aggregates["time_taken_sum"] / time_count if time_count else None
+    average_attempts = aggregates["attempts_sum"] / attempts_count if attempts_count else None
     
     return UserProgressStats(
         total_puzzles_solved=total_puzzles_solved,
@@ -306,7 +294,7 @@ async def get_user_progress_stats(user_id: str) -> UserProgressStats:
         success_rate=success_rate,
         average_time=average_time,
         average_attempts=average_attempts,
-        puzzles_due_for_review=puzzles_due_for_review
+        puzzles_due_for_review=aggregates.get("puzzles_due", 0)
     )
 
 
@@ -0,0 +1,154 @@
+import asyncio
+import json
+import logging
+import sqlite3
+import threading
+from typing import List, Optional, Tuple
+import chess
+from src.utils.cache import LRUCache
+from src.utils.chess_encoding import encode_board
+
+logger = logging.getLogger(__name__)
+
+# Cached entry: (depth, multipv, results)
+CacheEntry = Tuple[int, int, List[dict]]
+
+
+def position_key(board: chess.Board) -> bytes:
+    """
+    Get the normalized cache key of a position.
+    
+    The key covers piece placement, side to move, castling rights and the
+    en passant square, but not the move clocks, so transpositions reached
+    at different move numbers share an entry.
+    
+    Args:
+        board: Position
+        
+    Returns:
+        Position key
+    """
+    return encode_board(board, clocks=False)
+
+
+class AnalysisCache:
+    """
+    Two-tier cache of engine analysis results.
+    
+    Entries live in an in-memory LRU and, when a database path is given, in
+    a SQLite table that survives restarts. An entry analysed to a given depth
+    and number of PVs satisfies any request for an equal or smaller depth
+    and number of PVs.
+    """
+    
+    def __init__(self, maxsize: int, db_path: Optional[str] = None):
+        """
+        Args:
+            maxsize: Maximum number of positions kept in memory
+            db_path: SQLite database file for the persistent tier (optional)
+        """
+        self._memory = LRUCache(maxsize=maxsize)
+        self._db: Optional[sqlite3.Connection] = None
+        self._db_lock = threading.Lock()
+        
+        if db_path:
+            self._db = sqlite3.connect(db_path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS analysis ("
+                "key BLOB PRIMARY KEY, depth INTEGER NOT NULL, "
+                "multipv INTEGER NOT NULL, results TEXT NOT NULL)"
+            )
+            self._db.commit()
+            logger.info(f"Persistent analysis cache opened at {db_path}")
+    
+    @staticmethod
+    def _satisfies(entry: Optional[CacheEntry], depth: int, multipv: int) -> bool:
+        return entry is not None and entry[0] >= depth and entry[1] >= multipv
+    
+    def _read_db(self, key: bytes) -> Optional[CacheEntry]:
+        with self._db_lock:
+            row = self._db.execute(
+                "SELECT depth, multipv, results FROM analysis WHERE key = ?",
+                (key,)
+            ).fetchone()
+        
+        if row is None:
+            return None
+        
+        return row[0], row[1], json.loads(row[2])
+    
+    def _write_db(self, key: bytes, entry: CacheEntry) -> None:
+        with self._db_lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO analysis (key, depth, multipv, results) VALUES (?, ?, ?, ?)",
+                (key, entry[0], entry[1], json.dumps(entry[2]))
+            )
+            self._db.commit()
+    
+    async def get(self, board: chess.Board, depth: int, multipv: int) -> Optional[List[dict]]:
+        """
+        Look up analysis for a position.
+        
+        Args:
+            board: Position
+            depth: Minimum analysis depth required
+            multipv: Number of principal variations required
+            
+        Returns:
+            List of analysis results, or None on a miss
+        """
+        key = position_key(board)
+        entry = self._memory.get(key)
+        
+        if not self._satisfies(entry, depth, multipv) and self._db is not None:
+            try:
+                entry = await asyncio.to_thread(self._read_db, key)
+            except sqlite3.Error as e:
+                logger.error(f"Error reading analysis cache: {e}")
+                entry = None
+            
+            if entry is not None:
+                self._memory.set(key, entry)
+        
+        if not self._satisfies(entry, depth, multipv):
+            return None
+        
+        return [dict(result) for result in entry[2][:multipv]]
+    
+    async def put(self, board: chess.Board, depth: int, multipv: int, results: List[dict]) -> None:
+        """
+        Store analysis for a position unless a better entry is already cached.
+        
+        Args:
+            board: Position
+            depth: Depth the analysis was run to
+            multipv: Number of principal variations requested
+            results: List of analysis results
+        """
+        if not results:
+            return
+        
+        key = position_key(board)
+        
+        if self._satisfies(self._memory.get(key), depth, multipv):
+            return
+        
+        entry = (depth, multipv, results)
+        self._memory.set(key, entry)
+        
+        if self._db is not None:
+            try:
+                await asyncio.to_thread(self._write_db, key, entry)
+            except sqlite3.Error as e:
+                logger.error(f"Error writing analysis cache: {e}")
+    
+    def stats(self) -> dict:
+        """Get hit/miss counters of the in-memory tier."""
+        return self._memory.stats()
+    
+    def close(self) -> None:
+        """Close the persistent tier."""
+        if self._db is not None:
+            with self._db_lock:
+                self._db.close()
+            self._db = None
@@ -0,0 +1,100 @@
+import asyncio
+import logging
+from typing import Awaitable, Callable, Dict, Generic, Hashable, List, Optional, TypeVar
+
+logger = logging.getLogger(__name__)
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+
+class BatchLoader(Generic[K, V]):
+    """
+    DataLoader-style batching of individual key lookups.
+    
+    Keys requested within ``window`` seconds of each other are resolved by
+    one call to ``batch_fn``, which receives the distinct keys and returns a
+    mapping of the keys it found. Missing keys resolve to None.
+    """
+    
+    def __init__(
+        self,
+        batch_fn: Callable[[List[K]], Awaitable[Dict[K, V]]],
+        window: float = 0.002,
+        max_batch: int = 100
+    ):
+        """
+        Args:
+            batch_fn: Coroutine function resolving a list of keys
+            window: Seconds to wait for more keys before dispatching
+            max_batch: Maximum number of keys per batch
+        """
+        self.batch_fn = batch_fn
+        self.window = window
+        self.max_batch = max(1, max_batch)
+        self.batches = 0
+        self._pending: Dict[K, asyncio.Future] = {}
+        self._timer: Optional[asyncio.TimerHandle] = None
+    
+    async def load(self, key: K) -> Optional[V]:
+        """
+        Load a single key as part of the next batch.
+        
+        Args:
+            key: Key to load
+            
+        Returns:
+            Value if found, None otherwise
+        """
+        future = self._pending.get(key)
+        
+        if future is None:
+            loop = asyncio.get_running_loop()
+            future = loop.create_future()
+            self._pending[key] = future
+            
+            if len(self._pending) >= self.max_batch:
+                self._dispatch()
+            elif self._timer is None:
+                self._timer = loop.call_later(self.window, self._dispatch)
+        
+        return await asyncio.shield(future)
+    
+    async def load_many(self, keys: List[K]) -> List[Optional[V]]:
+        """
+        Load several keys, batched together with any concurrent loads.
+        
+        Args:
+            keys: Keys to load
+            
+        Returns:
+            Values in the order of keys, None for missing keys
+        """
+        return list(await asyncio.gather(*(self.load(key) for key in keys)))
+    
+    def _dispatch(self) -> None:
+        """Start resolving the pending keys."""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        
+        pending, self._pending = self._pending, {}
+        
+        if pending:
+            self.batches += 1
+            asyncio.ensure_future(self._resolve(pending))
+    
+    async def _resolve(self, pending: Dict[K, asyncio.Future]) -> None:
+        """Resolve a batch of futures with one batch_fn call."""
+        try:
+            values = await self.batch_fn(list(pending))
+        except Exception as e:
+            logger.error(f"Batch load of {len(pending)} keys failed: {e}")
+            for future in pending.values():
+                if not future.done():
+                    future.set_exception(e)
+            return
+        
+        for key, future in pending.items():
+            if not future.done():
+                future.set_result(values.get(key))
@@ -0,0 +1,211 @@
+"""
+Compact binary encoding of chess positions and moves.
+
+A position packs into at most 29 bytes instead of a FEN string of up to
+~90 characters:
+
+- 8-byte occupancy bitboard
+- 2-byte state: side to move, castling rights, en passant file and
+  whether move clocks follow
+- optionally a 1-byte halfmove clock and 2-byte fullmove number
+- one 4-bit piece code per occupied square, in square order
+
+A move packs into 16 bits: from square, to square and promotion piece.
+
+Packed positions key the analysis cache, and puzzle snapshots store
+packed positions and solutions. Puzzle rows in the database keep FEN and
+UCI text.
+"""
+import struct
+from typing import Iterable, List
+import chess
+
+# Occupancy bitboard and state word
+POSITION_HEADER = struct.Struct("<QH")
+
+# Halfmove clock and fullmove number
+POSITION_CLOCKS = struct.Struct("<BH")
+
+# State word bits
+_WHITE_TO_MOVE = 1
+_CASTLING_SHIFT = 1
+_EP_SHIFT = 5
+_HAS_CLOCKS = 1 << 9
+
+# Castling rook squares in state bit order
+_CASTLING_SQUARES = (chess.H1, chess.A1, chess.H8, chess.A8)
+
+# Piece codes: piece type for white, piece type + 8 for black
+_BLACK = 8
+
+
+def encode_board(board: chess.Board, clocks: bool = True) -> bytes:
+    """
+    Pack a position.
+    
+    The en passant square is only kept when an en passant capture is
+    legal, as in the board's FEN.
+    
+    Args:
+        board: Position
+        clocks: Whether to include the halfmove clock and fullmove number
+        
+    Returns:
+        Packed position
+        
+    Raises:
+        ValueError: If the position has non-standard (Chess960) castling rights
+    """
+    castling_rights = board.clean_castling_rights()
+    
+    if castling_rights & ~chess.BB_CORNERS:
+        raise ValueError("Only standard castling rights can be encoded")
+    
+    state = _WHITE_TO_MOVE if board.turn == chess.WHITE else 0
+    
+    for bit, square in enumerate(_CASTLING_SQUARES):
+        if castling_rights & chess.BB_SQUARES[square]:
+            state |= 1 << (_CASTLING_SHIFT + bit)
+    
+    if board.ep_square is not None and board.has_legal_en_passant():
+        state |= (chess.square_file(board.ep_square) + 1) << _EP_SHIFT
+    
+    if clocks:
+        state |= _HAS_CLOCKS
+    
+    data = bytearray(POSITION_HEADER.pack(board.occupied, state))
+    
+    if clocks:
+        data += POSITION_CLOCKS.pack(min(board.halfmove_clock, 255), min(board.fullmove_number, 65535))
+    
+    codes = [
+        board.piece_type_at(square) | (0 if board.occupied_co[chess.WHITE] & chess.BB_SQUARES[square] else _BLACK)
+        for square in chess.scan_forward(board.occupied)
+    ]
+    
+    if len(codes) % 2:
+        codes.append(0)
+    
+    data += bytes(codes[i] | codes[i + 1] << 4 for i in range(0, len(codes), 2))
+    return bytes(data)
+
+
+def decode_board(data: bytes) -> chess.Board:
+    """
+    Unpack a position produced by encode_board.
+    
+    Args:
+        data: Packed position
+        
+    Returns:
+        Board with the packed position
+        
+    Raises:
+        ValueError: If the data is not a valid packed position
+    """
+    try:
+        occupied, state = POSITION_HEADER.unpack_from(data)
+        offset = POSITION_HEADER.size
+        halfmove_clock, fullmove_number = 0, 1
+        
+        if state & _HAS_CLOCKS:
+            halfmove_clock, fullmove_number = POSITION_CLOCKS.unpack_from(data, offset)
+            offset += POSITION_CLOCKS.size
+    except struct.error as e:
+        raise ValueError(f"Truncated packed position: {e}") from e
+    
+    squares = list(chess.scan_forward(occupied))
+    
+    if len(data) - offset != (len(squares) + 1) // 2:
+        raise ValueError("Packed position length does not match its occupancy")
+    
+    pieces = {}
+    
+    for i, square in enumerate(squares):
+        code = data[offset + i // 2] >> (4 * (i % 2)) & 0x0F
+        piece_type = code & ~_BLACK
+        
+        if not chess.PAWN <= piece_type <= chess.KING:
+            raise ValueError(f"Invalid piece code {code}")
+        
+        pieces[square] = chess.Piece(piece_type, chess.BLACK if code & _BLACK else chess.WHITE)
+    
+    board = chess.Board(None)
+    board.set_piece_map(pieces)
+    board.turn = bool(state & _WHITE_TO_MOVE)
+    board.castling_rights = 0
+    
+    for bit, square in enumerate(_CASTLING_SQUARES):
+        if state & 1 << (_CASTLING_SHIFT + bit):
+            board.castling_rights |= chess.BB_SQUARES[square]
+    
+    ep_file = state >> _EP_SHIFT & 0x0F
+    
+    if ep_file:
+        board.ep_square = chess.square(ep_file - 1, 5 if board.turn == chess.WHITE else 2)
+    
+    board.halfmove_clock = halfmove_clock
+    board.fullmove_number = fullmove_number
+    return board
+
+
+def encode_fen(fen: str, clocks: bool = True) -> bytes:
+    """Pack a position given as FEN."""
+    return encode_board(chess.Board(fen), clocks=clocks)
+
+
+def decode_fen(data: bytes) -> str:
+    """Unpack a position to FEN."""
+    return decode_board(data).fen()
+
+
+def encode_move(move: chess.Move) -> int:
+    """
+    Pack a move into 16 bits.
+    
+    Args:
+        move: Move
+        
+    Returns:
+        from_square | to_square << 6 | promotion << 12
+    """
+    return move.from_square | move.to_square << 6 | (move.promotion or 0) << 12
+
+
+def decode_move(code: int) -> chess.Move:
+    """Unpack a move produced by encode_move."""
+    return chess.Move(code & 0x3F, code >> 6 & 0x3F, code >> 12 or None)
+
+
+def encode_moves(moves: Iterable[chess.Move]) -> bytes:
+    """Pack a sequence of moves, two bytes each."""
+    codes = [encode_move(move) for move in moves]
+    return struct.pack(f"<{len(codes)}H", *codes)
+
+
+def decode_moves(data: bytes) -> List[chess.Move]:
+    """
+    Unpack a sequence of moves produced by encode_moves.
+    
+    Raises:
+        ValueError: If the data length is odd
+    """
+    if len(data) % 2:
+        raise ValueError("Packed moves must be a whole number of 16-bit codes")
+    
+    return [decode_move(code) for code in struct.unpack(f"<{len(data) // 2}H", data)]
+
+
+def encode_solution(solution_moves: str) -> bytes:
+    """
+    Pack a space-separated UCI solution line.
+    
+    Raises:
+        ValueError: If a move is not valid UCI
+    """
+    return encode_moves(chess.Move.from_uci(move) for move in solution_moves.split())
+
+
+def decode_solution(data: bytes) -> str:
+    """Unpack a solution line to space-separated UCI."""
+    return " ".join(move.uci() for move in decode_moves(data))
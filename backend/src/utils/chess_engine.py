@@ -1,56 +1,520 @@
+import asyncio
 import logging
-from typing import List, Optional, Tuple
+import time
+from typing import AsyncContextManager, AsyncIterator, Awaitable, List, Optional, Tuple, TypeVar
 import chess
 import chess.engine
-import asyncio
-import os
-from pathlib import Path
+from src.core.config import settings
+from src.utils.analysis_cache import AnalysisCache, position_key
+from src.utils.engine_pool import EnginePool, EnginePoolError, EnginePriority, EngineTimeoutError
+from src.utils.singleflight import SingleFlight
 
 logger = logging.getLogger(__name__)
 
 # Path to Stockfish engine
 # This assumes Stockfish is installed and available in the system PATH
 # In a production environment, you might want to include Stockfish with your application
-STOCKFISH_PATH = os.environ.get("STOCKFISH_PATH", "stockfish")
+STOCKFISH_PATH = settings.STOCKFISH_PATH
+
+# Score used when the engine does not report one
+NO_SCORE = chess.engine.PovScore(chess.engine.Cp(0), chess.WHITE)
+
+# Global engine pool
+_engine_pool: Optional[EnginePool] = None
+
+# Global analysis cache
+_analysis_cache: Optional[AnalysisCache] = None
+
+# Concurrent requests for the same analysis share one engine search
+_analysis_flight = SingleFlight()
+
+# Background task pinging idle engines
+_supervisor: Optional[asyncio.Task] = None
+
+# Counters of adaptive analyses and the engine time they saved
+_adaptive_stats = {
+    "searches": 0,
+    "stopped_early": 0,
+    "time_spent": 0.0,
+    "time_saved": 0.0,
+    "depths_saved": 0
+}
+
+T = TypeVar("T")
+
+
+def _class_limit(limit: int) -> int:
+    """Resolve an engine limit setting, where 0 means all engines but one."""
+    return limit or max(1, settings.ENGINE_POOL_SIZE - 1)
+
+
+def batch_concurrency() -> int:
+    """
+    Get the number of engines batch work may hold at once.
+    
+    Used as the default concurrency of the offline CLI jobs, which start
+    their own engine pool of settings.ENGINE_POOL_SIZE engines outside the
+    API server's scheduler.
+    
+    Returns:
+        Batch engine limit
+    """
+    return min(_class_limit(settings.ENGINE_BATCH_LIMIT), _class_limit(settings.ENGINE_NON_INTERACTIVE_LIMIT))
+    
+
+def get_engine_pool() -> EnginePool:
+    """
+    Get or initialize the chess engine pool.
+    
+    Engine processes are started lazily on first checkout. Unless
+    configured otherwise, background and batch work together may hold all
+    engines but one, keeping an engine free for interactive move feedback.
+    
+    Returns:
+        Chess engine pool
+    """
+    global _engine_pool
+    
+    if _engine_pool is None:
+        _engine_pool = EnginePool(
+            STOCKFISH_PATH,
+            size=settings.ENGINE_POOL_SIZE,
+            max_queue=settings.ENGINE_MAX_QUEUE,
+            acquire_timeout=settings.ENGINE_QUEUE_TIMEOUT_SECONDS,
+            limits={
+                EnginePriority.BACKGROUND: _class_limit(settings.ENGINE_BACKGROUND_LIMIT),
+                EnginePriority.BATCH: _class_limit(settings.ENGINE_BATCH_LIMIT)
+            },
+            shared_limit=_class_limit(settings.ENGINE_NON_INTERACTIVE_LIMIT),
+            ping_interval=settings.ENGINE_PING_INTERVAL_SECONDS,
+            ping_timeout=settings.ENGINE_PING_TIMEOUT_SECONDS,
+            start_timeout=settings.ENGINE_START_TIMEOUT_SECONDS,
+            options={
+                "Threads": settings.ENGINE_THREADS,
+                "Hash": settings.ENGINE_HASH_MB,
+                "Skill Level": settings.ENGINE_SKILL_LEVEL
+            }
+        )
+        logger.info(f"Chess engine pool initialized (size {_engine_pool.size})")
+    
+    return _engine_pool
+
 
-# Global engine instance
-_engine = None
+def checkout_engine(priority: EnginePriority) -> AsyncContextManager[chess.engine.UciProtocol]:
+    """
+    Check out a pooled engine for a class of work.
+    
+    Interactive work waits at most settings.ENGINE_INTERACTIVE_BUDGET_SECONDS
+    and is served before queued background and batch work; batch jobs wait
+    up to settings.ENGINE_BATCH_TIMEOUT_SECONDS.
+    
+    Args:
+        priority: Work class
+        
+    Returns:
+        Async context manager yielding the engine
+        
+    Raises:
+        EnginePoolError: If no engine is available in time (on entry)
+    """
+    timeouts = {
+        EnginePriority.INTERACTIVE: settings.ENGINE_INTERACTIVE_BUDGET_SECONDS,
+        EnginePriority.BACKGROUND: settings.ENGINE_QUEUE_TIMEOUT_SECONDS,
+        EnginePriority.BATCH: settings.ENGINE_BATCH_TIMEOUT_SECONDS
+    }
+    return get_engine_pool().engine(timeouts[priority], priority)
 
 
-async def get_engine():
+def get_analysis_cache() -> AnalysisCache:
     """
-    Get or initialize the chess engine.
+    Get or initialize the position analysis cache.
     
     Returns:
-        Chess engine instance
+        Analysis cache
+    """
+    global _analysis_cache
+    
+    if _analysis_cache is None:
+        _analysis_cache = AnalysisCache(
+            maxsize=settings.ANALYSIS_CACHE_SIZE,
+            db_path=settings.ANALYSIS_CACHE_DB_PATH or None
+        )
+    
+    return _analysis_cache
+
+
+async def start_engines() -> None:
+    """
+    Warm up the engine pool and start supervising it.
+    
+    Starts settings.ENGINE_WARMUP_COUNT engines so the first requests do
+    not pay for process startup, and a background task that pings idle
+    engines every settings.ENGINE_PING_INTERVAL_SECONDS, replacing those
+    that do not answer.
+    
+    Raises:
+        EnginePoolError: If a warm-up engine fails to start
     """
-    global _engine
+    global _supervisor
     
-    if _engine is None:
+    if _supervisor is None:
+        _supervisor = asyncio.create_task(_supervise_engines())
+    
+    if settings.ENGINE_WARMUP_COUNT:
+        started = await get_engine_pool().warm_up(settings.ENGINE_WARMUP_COUNT)
+        logger.info(f"Warmed up {started} chess engine(s)")
+
+
+async def _supervise_engines() -> None:
+    """Periodically ping idle engines and restore the warm-up count."""
+    while True:
+        await asyncio.sleep(settings.ENGINE_PING_INTERVAL_SECONDS)
+        
+        if _engine_pool is None:
+            continue
+        
         try:
-            # Check if Stockfish is available
-            if not Path(STOCKFISH_PATH).exists() and "stockfish" not in STOCKFISH_PATH:
-                logger.warning(f"Stockfish not found at {STOCKFISH_PATH}. Chess engine features will be limited.")
-                return None
-            
-            # Initialize engine
-            _engine = await chess.engine.popen_uci(STOCKFISH_PATH)
-            logger.info(f"Chess engine initialized: {_engine.id['name']}")
+            if await _engine_pool.check_idle() and settings.ENGINE_WARMUP_COUNT:
+                await _engine_pool.warm_up(settings.ENGINE_WARMUP_COUNT)
         except Exception as e:
-            logger.error(f"Failed to initialize chess engine: {e}")
-            return None
+            logger.error(f"Error checking chess engines: {e}")
+            
+    
+async def _call_engine(call: Awaitable[T], seconds: float) -> T:
+    """
+    Await an engine call with a hard wall-clock timeout.
+    
+    Raises:
+        EngineTimeoutError: If the call overruns; the engine is then
+            discarded when its checkout ends
+    """
+    try:
+        return await asyncio.wait_for(call, timeout=seconds)
+    except asyncio.TimeoutError as e:
+        raise EngineTimeoutError(f"Chess engine did not answer within {seconds:.1f}s") from e
+
+
+def _remaining(deadline: float) -> float:
+    """Seconds left until a time.monotonic() deadline."""
+    return max(0.0, deadline - time.monotonic())
+
+
+def search_limit(
+    time: Optional[float] = None,
+    depth: Optional[int] = None,
+    nodes: Optional[int] = None
+) -> chess.engine.Limit:
+    """
+    Build a search limit from a budget.
     
-    return _engine
+    The engine stops at whichever bound is reached first. Unset or zero
+    bounds are left out, and settings.ENGINE_MAX_NODES caps every search.
+    
+    Args:
+        time: Time limit in seconds
+        depth: Depth limit
+        nodes: Node limit
+        
+    Returns:
+        Search limit
+    """
+    node_limits = [limit for limit in (nodes, settings.ENGINE_MAX_NODES) if limit]
+    
+    return chess.engine.Limit(
+        time=time or None,
+        depth=depth or None,
+        nodes=min(node_limits) if node_limits else None
+    )
+
+
+def _hard_timeout(limit: chess.engine.Limit) -> float:
+    """Wall-clock timeout for a search: its time limit plus a grace period, or the default."""
+    if limit.time is not None:
+        return limit.time + settings.ENGINE_TIMEOUT_GRACE_SECONDS
+    
+    return settings.ENGINE_CALL_TIMEOUT_SECONDS
 
 
 async def close_engine():
-    """Close the chess engine."""
-    global _engine
+    """Stop engine supervision and close all chess engines in the pool and the analysis cache."""
+    global _engine_pool, _analysis_cache, _supervisor
+    
+    if _supervisor is not None:
+        _supervisor.cancel()
+        
+        try:
+            await _supervisor
+        except asyncio.CancelledError:
+            pass
+        
+        _supervisor = None
+    
+    if _engine_pool is not None:
+        await _engine_pool.close()
+        _engine_pool = None
+        logger.info("Chess engine pool closed")
+    
+    if _analysis_cache is not None:
+        _analysis_cache.close()
+        _analysis_cache = None
+
+
+async def run_analysis(
+    engine: chess.engine.UciProtocol,
+    board: chess.Board,
+    limit: chess.engine.Limit,
+    multipv: int
+) -> List[dict]:
+    """
+    Run a multipv analysis on a checked-out engine and format the results.
+    
+    Args:
+        engine: Engine checked out from the pool
+        board: Position to analyze
+        limit: Search limit
+        multipv: Number of principal variations to calculate
+        
+    Returns:
+        List of analysis results
+        
+    Raises:
+        EngineTimeoutError: If the engine overruns the search limit
+    """
+    analysis = await _call_engine(
+        engine.analyse(
+            board,
+            limit,
+            multipv=multipv,
+            info=chess.engine.INFO_ALL
+        ),
+        _hard_timeout(limit)
+    )
     
-    if _engine is not None:
-        await _engine.quit()
-        _engine = None
-        logger.info("Chess engine closed")
+    # Format results
+    return [_format_info(board, pv) for pv in analysis]
+
+
+async def run_adaptive_analysis(
+    engine: chess.engine.UciProtocol,
+    board: chess.Board,
+    limit: chess.engine.Limit,
+    multipv: int
+) -> Tuple[List[dict], bool]:
+    """
+    Run a multipv analysis that stops once its result has settled.
+    
+    The engine's info is watched depth by depth, and the search is stopped
+    before the limit once a mate is found, or once the best move has been
+    the same and its score within settings.ADAPTIVE_SCORE_MARGIN for
+    settings.ADAPTIVE_STABLE_DEPTHS depths, from settings.ADAPTIVE_MIN_DEPTH
+    on. With settings.ADAPTIVE_ANALYSIS_ENABLED off this is run_analysis.
+    
+    Args:
+        engine: Engine checked out from the pool
+        board: Position to analyze
+        limit: Search limit
+        multipv: Number of principal variations to calculate
+        
+    Returns:
+        Tuple of (analysis results of the last complete depth, whether the
+        search was stopped early because the result settled)
+        
+    Raises:
+        EngineTimeoutError: If the engine overruns the search limit
+    """
+    expected = min(multipv, board.legal_moves.count())
+    
+    if not settings.ADAPTIVE_ANALYSIS_ENABLED or expected == 0:
+        return await run_analysis(engine, board, limit, multipv), False
+    
+    started = time.monotonic()
+    deadline = started + _hard_timeout(limit)
+    lines = {}
+    results: List[dict] = []
+    best_move, best_score, stable, counted_depth = None, 0, 0, 0
+    settled = False
+    
+    # One deadline covers the whole search, not each info line
+    analysis = await _call_engine(
+        engine.analysis(board, limit, multipv=multipv, info=chess.engine.INFO_ALL),
+        _remaining(deadline)
+    )
+    
+    with analysis:
+        while True:
+            try:
+                info = await _call_engine(analysis.get(), _remaining(deadline))
+            except chess.engine.AnalysisComplete:
+                break
+            
+            # Bound lines come from aspiration re-searches and are not final
+            if "pv" not in info or info.get("lowerbound") or info.get("upperbound"):
+                continue
+            
+            # Lines arrive in multipv order; the last one completes a depth
+            lines[info.get("multipv", 1)] = info
+            
+            if len(lines) < expected or info.get("multipv", 1) != expected:
+                continue
+            
+            results = [_format_info(board, lines[index]) for index in sorted(lines)]
+            best = results[0]
+            move = best["pv"][0] if best["pv"] else None
+            
+            # Stability is counted once per completed depth
+            if best["depth"] <= counted_depth:
+                continue
+            
+            counted_depth = best["depth"]
+            
+            if move == best_move and abs(best["score"] - best_score) <= settings.ADAPTIVE_SCORE_MARGIN:
+                stable += 1
+            else:
+                stable = 1
+            
+            best_move, best_score = move, best["score"]
+            
+            if best["mate"] is not None or (
+                stable >= settings.ADAPTIVE_STABLE_DEPTHS and best["depth"] >= settings.ADAPTIVE_MIN_DEPTH
+            ):
+                settled = True
+                analysis.stop()
+                break
+    
+    # A search cut short by its limit mid-depth still returns its lines
+    if not results and lines:
+        results = [_format_info(board, lines[index]) for index in sorted(lines)]
+    
+    elapsed = time.monotonic() - started
+    _adaptive_stats["searches"] += 1
+    _adaptive_stats["time_spent"] += elapsed
+    
+    if settled:
+        _adaptive_stats["stopped_early"] += 1
+        
+        if limit.time is not None:
+            _adaptive_stats["time_saved"] += max(0.0, limit.time - elapsed)
+        
+        if limit.depth is not None:
+            _adaptive_stats["depths_saved"] += max(0, limit.depth - results[0]["depth"])
+    
+    return results, settled
+
+
+def get_adaptive_stats() -> dict:
+    """
+    Get counters of adaptive analyses.
+    
+    Returns:
+        Dictionary with the number of searches, how many stopped early,
+        the engine time spent and saved in seconds (savings are only known
+        for time-limited searches) and the depths saved
+    """
+    return dict(_adaptive_stats)
+
+
+def _format_info(board: chess.Board, pv: chess.engine.InfoDict) -> dict:
+    """Format one engine line as an analysis result."""
+    # Get the principal variation (sequence of moves)
+    moves = []
+    if "pv" in pv:
+        for move in pv["pv"]:
+            moves.append(board.san(move))
+            board.push(move)
+        
+        # Reset board
+        for _ in range(len(moves)):
+            board.pop()
+    
+    return {
+        "score": pv.get("score", NO_SCORE).relative.score(mate_score=10000),
+        "mate": pv.get("score", NO_SCORE).relative.mate(),
+        "depth": pv.get("depth", 0),
+        "nodes": pv.get("nodes", 0),
+        "time": pv.get("time", 0),
+        "moves": moves,
+        "pv": [move.uci() for move in pv.get("pv", [])]
+    }
+
+
+async def stream_analysis(
+    fen: str,
+    depth: int = 20,
+    multipv: int = 3,
+    time_limit: float = 10.0
+) -> AsyncIterator[List[dict]]:
+    """
+    Analyze a position, yielding the lines found at each completed depth.
+    
+    A cached analysis of at least the requested depth is yielded once
+    instead. Closing the iterator early stops the search and returns the
+    engine to the pool; the deepest complete result is cached otherwise.
+    
+    Args:
+        fen: FEN notation of the position
+        depth: Maximum analysis depth
+        multipv: Number of principal variations to calculate
+        time_limit: Time limit in seconds
+        
+    Returns:
+        Async iterator of analysis result lists, deepest last
+        
+    Raises:
+        ValueError: If the FEN is invalid
+        EnginePoolError: If no engine is available or it stops answering
+    """
+    board = chess.Board(fen)
+    expected = min(multipv, board.legal_moves.count())
+    
+    if expected == 0:
+        return
+    
+    cache = get_analysis_cache()
+    cached = await cache.get(board, depth, multipv)
+    
+    if cached is not None:
+        yield cached
+        return
+    
+    limit = search_limit(time_limit, depth, settings.ANALYSIS_NODES)
+    lines = {}
+    results = []
+    
+    async with checkout_engine(EnginePriority.BACKGROUND) as engine:
+        # One deadline covers the whole search, not each info line
+        deadline = time.monotonic() + _hard_timeout(limit)
+        analysis = await _call_engine(
+            engine.analysis(board, limit, multipv=multipv, info=chess.engine.INFO_ALL),
+            _remaining(deadline)
+        )
+        
+        with analysis:
+            while True:
+                try:
+                    info = await _call_engine(analysis.get(), _remaining(deadline))
+                except chess.engine.AnalysisComplete:
+                    break
+                
+                # Bound lines come from aspiration re-searches and are not final
+                if "pv" not in info or info.get("lowerbound") or info.get("upperbound"):
+                    continue
+                
+                # Lines arrive in multipv order; the last one completes a depth.
+                # analysis.multipv may already hold deeper lines read ahead.
+                lines[info.get("multipv", 1)] = info
+                
+                if len(lines) < expected or info.get("multipv", 1) != expected:
+                    continue
+                
+                # Each depth is sent once
+                current = [_format_info(board, lines[index]) for index in sorted(lines)]
+                
+                if not results or current[0]["depth"] > results[0]["depth"]:
+                    results = current
+                    yield results
+    
+    if results:
+        await cache.put(board, results[0]["depth"], multipv, results)
 
 
 async def analyze_position(
@@ -62,65 +526,74 @@ async def analyze_position(
     """
     Analyze a chess position using the engine.
     
+    Results are served from the analysis cache when the position has
+    already been analysed at least as deeply, and concurrent requests for
+    the same analysis share a single engine search.
+    
     Args:
         fen: FEN notation of the position
-        depth: Analysis depth
+        depth: Maximum analysis depth
         multipv: Number of principal variations to calculate
         time_limit: Time limit in seconds
         
     Returns:
         List of analysis results
     """
-    engine = await get_engine()
-    
-    if engine is None:
-        logger.warning("Chess engine not available for analysis")
-        return []
-    
     try:
         board = chess.Board(fen)
+        cache = get_analysis_cache()
         
-        # Set up analysis with time limit and multipv
-        limit = chess.engine.Limit(time=time_limit)
+        cached = await cache.get(board, depth, multipv)
+        if cached is not None:
+            return cached
         
-        # Run analysis
-        analysis = await engine.analyse(
-            board,
-            limit,
-            multipv=multipv,
-            info=chess.engine.INFO_ALL
+        key = (position_key(board), depth, multipv, time_limit)
+        return await _analysis_flight.do(
+            key,
+            lambda: _analyze_uncached(board, depth, multipv, time_limit)
         )
-        
-        # Format results
-        results = []
-        for pv in analysis:
-            # Get the principal variation (sequence of moves)
-            moves = []
-            if "pv" in pv:
-                for move in pv["pv"]:
-                    moves.append(board.san(move))
-                    board.push(move)
-                
-                # Reset board
-                for _ in range(len(moves)):
-                    board.pop()
-            
-            # Add result
-            results.append({
-                "score": pv.get("score", chess.engine.Score(0)).relative.score(mate_score=10000),
-                "mate": pv.get("score", chess.engine.Score(0)).relative.mate(),
-                "depth": pv.get("depth", 0),
-                "nodes": pv.get("nodes", 0),
-                "time": pv.get("time", 0),
-                "moves": moves
-            })
-        
-        return results
+    except EnginePoolError as e:
+        logger.warning(f"Chess engine not available for analysis: {e}")
+        return []
     except Exception as e:
         logger.error(f"Error analyzing position: {e}")
         return []
 
 
+async def _analyze_uncached(
+    board: chess.Board,
+    depth: int,
+    multipv: int,
+    time_limit: float
+) -> List[dict]:
+    """
+    Analyze a position on a pooled engine and cache the results.
+    
+    Args:
+        board: Position to analyze
+        depth: Maximum analysis depth
+        multipv: Number of principal variations to calculate
+        time_limit: Time limit in seconds
+        
+    Returns:
+        List of analysis results
+    """
+    # Stop at the time limit, the depth or the node budget, whichever comes first
+    limit = search_limit(time_limit, depth, settings.ANALYSIS_NODES)
+    
+    # Run analysis on a pooled engine, stopping early once it has settled
+    async with checkout_engine(EnginePriority.BACKGROUND) as engine:
+        results, settled = await run_adaptive_analysis(engine, board, limit, multipv)
+    
+    # A settled result answers the depth requested, so repeats of the same
+    # request hit the cache while deeper ones search again; otherwise cache
+    # under the depth reached, which the time limit may cut short
+    if results:
+        await get_analysis_cache().put(board, depth if settled else min(depth, results[0]["depth"]), multipv, results)
+    
+    return results
+
+
 async def validate_move(
     fen: str,
     move: str
@@ -135,40 +608,52 @@ async def validate_move(
     Returns:
         Tuple of (is_valid, evaluation)
     """
+    # Check if move is valid
     try:
         board = chess.Board(fen)
+        chess_move = chess.Move.from_uci(move)
+    except ValueError:
+        return False, None
         
-        # Check if move is valid
-        try:
-            chess_move = chess.Move.from_uci(move)
-            is_valid = chess_move in board.legal_moves
-        except ValueError:
-            return False, None
+    if chess_move not in board.legal_moves:
+        return False, None
         
-        if not is_valid:
-            return False, None
+    # Make the move
+    board.push(chess_move)
         
-        # Make the move
-        board.push(chess_move)
+    # Analyze position after move; engine faults only lose the evaluation
+    return True, await evaluate_position(board)
         
-        # Get evaluation
-        engine = await get_engine()
         
-        if engine is None:
-            logger.warning("Chess engine not available for move validation")
-            return True, None
+async def evaluate_position(board: chess.Board, time_limit: Optional[float] = None) -> Optional[int]:
+    """
+    Get a quick engine evaluation of a position.
         
-        # Analyze position after move
-        limit = chess.engine.Limit(time=0.1)
-        info = await engine.analyse(board, limit)
+    Args:
+        board: Position to evaluate
+        time_limit: Time limit in seconds, defaults to settings.MOVE_EVALUATION_TIME_SECONDS
         
-        # Get evaluation
-        evaluation = info.get("score", chess.engine.Score(0)).relative.score(mate_score=10000)
+    Returns:
+        Evaluation in centipawns from the side to move's point of view
+        (mates as +/-10000), or None if no engine is available or it failed
+    """
+    limit = search_limit(
+        time_limit or settings.MOVE_EVALUATION_TIME_SECONDS,
+        settings.MOVE_EVALUATION_DEPTH,
+        settings.MOVE_EVALUATION_NODES
+    )
         
-        return True, evaluation
-    except Exception as e:
-        logger.error(f"Error validating move: {e}")
-        return False, None
+    try:
+        async with checkout_engine(EnginePriority.INTERACTIVE) as engine:
+            info = await _call_engine(engine.analyse(board, limit), _hard_timeout(limit))
+    except EnginePoolError as e:
+        logger.warning(f"Chess engine not available for evaluation: {e}")
+        return None
+    except chess.engine.EngineError as e:
+        logger.error(f"Chess engine failed during evaluation: {e}")
+        return None
+    
+    return info.get("score", NO_SCORE).relative.score(mate_score=10000)
 
 
 async def generate_puzzle(
@@ -187,59 +672,81 @@ async def generate_puzzle(
     """
     try:
         board = chess.Board(fen)
-        engine = await get_engine()
-        
-        if engine is None:
-            logger.warning("Chess engine not available for puzzle generation")
-            return None
-        
-        # Analyze position
-        limit = chess.engine.Limit(depth=20)
-        result = await engine.play(board, limit)
-        
-        # Make the best move
-        best_move = result.move
-        board.push(best_move)
         
-        # Analyze new position to find tactical motifs
-        analysis = await analyze_position(board.fen(), depth=20, multipv=1)
-        
-        if not analysis:
-            return None
+        # Hold a single engine for the whole generation
+        async with checkout_engine(EnginePriority.BATCH) as engine:
+            return await _generate_puzzle(engine, board, fen)
+    except EnginePoolError as e:
+        logger.warning(f"Chess engine not available for puzzle generation: {e}")
+        return None
+    except Exception as e:
+        logger.error(f"Error generating puzzle: {e}")
+        return None
+
+
+async def _generate_puzzle(
+    engine: chess.engine.UciProtocol,
+    board: chess.Board,
+    fen: str
+) -> Optional[dict]:
+    """
+    Generate a puzzle on a checked-out engine.
+    
+    Args:
+        engine: Engine checked out from the pool
+        board: Position to generate the puzzle from
+        fen: FEN notation of the position
         
-        # Check if there's a significant advantage
-        score = analysis[0]["score"]
+    Returns:
+        Puzzle data if a puzzle can be generated, None otherwise
+    """
+    # Analyze position, stopping once the best move has settled
+    limit = search_limit(depth=settings.GENERATION_DEPTH, nodes=settings.GENERATION_NODES)
+    best, _ = await run_adaptive_analysis(engine, board, limit, multipv=1)
+    
+    if not best or not best[0]["pv"]:
+        return None
+    
+    # Make the best move
+    best_move = chess.Move.from_uci(best[0]["pv"][0])
+    board.push(best_move)
+    
+    # Analyze new position to find tactical motifs
+    analysis_limit = search_limit(time=settings.GENERATION_TIME_SECONDS, nodes=settings.GENERATION_NODES)
+    analysis, _ = await run_adaptive_analysis(engine, board, analysis_limit, multipv=1)
+    
+    if not analysis:
+        return None
+    
+    # Check if there's a significant advantage
+    score = analysis[0]["score"]
+    
+    # If there's a mate or significant advantage, create a puzzle
+    if analysis[0]["mate"] is not None or abs(score) > 200:
+        # Find the solution moves
+        solution_moves = [best_move.uci()]
         
-        # If there's a mate or significant advantage, create a puzzle
-        if analysis[0]["mate"] is not None or abs(score) > 200:
-            # Find the solution moves
-            solution_moves = [best_move.uci()]
-            
-            # Add opponent's best response
-            opponent_analysis = await analyze_position(board.fen(), depth=20, multipv=1)
-            if opponent_analysis and "pv" in opponent_analysis[0]:
-                opponent_move = opponent_analysis[0]["pv"][0]
-                solution_moves.append(opponent_move.uci())
-                board.push(opponent_move)
-                
-                # Add final move if there's a clear continuation
-                final_analysis = await analyze_position(board.fen(), depth=20, multipv=1)
-                if final_analysis and "pv" in final_analysis[0]:
-                    final_move = final_analysis[0]["pv"][0]
-                    solution_moves.append(final_move.uci())
+        # Add opponent's best response, already the head of the PV above
+        if analysis[0]["pv"]:
+            opponent_move = chess.Move.from_uci(analysis[0]["pv"][0])
+            solution_moves.append(opponent_move.uci())
+            board.push(opponent_move)
             
-            # Estimate difficulty based on depth and score
-            estimated_difficulty = min(3000, max(800, 1500 + abs(score) // 10))
-            
-            # Create puzzle
-            return {
-                "fen": fen,
-                "solution_moves": " ".join(solution_moves),
-                "difficulty": estimated_difficulty,
-                "themes": ["tactics", "advantage"]
-            }
+            # Add final move if there's a clear continuation
+            final_analysis, _ = await run_adaptive_analysis(engine, board, analysis_limit, multipv=1)
+            if final_analysis and final_analysis[0]["pv"]:
+                final_move = final_analysis[0]["pv"][0]
+                solution_moves.append(final_move)
         
-        return None
-    except Exception as e:
-        logger.error(f"Error generating puzzle: {e}")
-        return None 
\ No newline at end of file
+        # Estimate difficulty based on depth and score
+        estimated_difficulty = min(3000, max(800, 1500 + abs(score) // 10))
+        
+        # Create puzzle
+        return {
+            "fen": fen,
+            "solution_moves": " ".join(solution_moves),
+            "difficulty": estimated_difficulty,
+            "themes": ["tactics", "advantage"]
+        }
+    
+    return None
\ No newline at end of file
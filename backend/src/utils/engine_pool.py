@@ -0,0 +1,554 @@
+import asyncio
+import logging
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from enum import IntEnum
+from pathlib import Path
+from typing import Any, AsyncIterator, Deque, Dict, List, Optional, Set, Tuple, Union
+import chess.engine
+
+logger = logging.getLogger(__name__)
+
+# Weight of the latest checkout in the per-class average hold time
+HOLD_TIME_SMOOTHING = 0.2
+
+
+class EnginePriority(IntEnum):
+    """Engine work classes, most urgent first."""
+    
+    # Move feedback a user is waiting on
+    INTERACTIVE = 0
+    
+    # User-requested analysis
+    BACKGROUND = 1
+    
+    # Offline jobs such as puzzle generation
+    BATCH = 2
+
+
+class EnginePoolError(Exception):
+    """Base exception for engine pool failures."""
+
+
+class EngineUnavailableError(EnginePoolError):
+    """Raised when no engine process can be started."""
+
+
+class EnginePoolBusyError(EnginePoolError):
+    """Raised when the wait queue is full or a checkout cannot be served in time."""
+
+
+class EngineTimeoutError(EnginePoolError):
+    """Raised when an engine call overruns its wall-clock timeout."""
+
+
+# Failures inside a checkout that mean the engine process can no longer be trusted
+ENGINE_FAULTS = (EngineTimeoutError, chess.engine.EngineTerminatedError)
+
+
+class EnginePool:
+    """
+    Pool of UCI engine processes with prioritized checkout/checkin.
+    
+    Engines are started lazily up to ``size``. Each checkout has a priority
+    class, and each class may hold at most its limit of engines at once,
+    with the non-interactive classes also sharing ``shared_limit``, so
+    background and batch work together can be kept from occupying every
+    engine. When no engine
+    can be handed out, callers wait in a FIFO queue per class of at most
+    ``max_queue`` entries for up to ``acquire_timeout`` seconds; a released
+    engine goes to the most urgent class with an eligible waiter.
+    
+    Admission is deadline-aware: a caller whose estimated wait, based on
+    the average hold time of each class, already exceeds its timeout is
+    rejected at once instead of queueing.
+    
+    Engines are supervised: an engine whose process has exited, that fails
+    a liveness ping after sitting idle for ``ping_interval`` seconds, or
+    whose checkout ends in an engine fault is killed and replaced, so a
+    crashed or wedged process only fails the request that was using it.
+    """
+    
+    def __init__(
+        self,
+        command: Union[str, List[str]],
+        size: int,
+        max_queue: int,
+        acquire_timeout: float,
+        limits: Optional[Dict[EnginePriority, int]] = None,
+        shared_limit: Optional[int] = None,
+        ping_interval: float = 30.0,
+        ping_timeout: float = 2.0,
+        start_timeout: float = 10.0,
+        options: Optional[Dict[str, Any]] = None
+    ):
+        """
+        Args:
+            command: Engine executable, or an argv list
+            size: Maximum number of engine processes
+            max_queue: Maximum number of callers waiting for an engine per class
+            acquire_timeout: Default checkout timeout in seconds
+            limits: Maximum engines held at once per class, defaults to size
+            shared_limit: Maximum engines held at once by all non-interactive
+                classes together, defaults to size
+            ping_interval: Idle time in seconds after which an engine is pinged before use
+            ping_timeout: Time in seconds an engine has to answer a ping
+            start_timeout: Time in seconds an engine has for its UCI handshake
+                and for applying options
+            options: UCI options set on every engine started, such as Threads and Hash
+        """
+        self.command = command
+        self.size = max(1, size)
+        self.max_queue = max_queue
+        self.acquire_timeout = acquire_timeout
+        self.ping_interval = ping_interval
+        self.ping_timeout = ping_timeout
+        self.start_timeout = start_timeout
+        self.options = dict(options or {})
+        self.limits = {
+            priority: min(self.size, max(1, (limits or {}).get(priority, self.size)))
+            for priority in EnginePriority
+        }
+        self.shared_limit = min(self.size, max(1, shared_limit or self.size))
+        self._engines: Set[chess.engine.UciProtocol] = set()
+        self._idle: List[chess.engine.UciProtocol] = []
+        self._idle_since: Dict[chess.engine.UciProtocol, float] = {}
+        self._waiters: Dict[EnginePriority, Deque[asyncio.Future]] = {
+            priority: deque() for priority in EnginePriority
+        }
+        self._held: Dict[EnginePriority, int] = {priority: 0 for priority in EnginePriority}
+        
+        # Checked-out engine -> (priority, checkout time)
+        self._holders: Dict[chess.engine.UciProtocol, Tuple[EnginePriority, float]] = {}
+        self._hold_times: Dict[EnginePriority, float] = {}
+        self._tasks: Set[asyncio.Task] = set()
+        self._starting = 0
+        self._restarts = 0
+        self._closed = False
+    
+    @property
+    def available(self) -> int:
+        """Number of engines that can be checked out without waiting."""
+        return len(self._idle) + self.size - len(self._engines) - self._starting
+    
+    @property
+    def waiting(self) -> int:
+        """Number of callers waiting for an engine."""
+        return sum(len(queue) for queue in self._waiters.values())
+    
+    @property
+    def restarts(self) -> int:
+        """Number of engines discarded as crashed or unresponsive."""
+        return self._restarts
+    
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        """Get engines held, callers waiting and average hold time per class."""
+        return {
+            priority.name.lower(): {
+                "limit": self.limits[priority],
+                "held": self._held[priority],
+                "waiting": len(self._waiters[priority]),
+                "hold_time": self._hold_times.get(priority, 0.0)
+            }
+            for priority in EnginePriority
+        }
+    
+    def _spawn_task(self, coro) -> None:
+        """Run a pool maintenance coroutine in the background."""
+        task = asyncio.ensure_future(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+    
+    async def _spawn(self) -> chess.engine.UciProtocol:
+        """Start a new engine process."""
+        if isinstance(self.command, str) and not Path(self.command).exists() and "stockfish" not in self.command:
+            raise EngineUnavailableError(f"Chess engine not found at {self.command}")
+        
+        self._starting += 1
+        
+        try:
+            engine = await self._start()
+        except asyncio.TimeoutError as e:
+            raise EngineUnavailableError(f"Chess engine did not start within {self.start_timeout}s") from e
+        except Exception as e:
+            raise EngineUnavailableError(f"Failed to start chess engine: {e}") from e
+        finally:
+            self._starting -= 1
+        
+        self._engines.add(engine)
+        logger.info(f"Chess engine started: {engine.id.get('name')} ({len(self._engines)}/{self.size})")
+        return engine
+    
+    async def _start(self) -> chess.engine.UciProtocol:
+        """Run an engine's UCI handshake and configure it, killing the process on failure or timeout."""
+        transport, engine = await chess.engine.UciProtocol.popen(self.command)
+        
+        try:
+            await asyncio.wait_for(engine.initialize(), timeout=self.start_timeout)
+            await asyncio.wait_for(self._configure(engine), timeout=self.start_timeout)
+        except BaseException:
+            # Closing the transport kills the process; wait briefly to reap it
+            transport.close()
+            await asyncio.wait({engine.returncode}, timeout=self.ping_timeout)
+            raise
+        
+        return engine
+    
+    async def _configure(self, engine: chess.engine.UciProtocol) -> None:
+        """Apply the pool's options that the engine supports."""
+        supported = {name: value for name, value in self.options.items() if name in engine.options}
+        
+        for name in self.options.keys() - supported.keys():
+            logger.warning(f"Chess engine does not support option {name}, ignoring it")
+        
+        await engine.configure(supported)
+    
+    async def _is_healthy(self, engine: chess.engine.UciProtocol, idle_since: float) -> bool:
+        """Check an idle engine, pinging it if it has been idle for a while."""
+        if engine.returncode.done():
+            return False
+        
+        if time.monotonic() - idle_since < self.ping_interval:
+            return True
+        
+        try:
+            await asyncio.wait_for(engine.ping(), timeout=self.ping_timeout)
+            return True
+        except Exception:
+            return False
+    
+    async def _take_idle(self) -> Optional[chess.engine.UciProtocol]:
+        """Pop a healthy idle engine, discarding dead ones on the way."""
+        while self._idle:
+            engine = self._idle.pop()
+            
+            try:
+                healthy = await self._is_healthy(engine, self._idle_since.pop(engine, 0.0))
+            except BaseException:
+                self.release(engine)
+                raise
+            
+            if healthy:
+                return engine
+            
+            self.discard(engine, "failed its health check")
+        
+        return None
+    
+    def _has_room(self, priority: EnginePriority) -> bool:
+        """Whether a class may take another engine under its own and the shared limit."""
+        if self._held[priority] >= self.limits[priority]:
+            return False
+        
+        if priority == EnginePriority.INTERACTIVE:
+            return True
+        
+        shared = sum(held for other, held in self._held.items() if other != EnginePriority.INTERACTIVE)
+        return shared < self.shared_limit
+    
+    def _checkout(self, engine: chess.engine.UciProtocol, priority: EnginePriority) -> chess.engine.UciProtocol:
+        """Record an engine as held by a class whose count is already taken."""
+        self._holders[engine] = (priority, time.monotonic())
+        return engine
+    
+    def _estimate_wait(self, priority: EnginePriority) -> Optional[float]:
+        """
+        Estimate how long a new caller of a class would wait for an engine.
+        
+        Returns:
+            Seconds until enough engines are expected back for the callers
+            ahead of it, or None if there is no basis for an estimate
+        """
+        ahead = sum(len(self._waiters[other]) for other in EnginePriority if other <= priority)
+        
+        if ahead >= len(self._holders):
+            return None
+        
+        now = time.monotonic()
+        remaining = []
+        
+        for holder, started in self._holders.values():
+            if holder not in self._hold_times:
+                return None
+            
+            remaining.append(max(0.0, started + self._hold_times[holder] - now))
+        
+        return sorted(remaining)[ahead]
+    
+    async def acquire(
+        self,
+        timeout: Optional[float] = None,
+        priority: EnginePriority = EnginePriority.INTERACTIVE
+    ) -> chess.engine.UciProtocol:
+        """
+        Check out an engine, waiting for one to be released if necessary.
+        
+        Args:
+            timeout: Maximum wait in seconds, defaults to acquire_timeout
+            priority: Work class of the checkout
+            
+        Returns:
+            Engine protocol instance that must be passed back to release()
+            
+        Raises:
+            EngineUnavailableError: If the pool is closed or an engine fails to start
+            EnginePoolBusyError: If the queue is full or no engine is expected in time
+        """
+        if self._closed:
+            raise EngineUnavailableError("Engine pool is closed")
+        
+        queue = self._waiters[priority]
+        
+        if self._has_room(priority) and not queue:
+            self._held[priority] += 1
+            
+            try:
+                engine = await self._take_idle()
+                
+                if engine is None and len(self._engines) + self._starting < self.size:
+                    engine = await self._spawn()
+            except BaseException:
+                self._held[priority] -= 1
+                raise
+            
+            if engine is not None:
+                return self._checkout(engine, priority)
+            
+            self._held[priority] -= 1
+        
+        if len(queue) >= self.max_queue:
+            raise EnginePoolBusyError(f"Engine queue for {priority.name.lower()} work is full")
+        
+        timeout = self.acquire_timeout if timeout is None else timeout
+        estimate = self._estimate_wait(priority)
+        
+        if estimate is not None and estimate > timeout:
+            raise EnginePoolBusyError(f"No chess engine expected within {timeout}s (estimated {estimate:.2f}s)")
+        
+        waiter = asyncio.get_running_loop().create_future()
+        queue.append(waiter)
+        
+        try:
+            await asyncio.wait({waiter}, timeout=timeout)
+        except asyncio.CancelledError:
+            self._abandon(waiter, priority)
+            raise
+        
+        if not waiter.done():
+            self._abandon(waiter, priority)
+            raise EnginePoolBusyError(f"No chess engine available within {timeout}s")
+        
+        return waiter.result()
+    
+    def _abandon(self, waiter: asyncio.Future, priority: EnginePriority) -> None:
+        """Drop a waiter, handing back any engine it was given."""
+        if waiter.done() and not waiter.cancelled():
+            self.release(waiter.result())
+            return
+        
+        waiter.cancel()
+        
+        try:
+            self._waiters[priority].remove(waiter)
+        except ValueError:
+            pass
+    
+    def release(self, engine: chess.engine.UciProtocol) -> None:
+        """
+        Return an engine to the pool.
+        
+        The engine goes to the oldest waiter of the most urgent class that
+        is below its limits, or back to the idle list.
+        
+        Args:
+            engine: Engine previously returned by acquire()
+        """
+        if self._closed or engine not in self._engines:
+            return
+        
+        if engine.returncode.done():
+            self.discard(engine, "exited")
+            return
+        
+        holder = self._holders.pop(engine, None)
+        
+        if holder is not None:
+            priority, started = holder
+            held_for = time.monotonic() - started
+            average = self._hold_times.get(priority)
+            self._hold_times[priority] = held_for if average is None else (
+                average + HOLD_TIME_SMOOTHING * (held_for - average)
+            )
+            self._held[priority] -= 1
+        
+        for priority in EnginePriority:
+            queue = self._waiters[priority]
+            
+            while queue and self._has_room(priority):
+                waiter = queue.popleft()
+                
+                if not waiter.done():
+                    self._held[priority] += 1
+                    waiter.set_result(self._checkout(engine, priority))
+                    return
+        
+        self._idle.append(engine)
+        self._idle_since[engine] = time.monotonic()
+    
+    def discard(self, engine: chess.engine.UciProtocol, reason: str) -> None:
+        """
+        Kill an engine and drop it from the pool.
+        
+        If callers are waiting, a replacement is started in the background
+        and handed to them.
+        
+        Args:
+            engine: Engine previously returned by acquire(), or idle
+            reason: Why the engine is discarded, for the log
+        """
+        if engine not in self._engines:
+            return
+        
+        self._engines.discard(engine)
+        self._idle_since.pop(engine, None)
+        
+        if engine in self._idle:
+            self._idle.remove(engine)
+        
+        holder = self._holders.pop(engine, None)
+        
+        if holder is not None:
+            self._held[holder[0]] -= 1
+        
+        self._restarts += 1
+        logger.warning(f"Discarding chess engine that {reason} ({len(self._engines)}/{self.size} left)")
+        
+        if engine.transport is not None:
+            if not engine.returncode.done():
+                try:
+                    engine.transport.kill()
+                except ProcessLookupError:
+                    pass
+            
+            engine.transport.close()
+        
+        if self.waiting and not self._closed:
+            self._spawn_task(self._replace())
+    
+    async def _replace(self) -> None:
+        """Start an engine for waiting callers after one was discarded."""
+        if len(self._engines) + self._starting >= self.size:
+            return
+        
+        try:
+            self.release(await self._spawn())
+        except EnginePoolError as e:
+            logger.error(f"Error replacing chess engine: {e}")
+    
+    async def warm_up(self, count: int) -> int:
+        """
+        Start engines ahead of the first checkout.
+        
+        Args:
+            count: Number of engines to have running, at most size
+            
+        Returns:
+            Number of engines started
+            
+        Raises:
+            EngineUnavailableError: If an engine fails to start
+        """
+        missing = min(count, self.size) - len(self._engines) - self._starting
+        engines = await asyncio.gather(*(self._spawn() for _ in range(max(0, missing))), return_exceptions=True)
+        errors = [engine for engine in engines if isinstance(engine, BaseException)]
+        
+        for engine in engines:
+            if not isinstance(engine, BaseException):
+                self.release(engine)
+        
+        if errors:
+            raise errors[0]
+        
+        return len(engines) - len(errors)
+    
+    async def check_idle(self) -> int:
+        """
+        Ping every idle engine, discarding those that do not answer.
+        
+        Returns:
+            Number of engines discarded
+        """
+        engines, self._idle = self._idle, []
+        idle_since = [self._idle_since.pop(engine, 0.0) for engine in engines]
+        
+        # Every engine is pinged, however recently it was used
+        healthy = await asyncio.gather(*(self._is_healthy(engine, float("-inf")) for engine in engines))
+        
+        for engine, ok, since in zip(engines, healthy, idle_since):
+            if self._closed:
+                break
+            
+            if not ok:
+                self.discard(engine, "did not answer a liveness ping")
+            elif engine in self._engines:
+                self._idle.append(engine)
+                self._idle_since[engine] = since
+        
+        # Hand engines back to callers that queued during the pings
+        for engine in list(self._idle):
+            if self.waiting:
+                self._idle.remove(engine)
+                self.release(engine)
+        
+        return healthy.count(False)
+    
+    @asynccontextmanager
+    async def engine(
+        self,
+        timeout: Optional[float] = None,
+        priority: EnginePriority = EnginePriority.INTERACTIVE
+    ) -> AsyncIterator[chess.engine.UciProtocol]:
+        """Context manager that checks an engine out and back in."""
+        engine = await self.acquire(timeout, priority)
+        faulted = False
+        
+        try:
+            yield engine
+        except ENGINE_FAULTS:
+            faulted = True
+            raise
+        finally:
+            if faulted:
+                self.discard(engine, "timed out or terminated")
+            else:
+                self.release(engine)
+    
+    async def close(self) -> None:
+        """Quit all engine processes and fail pending waiters."""
+        self._closed = True
+        
+        for task in list(self._tasks):
+            task.cancel()
+        
+        for queue in self._waiters.values():
+            while queue:
+                waiter = queue.popleft()
+                
+                if not waiter.done():
+                    waiter.set_exception(EngineUnavailableError("Engine pool is closed"))
+        
+        engines = list(self._engines)
+        self._engines.clear()
+        self._idle.clear()
+        self._idle_since.clear()
+        self._holders.clear()
+        
+        for engine in engines:
+            try:
+                await asyncio.wait_for(engine.quit(), timeout=1.0)
+            except Exception as e:
+                logger.warning(f"Error quitting chess engine: {e}")
+        
+        if engines:
+            logger.info(f"Closed {len(engines)} chess engine(s)")
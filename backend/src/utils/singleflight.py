@@ -0,0 +1,59 @@
+import asyncio
+from typing import Awaitable, Callable, Dict, Hashable, TypeVar
+
+T = TypeVar("T")
+
+
+class SingleFlight:
+    """
+    Collapse concurrent calls for the same key into one in-flight call.
+    
+    The first caller for a key starts the work; callers arriving while it
+    runs await the same result (or exception). Once it completes the key is
+    forgotten, so later calls start fresh work.
+    """
+    
+    def __init__(self):
+        self._calls: Dict[Hashable, asyncio.Future] = {}
+        self.started = 0
+        self.shared = 0
+    
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[T]]) -> T:
+        """
+        Run fn for key unless a call for the same key is already in flight.
+        
+        Args:
+            key: Key identifying the work
+            fn: Coroutine function performing the work
+            
+        Returns:
+            Result of the (possibly shared) call
+        """
+        call = self._calls.get(key)
+        
+        if call is None:
+            call = asyncio.ensure_future(fn())
+            self._calls[key] = call
+            self.started += 1
+            call.add_done_callback(lambda done: self._forget(key, done))
+        else:
+            self.shared += 1
+        
+        # Shield the shared call so one cancelled caller does not cancel it for the others
+        return await asyncio.shield(call)
+    
+    def _forget(self, key: Hashable, call: asyncio.Future) -> None:
+        if self._calls.get(key) is call:
+            del self._calls[key]
+        
+        # Retrieve the exception so an unawaited failure is not reported as lost
+        if not call.cancelled():
+            call.exception()
+    
+    def stats(self) -> Dict[str, int]:
+        """Get counters of started and shared calls."""
+        return {
+            "started": self.started,
+            "shared": self.shared,
+            "in_flight": len(self._calls)
+        }
@@ -0,0 +1,87 @@
+-- Concurrent submissions may already have created duplicate rows; keep
+-- the most recently updated row per user and puzzle
+delete from public.user_progress
+where id in (
+    select id
+    from (
+        select
+            id,
+            row_number() over (
+                partition by user_id, puzzle_id
+                order by updated_at desc nulls last, created_at desc, id desc
+            ) as position
+        from public.user_progress
+    ) ranked
+    where position > 1
+);
+
+-- One progress row per user and puzzle, so concurrent submissions cannot
+-- create duplicates and can be resolved with ON CONFLICT
+alter table public.user_progress
+    add constraint user_progress_user_id_puzzle_id_key unique (user_id, puzzle_id);
+
+-- Record a puzzle attempt in a single atomic statement.
+--
+-- A first attempt creates the row with the default spaced repetition
+-- state; later attempts apply the SuperMemo-2 transition implemented by
+-- calculate_next_review in src/user_progress/service.py. Keep the two in sync.
+create or replace function public.record_puzzle_attempt(
+    p_user_id uuid,
+    p_puzzle_id bigint,
+    p_solved boolean,
+    p_time_taken integer,
+    p_attempts integer,
+    p_default_ease_factor double precision,
+    p_min_interval integer,
+    p_max_interval integer
+)
+returns setof public.user_progress
+language sql
+as $$
+    insert into public.user_progress as up (
+        user_id,
+        puzzle_id,
+        solved,
+        time_taken,
+        attempts,
+        next_review_date,
+        ease_factor,
+        "interval",
+        created_at,
+        updated_at
+    )
+    values (
+        p_user_id,
+        p_puzzle_id,
+        p_solved,
+        p_time_taken,
+        p_attempts,
+        current_date + 1,
+        p_default_ease_factor,
+        p_min_interval,
+        now(),
+        now()
+    )
+    on conflict (user_id, puzzle_id) do update set
+        solved = excluded.solved,
+        time_taken = excluded.time_taken,
+        attempts = excluded.attempts,
+        ease_factor = case
+            when excluded.solved then up.ease_factor + 0.1
+            else greatest(1.3, up.ease_factor - 0.2)
+        end,
+        "interval" = case
+            when not excluded.solved then p_min_interval
+            when up."interval" = 1 then least(6, p_max_interval)
+            when up."interval" = 6 then least(15, p_max_interval)
+            else least(floor(up."interval" * up.ease_factor)::integer, p_max_interval)
+        end,
+        next_review_date = current_date + case
+            when not excluded.solved then p_min_interval
+            when up."interval" = 1 then least(6, p_max_interval)
+            when up."interval" = 6 then least(15, p_max_interval)
+            else least(floor(up."interval" * up.ease_factor)::integer, p_max_interval)
+        end,
+        updated_at = now()
+    returning up.*;
+$$;
@@ -0,0 +1,147 @@
+-- Per-user progress aggregates, maintained incrementally by a trigger on
+-- user_progress so that reading a user's statistics never scans their history
+create table if not exists public.user_progress_stats (
+    user_id uuid primary key,
+    puzzles_attempted integer not null default 0,
+    puzzles_solved integer not null default 0,
+    time_taken_sum bigint not null default 0,
+    time_taken_count integer not null default 0,
+    attempts_sum bigint not null default 0,
+    attempts_count integer not null default 0
+);
+
+-- Number of a user's puzzles scheduled for review on each date; buckets
+-- that drop to zero are removed, so only dates with scheduled reviews remain
+create table if not exists public.user_review_buckets (
+    user_id uuid not null,
+    review_date date not null,
+    puzzles integer not null,
+    primary key (user_id, review_date)
+);
+
+-- Add (p_sign = 1) or remove (p_sign = -1) one progress row from the aggregates
+create or replace function public.apply_user_progress_delta(
+    p_row public.user_progress,
+    p_sign integer
+)
+returns void
+language plpgsql
+as $$
+begin
+    insert into public.user_progress_stats as s (
+        user_id,
+        puzzles_attempted,
+        puzzles_solved,
+        time_taken_sum,
+        time_taken_count,
+        attempts_sum,
+        attempts_count
+    )
+    values (
+        p_row.user_id,
+        p_sign,
+        p_sign * p_row.solved::integer,
+        p_sign * coalesce(p_row.time_taken, 0),
+        p_sign * (p_row.time_taken is not null)::integer,
+        p_sign * coalesce(p_row.attempts, 0),
+        p_sign * (p_row.attempts is not null)::integer
+    )
+    on conflict (user_id) do update set
+        puzzles_attempted = s.puzzles_attempted + excluded.puzzles_attempted,
+        puzzles_solved = s.puzzles_solved + excluded.puzzles_solved,
+        time_taken_sum = s.time_taken_sum + excluded.time_taken_sum,
+        time_taken_count = s.time_taken_count + excluded.time_taken_count,
+        attempts_sum = s.attempts_sum + excluded.attempts_sum,
+        attempts_count = s.attempts_count + excluded.attempts_count;
+
+    if p_row.next_review_date is not null then
+        insert into public.user_review_buckets as b (user_id, review_date, puzzles)
+        values (p_row.user_id, p_row.next_review_date, p_sign)
+        on conflict (user_id, review_date) do update set
+            puzzles = b.puzzles + excluded.puzzles;
+
+        delete from public.user_review_buckets
+        where user_id = p_row.user_id
+            and review_date = p_row.next_review_date
+            and puzzles = 0;
+    end if;
+end;
+$$;
+
+create or replace function public.maintain_user_progress_stats()
+returns trigger
+language plpgsql
+as $$
+begin
+    if tg_op in ('UPDATE', 'DELETE') then
+        perform public.apply_user_progress_delta(old, -1);
+    end if;
+
+    if tg_op in ('INSERT', 'UPDATE') then
+        perform public.apply_user_progress_delta(new, 1);
+    end if;
+
+    return null;
+end;
+$$;
+
+drop trigger if exists user_progress_stats_trigger on public.user_progress;
+
+create trigger user_progress_stats_trigger
+    after insert or update or delete on public.user_progress
+    for each row execute function public.maintain_user_progress_stats();
+
+-- Backfill aggregates for existing progress
+insert into public.user_progress_stats
+select
+    user_id,
+    count(*),
+    count(*) filter (where solved),
+    coalesce(sum(time_taken), 0),
+    count(time_taken),
+    coalesce(sum(attempts), 0),
+    count(attempts)
+from public.user_progress
+group by user_id
+on conflict (user_id) do nothing;
+
+insert into public.user_review_buckets
+select user_id, next_review_date, count(*)
+from public.user_progress
+where next_review_date is not null
+group by user_id, next_review_date
+on conflict (user_id, review_date) do nothing;
+
+-- Read a user's statistics; the due count sums only the buckets up to p_today
+create or replace function public.get_user_progress_stats(
+    p_user_id uuid,
+    p_today date
+)
+returns table (
+    puzzles_attempted integer,
+    puzzles_solved integer,
+    time_taken_sum bigint,
+    time_taken_count integer,
+    attempts_sum bigint,
+    attempts_count integer,
+    puzzles_due integer
+)
+language sql
+stable
+as $$
+    select
+        coalesce(s.puzzles_attempted, 0),
+        coalesce(s.puzzles_solved, 0),
+        coalesce(s.time_taken_sum, 0),
+        coalesce(s.time_taken_count, 0),
+        coalesce(s.attempts_sum, 0),
+        coalesce(s.attempts_count, 0),
+        (
+            select coalesce(sum(b.puzzles), 0)::integer
+            from public.user_review_buckets b
+            where b.user_id = p_user_id
+                and b.review_date <= p_today
+        )
+    from (select p_user_id as user_id) u
+    left join public.user_progress_stats s on s.user_id = u.user_id;
+$$;
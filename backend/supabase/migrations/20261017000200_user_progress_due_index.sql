@@ -0,0 +1,6 @@
+-- Serve "which puzzles are due for this user" as an index range scan
+-- instead of scanning the user's whole progress history.
+-- Used by src/user_progress/due_queue.py.
+create index if not exists user_progress_user_id_next_review_date_idx
+    on public.user_progress (user_id, next_review_date, puzzle_id)
+    where next_review_date is not null;
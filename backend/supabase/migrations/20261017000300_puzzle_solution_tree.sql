@@ -0,0 +1,6 @@
+-- Accepted-move tree per puzzle, built offline by src/puzzles/solution_tree.py.
+-- Each node maps an accepted solver move (UCI) to the opponent's reply and
+-- the next node: {"e2e4": {"reply": "e7e5", "then": {...}}}.
+-- Puzzles without a tree are checked against solution_moves alone.
+alter table public.puzzles
+    add column if not exists solution_tree jsonb;
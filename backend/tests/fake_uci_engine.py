@@ -0,0 +1,114 @@
+"""
+Tiny UCI engine used by the tests in place of Stockfish.
+
+It plays the first legal move in sorted UCI order and reports a fixed
+score at every depth. Behaviour can be tuned with environment variables:
+
+    FAKE_UCI_DELAY  seconds to sleep per search (default 0)
+    FAKE_UCI_DEPTH  maximum depth reported (default 3)
+    FAKE_UCI_HANG   if set, never answer searches or pings
+    FAKE_UCI_CRASH  if set, exit when asked to search
+    FAKE_UCI_MUTE   if set, never answer the uci handshake
+    FAKE_UCI_BOUNDS if set, precede each depth with a lowerbound line and
+                    report it twice, as aspiration re-searches do
+"""
+import os
+import sys
+import time
+import chess
+
+DELAY = float(os.environ.get("FAKE_UCI_DELAY", "0"))
+MAX_DEPTH = int(os.environ.get("FAKE_UCI_DEPTH", "3"))
+HANG = bool(os.environ.get("FAKE_UCI_HANG"))
+CRASH = bool(os.environ.get("FAKE_UCI_CRASH"))
+MUTE = bool(os.environ.get("FAKE_UCI_MUTE"))
+BOUNDS = bool(os.environ.get("FAKE_UCI_BOUNDS"))
+
+
+def send(line):
+    sys.stdout.write(line + "\n")
+    sys.stdout.flush()
+
+
+def search(board, multipv, depth):
+    moves = sorted(board.legal_moves, key=lambda move: move.uci())[:multipv]
+    
+    for current_depth in range(1, depth + 1):
+        if BOUNDS and moves:
+            send(
+                f"info depth {current_depth} seldepth {current_depth} multipv 1 "
+                f"score cp 900 lowerbound nodes {1000 * current_depth} nps 100000 "
+                f"time {current_depth} pv {moves[-1].uci()}"
+            )
+        
+        for _ in range(2 if BOUNDS else 1):
+            for index, move in enumerate(moves, start=1):
+                send(
+                    f"info depth {current_depth} seldepth {current_depth} multipv {index} "
+                    f"score cp {50 - 10 * index} nodes {1000 * current_depth} nps 100000 "
+                    f"time {current_depth} pv {move.uci()}"
+                )
+    
+    if DELAY:
+        time.sleep(DELAY)
+    
+    send(f"bestmove {moves[0].uci() if moves else '(none)'}")
+
+
+def main():
+    board = chess.Board()
+    multipv = 1
+    
+    for line in sys.stdin:
+        tokens = line.split()
+        
+        if not tokens:
+            continue
+        
+        command = tokens[0]
+        
+        if command == "uci":
+            if MUTE:
+                continue
+            
+            send("id name FakeFish")
+            send("id author tests")
+            send("option name MultiPV type spin default 1 min 1 max 500")
+            send("option name Threads type spin default 1 min 1 max 1024")
+            send("option name Hash type spin default 16 min 1 max 33554432")
+            send("option name Skill Level type spin default 20 min 0 max 20")
+            send("uciok")
+        elif command == "isready":
+            if not HANG:
+                send("readyok")
+        elif command == "setoption" and tokens[2] == "MultiPV":
+            multipv = int(tokens[-1])
+        elif command == "position":
+            if tokens[1] == "startpos":
+                board = chess.Board()
+                rest = tokens[2:]
+            else:
+                board = chess.Board(" ".join(tokens[2:8]))
+                rest = tokens[8:]
+            
+            for move in rest[1:] if rest and rest[0] == "moves" else []:
+                board.push_uci(move)
+        elif command == "go":
+            if CRASH:
+                sys.exit(1)
+            
+            if HANG:
+                continue
+            
+            depth = MAX_DEPTH
+            
+            if "depth" in tokens:
+                depth = min(depth, int(tokens[tokens.index("depth") + 1]))
+            
+            search(board, multipv, depth)
+        elif command == "quit":
+            break
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+import asyncio
+import sys
+import os
+import chess
+
+# Add the parent directory to the path so we can import the src package
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.utils.analysis_cache import AnalysisCache, position_key
+
+FEN = "r1bqkbnr/pppp1ppp/2n5/4p3/4P3/5N2/PPPP1PPP/RNBQKB1R w KQkq - 2 3"
+
+RESULTS = [
+    {"score": 30, "mate": None, "depth": 20, "moves": ["Bb5"], "pv": ["f1b5"]},
+    {"score": 25, "mate": None, "depth": 20, "moves": ["Bc4"], "pv": ["f1c4"]},
+]
+
+
+def test_position_key_ignores_move_clocks():
+    """Positions differing only in move clocks share a key."""
+    later = FEN.replace(" 2 3", " 10 40")
+    
+    assert position_key(chess.Board(FEN)) == position_key(chess.Board(later))
+    assert position_key(chess.Board(FEN)) != position_key(chess.Board(FEN.replace(" w ", " b ")))
+
+
+def test_deeper_entries_satisfy_shallower_requests():
+    """A cached deep multipv result answers shallower and narrower requests only."""
+    async def run():
+        cache = AnalysisCache(maxsize=10)
+        board = chess.Board(FEN)
+        await cache.put(board, depth=20, multipv=2, results=RESULTS)
+        
+        return (
+            await cache.get(board, depth=12, multipv=1),
+            await cache.get(board, depth=20, multipv=2),
+            await cache.get(board, depth=24, multipv=1),
+            await cache.get(board, depth=12, multipv=3),
+        )
+    
+    shallow, exact, deeper, wider = asyncio.run(run())
+    
+    assert shallow == RESULTS[:1]
+    assert exact == RESULTS
+    assert deeper is None
+    assert wider is None
+
+
+def test_persistent_tier_survives_restart(tmp_path):
+    """Entries written to SQLite are served by a fresh cache instance."""
+    db_path = str(tmp_path / "analysis.db")
+    
+    async def run():
+        cache = AnalysisCache(maxsize=10, db_path=db_path)
+        await cache.put(chess.Board(FEN), depth=20, multipv=2, results=RESULTS)
+        cache.close()
+        
+        restarted = AnalysisCache(maxsize=10, db_path=db_path)
+        try:
+            return await restarted.get(chess.Board(FEN), depth=18, multipv=2)
+        finally:
+            restarted.close()
+    
+    assert asyncio.run(run()) == RESULTS
@@ -0,0 +1,117 @@
+import asyncio
+import time
+import pytest
+import sys
+import os
+from fastapi import HTTPException
+from fastapi.security import HTTPAuthorizationCredentials
+from jose import jwt
+from pydantic import SecretStr
+
+# Add the parent directory to the path so we can import the src package
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.auth import dependencies
+from src.core.config import settings
+
+SECRET = "test-secret"
+
+
+@pytest.fixture(autouse=True)
+def jwt_secret(monkeypatch):
+    monkeypatch.setattr(settings, "JWT_SECRET", SecretStr(SECRET))
+    dependencies._token_cache.clear()
+    yield
+
+
+def make_token(**claims):
+    payload = {
+        "sub": "user-1",
+        "email": "user@example.com",
+        "aud": "authenticated",
+        "exp": int(time.time()) + 3600,
+    }
+    payload.update(claims)
+    return jwt.encode(payload, SECRET, algorithm="HS256")
+
+
+def authenticate(token):
+    credentials = HTTPAuthorizationCredentials(scheme="Bearer", credentials=token)
+    return asyncio.run(dependencies.get_current_user(credentials))
+
+
+def test_valid_token_is_verified_locally_and_cached():
+    """A valid token is decoded without Supabase and served from cache afterwards."""
+    token = make_token()
+    
+    user = authenticate(token)
+    assert user["id"] == "user-1"
+    assert user["email"] == "user@example.com"
+    
+    hits = dependencies._token_cache.hits
+    assert authenticate(token) == user
+    assert dependencies._token_cache.hits == hits + 1
+
+
+@pytest.mark.parametrize("claims", [
+    {"exp": int(time.time()) - 10},
+    {"aud": "anon-service"},
+])
+def test_invalid_token_is_rejected(claims):
+    """Expired tokens and tokens for another audience return 401."""
+    with pytest.raises(HTTPException) as exc_info:
+        authenticate(make_token(**claims))
+    
+    assert exc_info.value.status_code == 401
+
+
+def test_tampered_token_is_rejected():
+    """A token signed with another key returns 401."""
+    token = jwt.encode({"sub": "user-1", "aud": "authenticated"}, "other", algorithm="HS256")
+    
+    with pytest.raises(HTTPException):
+        authenticate(token)
+
+
+def test_optional_user_allows_anonymous_requests():
+    """No token gives no user; an invalid token is still rejected."""
+    assert asyncio.run(dependencies.get_optional_user(None)) is None
+    
+    with pytest.raises(HTTPException):
+        asyncio.run(dependencies.get_optional_user(
+            HTTPAuthorizationCredentials(scheme="Bearer", credentials="not-a-token")
+        ))
+
+
+def test_solution_check_evaluation_requires_sign_in(monkeypatch):
+    """Anonymous solution checks work, but engine evaluations need a signed-in user."""
+    from src.puzzles import router
+    from src.puzzles.schemas import Puzzle, SolutionCheckRequest
+    
+    puzzle = Puzzle(
+        id=1,
+        fen="6k1/5ppp/8/8/8/8/5PPP/R5K1 w - - 0 1",
+        solution_moves="a1a8",
+        created_at="2026-10-17T00:00:00"
+    )
+    
+    async def fake_get_puzzle_by_id(puzzle_id):
+        return puzzle
+    
+    async def fake_evaluate_position(board):
+        return 10000
+    
+    monkeypatch.setattr(router, "get_puzzle_by_id", fake_get_puzzle_by_id)
+    monkeypatch.setattr(router, "evaluate_position", fake_evaluate_position)
+    
+    def check(evaluate, user):
+        request = SolutionCheckRequest(moves=["a1a8"], evaluate=evaluate)
+        return asyncio.run(router.check_puzzle_solution(request, puzzle_id=1, current_user=user))
+    
+    assert check(False, None).complete
+    assert check(True, {"id": "user-1"}).evaluation == 10000
+    
+    with pytest.raises(HTTPException) as error:
+        check(True, None)
+    
+    assert error.value.status_code == 401
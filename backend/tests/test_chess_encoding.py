@@ -0,0 +1,62 @@
+import pytest
+import sys
+import os
+import chess
+
+# Add the parent directory to the path so we can import the src package
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.utils.chess_encoding import (
+    decode_board,
+    decode_fen,
+    decode_move,
+    decode_solution,
+    encode_board,
+    encode_fen,
+    encode_move,
+    encode_solution
+)
+
+FENS = [
+    chess.STARTING_FEN,
+    "rnbqkbnr/ppp1p1pp/8/3pPp2/8/8/PPPP1PPP/RNBQKBNR w Kq f6 0 3",
+    "6k1/5ppp/8/8/8/8/5PPP/R5K1 w - - 12 40",
+    "8/P7/8/8/8/8/8/k6K b - - 0 99"
+]
+
+
+@pytest.mark.parametrize("fen", FENS)
+def test_positions_round_trip(fen):
+    """Packed positions decode to the same FEN and stay within 29 bytes."""
+    data = encode_fen(fen)
+    
+    assert decode_fen(data) == fen
+    assert len(data) <= 29
+
+
+def test_position_without_clocks_ignores_move_numbers():
+    """Positions packed without clocks match regardless of move numbers."""
+    board = chess.Board(FENS[2])
+    later = chess.Board(FENS[2].replace(" 12 40", " 0 41"))
+    
+    assert encode_board(board, clocks=False) == encode_board(later, clocks=False)
+    assert decode_board(encode_board(board, clocks=False)).fullmove_number == 1
+
+
+def test_moves_round_trip():
+    """Moves, including promotions, pack into 16 bits and back."""
+    for move in [chess.Move.from_uci("e2e4"), chess.Move.from_uci("a7a8q"), chess.Move.from_uci("h2h1n")]:
+        assert 0 <= encode_move(move) < 1 << 16
+        assert decode_move(encode_move(move)) == move
+    
+    assert decode_solution(encode_solution("e2e4 e7e5 a7a8q")) == "e2e4 e7e5 a7a8q"
+    assert len(encode_solution("e2e4 e7e5")) == 4
+
+
+def test_invalid_data_is_rejected():
+    """Truncated positions and malformed solutions raise ValueError."""
+    with pytest.raises(ValueError):
+        decode_board(encode_fen(chess.STARTING_FEN)[:-1])
+    
+    with pytest.raises(ValueError):
+        encode_solution("e4 e5")
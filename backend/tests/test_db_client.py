@@ -0,0 +1,80 @@
+import asyncio
+import threading
+import time
+import pytest
+import sys
+import os
+
+# Add the parent directory to the path so we can import the src package
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.core.exceptions import DatabaseException
+from src.db import client as db_client
+
+
+class FakeResponse:
+    def __init__(self, data):
+        self.data = data
+        self.error = None
+
+
+class FakeQuery:
+    """Minimal stand-in for a PostgREST request builder."""
+    
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.filters = []
+        self.thread = None
+    
+    def select(self, *args, **kwargs):
+        return self
+    
+    def filter(self, column, operator, value):
+        self.filters.append((column, operator, value))
+        return self
+    
+    def execute(self):
+        self.thread = threading.current_thread()
+        time.sleep(self.delay)
+        return FakeResponse([{"id": 1}])
+
+
+class FakeClient:
+    def __init__(self, query):
+        self.query = query
+    
+    def table(self, name):
+        return self.query
+
+
+@pytest.fixture
+def fake_query(monkeypatch):
+    query = FakeQuery()
+    monkeypatch.setattr(db_client, "get_supabase_client", lambda: FakeClient(query))
+    yield query
+    db_client.close_query_executor()
+
+
+def test_execute_query_runs_off_event_loop(fake_query):
+    """Queries are executed on the database pool, not the event loop thread."""
+    result = asyncio.run(db_client.execute_query(
+        "puzzles",
+        lambda q: q.select("*"),
+        filters=[("id", "eq", 1)]
+    ))
+    
+    assert result == [{"id": 1}]
+    assert fake_query.filters == [("id", "eq", 1)]
+    assert fake_query.thread is not threading.main_thread()
+
+
+def test_execute_query_timeout(fake_query):
+    """A query slower than its timeout raises a DatabaseException."""
+    fake_query.delay = 0.5
+    
+    with pytest.raises(DatabaseException):
+        asyncio.run(db_client.execute_query(
+            "puzzles",
+            lambda q: q.select("*"),
+            timeout=0.05
+        ))
@@ -0,0 +1,85 @@
+import asyncio
+import sys
+import os
+from datetime import date
+
+# Add the parent directory to the path so we can import the src package
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.user_progress.due_queue import DueQueue
+
+TODAY = date(2026, 10, 17)
+
+
+def make_queue(rows, load_limit=100):
+    loads = []
+    
+    async def load(user_id, limit):
+        loads.append(user_id)
+        return rows
+    
+    return DueQueue(max_users=10, ttl=None, load_limit=load_limit, load_fn=load), loads
+
+
+def test_next_due_returns_overdue_first():
+    """Only puzzles due by today are served, most overdue first, and the queue is loaded once."""
+    queue, loads = make_queue([
+        (3, date(2026, 10, 1)),
+        (1, date(2026, 10, 10)),
+        (2, date(2026, 10, 17)),
+        (4, date(2026, 10, 20))
+    ])
+    
+    assert asyncio.run(queue.next_due("user", 10, TODAY)) == [3, 1, 2]
+    assert asyncio.run(queue.next_due("user", 2, TODAY)) == [3, 1]
+    assert loads == ["user"]
+
+
+def test_writes_update_cached_queue():
+    """Rescheduled and removed puzzles are reflected without a reload."""
+    queue, loads = make_queue([(1, date(2026, 10, 1)), (2, date(2026, 10, 5))])
+    asyncio.run(queue.next_due("user", 10, TODAY))
+    
+    queue.schedule("user", 1, date(2026, 11, 1))
+    queue.schedule("user", 5, date(2026, 10, 3))
+    queue.remove("user", 2)
+    
+    assert asyncio.run(queue.next_due("user", 10, TODAY)) == [5]
+    assert asyncio.run(queue.next_due("user", 10, date(2026, 11, 1))) == [5, 1]
+    assert loads == ["user"]
+
+
+def test_reviews_past_partial_load_are_left_to_reload():
+    """When only part of a user's reviews were loaded, later dates are not tracked."""
+    queue, _ = make_queue([(1, date(2026, 10, 1)), (2, date(2026, 10, 5))], load_limit=2)
+    asyncio.run(queue.next_due("user", 10, TODAY))
+    
+    queue.schedule("user", 1, date(2026, 12, 1))
+    
+    assert asyncio.run(queue.next_due("user", 10, date(2026, 12, 31))) == [2]
+
+
+def test_writes_during_load_are_applied():
+    """A progress write that lands while the queue is loading is not lost."""
+    async def run():
+        release = asyncio.Event()
+        
+        async def load(user_id, limit):
+            await release.wait()
+            return [(1, date(2026, 10, 1)), (2, date(2026, 10, 5))]
+        
+        queue = DueQueue(max_users=10, ttl=None, load_limit=100, load_fn=load)
+        lookup = asyncio.ensure_future(queue.next_due("user", 10, TODAY))
+        
+        while "user" not in queue._pending:
+            await asyncio.sleep(0)
+        
+        # The user solves puzzle 1 while their stale queue is being read
+        queue.schedule("user", 1, date(2026, 11, 1))
+        release.set()
+        
+        return await lookup, await queue.next_due("user", 10, TODAY)
+    
+    during, after = asyncio.run(run())
+    
+    assert during == after == [2]
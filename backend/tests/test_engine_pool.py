@@ -0,0 +1,483 @@
+import asyncio
+import time
+import pytest
+import sys
+import os
+import chess
+import chess.engine
+
+# Add the parent directory to the path so we can import the src package
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.utils import chess_engine
+from src.utils.analysis_cache import AnalysisCache
+from src.utils.engine_pool import EnginePool, EnginePoolBusyError, EnginePriority, EngineUnavailableError
+
+FAKE_ENGINE = [sys.executable, os.path.join(os.path.dirname(os.path.abspath(__file__)), "fake_uci_engine.py")]
+
+FEN = "6k1/5ppp/8/8/8/8/5PPP/R5K1 w - - 0 1"
+
+
+def make_pool(**kwargs):
+    options = {"size": 2, "max_queue": 8, "acquire_timeout": 5.0}
+    options.update(kwargs)
+    return EnginePool(FAKE_ENGINE, **options)
+
+
+async def analyse_once(pool):
+    async with pool.engine() as engine:
+        return await engine.analyse(chess.Board(FEN), chess.engine.Limit(depth=3))
+
+
+def test_pool_runs_requests_in_parallel(monkeypatch):
+    """Requests are spread over the pool's engines instead of serializing."""
+    monkeypatch.setenv("FAKE_UCI_DELAY", "0.3")
+    
+    async def run():
+        pool = make_pool()
+        try:
+            await asyncio.gather(analyse_once(pool), analyse_once(pool))
+            started = time.monotonic()
+            results = await asyncio.gather(*(analyse_once(pool) for _ in range(4)))
+            return results, time.monotonic() - started
+        finally:
+            await pool.close()
+    
+    results, elapsed = asyncio.run(run())
+    
+    assert all(info["pv"][0].uci() == "a1a2" for info in results)
+    # Two engines for four 0.3s searches: two rounds, not four
+    assert elapsed < 1.0
+
+
+def test_pool_queue_limits(monkeypatch):
+    """A full wait queue or an expired wait raises EnginePoolBusyError."""
+    async def run():
+        pool = make_pool(size=1, max_queue=1, acquire_timeout=0.1)
+        try:
+            engine = await pool.acquire()
+            waiter = asyncio.ensure_future(pool.acquire())
+            await asyncio.sleep(0)
+            
+            with pytest.raises(EnginePoolBusyError):
+                await pool.acquire()
+            
+            with pytest.raises(EnginePoolBusyError):
+                await waiter
+            
+            pool.release(engine)
+            assert pool.available == 1
+        finally:
+            await pool.close()
+    
+    asyncio.run(run())
+
+
+def test_interactive_waiters_are_served_first():
+    """A released engine goes to an interactive waiter ahead of earlier batch waiters."""
+    async def run():
+        pool = make_pool(size=1)
+        try:
+            engine = await pool.acquire()
+            batch = asyncio.ensure_future(pool.acquire(priority=EnginePriority.BATCH))
+            await asyncio.sleep(0)
+            interactive = asyncio.ensure_future(pool.acquire(priority=EnginePriority.INTERACTIVE))
+            await asyncio.sleep(0)
+            
+            pool.release(engine)
+            stats = pool.stats()
+            served = (stats["interactive"]["held"], stats["batch"]["held"])
+            
+            pool.release(await interactive)
+            pool.release(await batch)
+            return served
+        finally:
+            await pool.close()
+    
+    assert asyncio.run(run()) == (1, 0)
+
+
+def test_class_limit_keeps_an_engine_for_interactive_work():
+    """Batch work capped below the pool size cannot take the last engine."""
+    async def run():
+        pool = make_pool(size=2, acquire_timeout=0.1, limits={EnginePriority.BATCH: 1})
+        try:
+            batch = await pool.acquire(priority=EnginePriority.BATCH)
+            
+            with pytest.raises(EnginePoolBusyError):
+                await pool.acquire(priority=EnginePriority.BATCH)
+            
+            interactive = await pool.acquire(priority=EnginePriority.INTERACTIVE)
+            stats = pool.stats()
+            pool.release(batch)
+            pool.release(interactive)
+            return stats
+        finally:
+            await pool.close()
+    
+    stats = asyncio.run(run())
+    
+    assert stats["batch"]["held"] == 1
+    assert stats["interactive"]["held"] == 1
+
+
+def test_shared_limit_keeps_an_engine_for_interactive_work():
+    """Background and batch work together cannot take the last engine."""
+    async def run():
+        pool = make_pool(
+            size=2,
+            acquire_timeout=0.1,
+            limits={EnginePriority.BACKGROUND: 1, EnginePriority.BATCH: 1},
+            shared_limit=1
+        )
+        try:
+            batch = await pool.acquire(priority=EnginePriority.BATCH)
+            
+            with pytest.raises(EnginePoolBusyError):
+                await pool.acquire(priority=EnginePriority.BACKGROUND)
+            
+            interactive = await pool.acquire(priority=EnginePriority.INTERACTIVE)
+            pool.release(batch)
+            background = await pool.acquire(priority=EnginePriority.BACKGROUND)
+            stats = pool.stats()
+            pool.release(background)
+            pool.release(interactive)
+            return stats
+        finally:
+            await pool.close()
+    
+    stats = asyncio.run(run())
+    
+    assert stats["background"]["held"] == 1
+    assert stats["batch"]["held"] == 0
+    assert stats["interactive"]["held"] == 1
+
+
+def test_admission_rejects_waits_past_the_deadline():
+    """A checkout expected to wait longer than its timeout fails without queueing."""
+    async def run():
+        pool = make_pool(size=1)
+        try:
+            async with pool.engine(priority=EnginePriority.BATCH):
+                await asyncio.sleep(0.3)
+            
+            async with pool.engine(priority=EnginePriority.BATCH):
+                started = time.monotonic()
+                
+                with pytest.raises(EnginePoolBusyError):
+                    await pool.acquire(timeout=0.1)
+                
+                return time.monotonic() - started, pool.waiting
+        finally:
+            await pool.close()
+    
+    elapsed, waiting = asyncio.run(run())
+    
+    assert elapsed < 0.05
+    assert waiting == 0
+
+
+def test_wedged_engine_is_discarded(monkeypatch):
+    """A search overrunning its hard timeout fails one request and the engine is replaced."""
+    monkeypatch.setattr(chess_engine.settings, "ENGINE_TIMEOUT_GRACE_SECONDS", 0.2)
+    monkeypatch.setenv("FAKE_UCI_HANG", "1")
+    
+    async def run():
+        pool = make_pool(size=1)
+        monkeypatch.setattr(chess_engine, "_engine_pool", pool)
+        try:
+            wedged = await chess_engine.evaluate_position(chess.Board(FEN), time_limit=0.1)
+            monkeypatch.delenv("FAKE_UCI_HANG")
+            recovered = await chess_engine.evaluate_position(chess.Board(FEN), time_limit=0.1)
+            return wedged, recovered, pool.restarts
+        finally:
+            await chess_engine.close_engine()
+    
+    assert asyncio.run(run()) == (None, 40, 1)
+
+
+def test_hung_handshake_times_out(monkeypatch):
+    """An engine that never finishes its UCI handshake fails the checkout and is killed."""
+    monkeypatch.setenv("FAKE_UCI_MUTE", "1")
+    
+    async def run():
+        pool = make_pool(size=1, start_timeout=0.3)
+        try:
+            started = time.monotonic()
+            
+            with pytest.raises(EngineUnavailableError):
+                await pool.acquire(timeout=0.5)
+            
+            with pytest.raises(EngineUnavailableError):
+                await pool.warm_up(1)
+            
+            return time.monotonic() - started, pool.available
+        finally:
+            await pool.close()
+    
+    elapsed, available = asyncio.run(run())
+    
+    assert elapsed < 2
+    assert available == 1
+
+
+def test_crashed_engine_is_replaced(monkeypatch):
+    """An engine process that exits mid-search is dropped and a new one started."""
+    monkeypatch.setenv("FAKE_UCI_CRASH", "1")
+    
+    async def run():
+        pool = make_pool(size=1)
+        try:
+            with pytest.raises(chess.engine.EngineTerminatedError):
+                await analyse_once(pool)
+            
+            monkeypatch.delenv("FAKE_UCI_CRASH")
+            return await analyse_once(pool), pool.restarts
+        finally:
+            await pool.close()
+    
+    info, restarts = asyncio.run(run())
+    
+    assert info["depth"] == 3
+    assert restarts == 1
+
+
+def test_engine_crash_does_not_invalidate_legal_moves(monkeypatch):
+    """A legal move is still reported valid, without an evaluation, when the engine dies."""
+    monkeypatch.setenv("FAKE_UCI_CRASH", "1")
+    
+    async def run():
+        monkeypatch.setattr(chess_engine, "_engine_pool", make_pool(size=1))
+        try:
+            return await chess_engine.validate_move(FEN, "a1a8"), await chess_engine.validate_move(FEN, "a1h8")
+        finally:
+            await chess_engine.close_engine()
+    
+    legal, illegal = asyncio.run(run())
+    
+    assert legal == (True, None)
+    assert illegal == (False, None)
+
+
+def test_check_idle_discards_unresponsive_engines(monkeypatch):
+    """Warmed-up engines that stop answering pings are discarded by the health check."""
+    monkeypatch.setenv("FAKE_UCI_HANG", "1")
+    
+    async def run():
+        pool = make_pool(size=2, ping_timeout=0.2)
+        try:
+            started = await pool.warm_up(2)
+            discarded = await pool.check_idle()
+            return started, discarded, pool.available
+        finally:
+            await pool.close()
+    
+    assert asyncio.run(run()) == (2, 2, 2)
+
+
+def test_pool_applies_supported_engine_options():
+    """Pool options are set on each engine; options it lacks are skipped."""
+    async def run():
+        pool = make_pool(size=1, options={"Threads": 2, "Hash": 32, "Contempt": 10})
+        try:
+            async with pool.engine() as engine:
+                return dict(engine.target_config)
+        finally:
+            await pool.close()
+    
+    config = asyncio.run(run())
+    
+    assert config["Threads"] == 2
+    assert config["Hash"] == 32
+    assert "Contempt" not in config
+
+
+def test_search_limit_combines_budgets(monkeypatch):
+    """Search limits keep every set bound and apply the global node cap."""
+    monkeypatch.setattr(chess_engine.settings, "ENGINE_MAX_NODES", 5000)
+    
+    limit = chess_engine.search_limit(time=1.0, depth=12, nodes=100000)
+    
+    assert (limit.time, limit.depth, limit.nodes) == (1.0, 12, 5000)
+    assert chess_engine.search_limit(depth=0).depth is None
+
+
+def test_analyze_position_uses_pool(monkeypatch):
+    """analyze_position formats the results of a pooled engine."""
+    async def run():
+        pool = make_pool()
+        monkeypatch.setattr(chess_engine, "_engine_pool", pool)
+        try:
+            return await chess_engine.analyze_position(FEN, multipv=2, time_limit=0.1)
+        finally:
+            await chess_engine.close_engine()
+    
+    results = asyncio.run(run())
+    
+    assert [result["pv"][0] for result in results] == ["a1a2", "a1a3"]
+    assert results[0]["moves"] == ["Ra2"]
+    assert results[0]["score"] == 40
+
+
+def test_stream_analysis_yields_each_depth(monkeypatch):
+    """stream_analysis yields the lines of every completed depth and caches the last."""
+    async def run():
+        monkeypatch.setattr(chess_engine, "_engine_pool", make_pool(size=1))
+        monkeypatch.setattr(chess_engine, "_analysis_cache", AnalysisCache(maxsize=10))
+        try:
+            updates = [results async for results in chess_engine.stream_analysis(FEN, depth=3, multipv=2)]
+            cached = [results async for results in chess_engine.stream_analysis(FEN, depth=3, multipv=2)]
+            return updates, cached
+        finally:
+            await chess_engine.close_engine()
+    
+    updates, cached = asyncio.run(run())
+    
+    assert [[line["depth"] for line in results] for results in updates] == [[1, 1], [2, 2], [3, 3]]
+    assert [line["pv"][0] for line in updates[-1]] == ["a1a2", "a1a3"]
+    assert cached == [updates[-1]]
+
+
+def test_stream_analysis_skips_bounds_and_repeated_depths(monkeypatch):
+    """Bound lines are skipped and a depth reported twice is only streamed once."""
+    monkeypatch.setenv("FAKE_UCI_BOUNDS", "1")
+    
+    async def run():
+        monkeypatch.setattr(chess_engine, "_engine_pool", make_pool(size=1))
+        monkeypatch.setattr(chess_engine, "_analysis_cache", AnalysisCache(maxsize=10))
+        try:
+            return [results async for results in chess_engine.stream_analysis(FEN, depth=3)]
+        finally:
+            await chess_engine.close_engine()
+    
+    updates = asyncio.run(run())
+    
+    assert [results[0]["depth"] for results in updates] == [1, 2, 3]
+    assert all(results[0]["score"] != 900 for results in updates)
+
+
+def test_stream_analysis_releases_engine_when_closed(monkeypatch):
+    """Closing a stream early stops the search and returns the engine to the pool."""
+    async def run():
+        pool = make_pool(size=1)
+        monkeypatch.setattr(chess_engine, "_engine_pool", pool)
+        monkeypatch.setattr(chess_engine, "_analysis_cache", AnalysisCache(maxsize=10))
+        try:
+            updates = chess_engine.stream_analysis(FEN, depth=3, multipv=1)
+            first = await updates.__anext__()
+            await updates.aclose()
+            
+            # The only engine is free again and still usable
+            return first, pool.available, await analyse_once(pool)
+        finally:
+            await chess_engine.close_engine()
+    
+    first, available, info = asyncio.run(run())
+    
+    assert first[0]["depth"] == 1
+    assert available == 1
+    assert info["depth"] == 3
+
+
+def test_analyze_position_honours_depth(monkeypatch):
+    """analyze_position stops at the requested depth rather than only the time limit."""
+    async def run():
+        monkeypatch.setattr(chess_engine, "_engine_pool", make_pool(size=1))
+        monkeypatch.setattr(chess_engine, "_analysis_cache", AnalysisCache(maxsize=10))
+        try:
+            return await chess_engine.analyze_position(FEN, depth=2, multipv=1, time_limit=5.0)
+        finally:
+            await chess_engine.close_engine()
+    
+    results = asyncio.run(run())
+    
+    assert results[0]["depth"] == 2
+
+
+def test_adaptive_analysis_stops_once_stable(monkeypatch):
+    """A search whose best move and score stop changing ends before its depth limit."""
+    monkeypatch.setenv("FAKE_UCI_DEPTH", "20")
+    monkeypatch.setattr(chess_engine.settings, "ADAPTIVE_STABLE_DEPTHS", 3)
+    monkeypatch.setattr(chess_engine.settings, "ADAPTIVE_MIN_DEPTH", 5)
+    
+    async def run(enabled):
+        monkeypatch.setattr(chess_engine.settings, "ADAPTIVE_ANALYSIS_ENABLED", enabled)
+        pool = make_pool(size=1)
+        try:
+            async with pool.engine() as engine:
+                return await chess_engine.run_adaptive_analysis(
+                    engine,
+                    chess.Board(FEN),
+                    chess.engine.Limit(depth=20),
+                    multipv=2
+                )
+        finally:
+            await pool.close()
+    
+    before = chess_engine.get_adaptive_stats()
+    results, settled = asyncio.run(run(True))
+    after = chess_engine.get_adaptive_stats()
+    full, full_settled = asyncio.run(run(False))
+    
+    assert settled and not full_settled
+    assert [line["depth"] for line in results] == [5, 5]
+    assert [line["depth"] for line in full] == [20, 20]
+    assert results[0]["pv"] == full[0]["pv"]
+    assert after["stopped_early"] - before["stopped_early"] == 1
+    assert after["depths_saved"] - before["depths_saved"] == 15
+
+
+def test_adaptive_analysis_counts_each_depth_once(monkeypatch):
+    """Bound lines and repeated reports of a depth do not make a search settle sooner."""
+    monkeypatch.setenv("FAKE_UCI_DEPTH", "20")
+    monkeypatch.setenv("FAKE_UCI_BOUNDS", "1")
+    monkeypatch.setattr(chess_engine.settings, "ADAPTIVE_ANALYSIS_ENABLED", True)
+    monkeypatch.setattr(chess_engine.settings, "ADAPTIVE_STABLE_DEPTHS", 3)
+    monkeypatch.setattr(chess_engine.settings, "ADAPTIVE_MIN_DEPTH", 1)
+    
+    async def run():
+        pool = make_pool(size=1)
+        try:
+            async with pool.engine() as engine:
+                return await chess_engine.run_adaptive_analysis(
+                    engine,
+                    chess.Board(FEN),
+                    chess.engine.Limit(depth=20),
+                    multipv=2
+                )
+        finally:
+            await pool.close()
+    
+    results, settled = asyncio.run(run())
+    
+    assert settled
+    assert [line["depth"] for line in results] == [3, 3]
+    assert [line["score"] for line in results] == [40, 30]
+
+
+def test_settled_analysis_is_cached_for_the_requested_depth(monkeypatch):
+    """A repeated request is served from the cache after an early stop; a deeper one searches again."""
+    monkeypatch.setenv("FAKE_UCI_DEPTH", "30")
+    monkeypatch.setattr(chess_engine.settings, "ADAPTIVE_ANALYSIS_ENABLED", True)
+    monkeypatch.setattr(chess_engine.settings, "ADAPTIVE_STABLE_DEPTHS", 3)
+    monkeypatch.setattr(chess_engine.settings, "ADAPTIVE_MIN_DEPTH", 5)
+    
+    async def run():
+        monkeypatch.setattr(chess_engine, "_engine_pool", make_pool(size=1))
+        monkeypatch.setattr(chess_engine, "_analysis_cache", AnalysisCache(maxsize=10))
+        try:
+            searches = []
+            
+            for depth in (20, 20, 20, 25):
+                results = await chess_engine.analyze_position(FEN, depth=depth, multipv=1, time_limit=5.0)
+                searches.append(chess_engine.get_adaptive_stats()["searches"])
+            
+            return results, searches
+        finally:
+            await chess_engine.close_engine()
+    
+    results, searches = asyncio.run(run())
+    
+    assert searches[0] == searches[1] == searches[2]
+    assert searches[3] == searches[2] + 1
+    assert results[0]["depth"] == 5
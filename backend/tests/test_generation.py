@@ -0,0 +1,116 @@
+import asyncio
+import pytest
+import sys
+import os
+import chess
+
+# Add the parent directory to the path so we can import the src package
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.puzzles import generation
+
+FEN = "6k1/5ppp/8/8/8/8/5PPP/R5K1 w - - 0 1"
+
+PGN = """[Event "First"]
+
+1. e4 e5 2. Nf3 Nc6 3. Bb5 a6 *
+
+[Event "Second"]
+
+1. d4 d5 2. c4 *
+"""
+
+
+def test_fen_files_skip_comments_and_blank_lines(tmp_path):
+    """FEN files yield one position per line, ignoring blank lines and comments."""
+    path = tmp_path / "positions.fen"
+    path.write_text(f"# candidates\n\n{FEN}\n   \n  {chess.STARTING_FEN}  \n# end\n")
+    
+    assert list(generation.iter_positions(path)) == [FEN, chess.STARTING_FEN]
+
+
+def test_pgn_files_yield_positions_from_min_ply(tmp_path):
+    """PGN files yield every mainline position from min_ply on, game by game."""
+    path = tmp_path / "games.PGN"
+    path.write_text(PGN)
+    
+    positions = list(generation.iter_positions(path, min_ply=5))
+    
+    first = chess.Board()
+    
+    for san in ["e4", "e5", "Nf3", "Nc6", "Bb5", "a6"]:
+        first.push_san(san)
+    
+    second = chess.Board()
+    
+    for san in ["d4", "d5", "c4"]:
+        second.push_san(san)
+    
+    assert len(positions) == 2
+    assert positions[1] == first.fen()
+    assert chess.Board(positions[0]).fullmove_number == 3
+    assert list(generation.iter_positions(path, min_ply=3))[-1] == second.fen()
+    assert len(list(generation.iter_positions(path, min_ply=1))) == 9
+
+
+@pytest.fixture
+def pipeline(monkeypatch):
+    """Accept every position and record the batches inserted, failing those marked to fail."""
+    calls = {"batches": [], "fail": set()}
+    
+    async def fake_generate_puzzle(fen):
+        return {"fen": fen, "solution_moves": "a1a8", "difficulty": 1500, "themes": ["mateIn1"]}
+    
+    async def fake_create_puzzles(puzzles):
+        calls["batches"].append(len(puzzles))
+        
+        if len(calls["batches"]) in calls["fail"]:
+            raise Exception("insert failed")
+        
+        return puzzles
+    
+    monkeypatch.setattr(generation, "generate_puzzle", fake_generate_puzzle)
+    monkeypatch.setattr(generation, "create_puzzles", fake_create_puzzles)
+    return calls
+
+
+def test_accepted_puzzles_are_flushed_in_batches(pipeline):
+    """Full batches are inserted as they fill and the remainder at the end."""
+    stats = asyncio.run(generation.generate_puzzles_from_positions(
+        [FEN] * 7,
+        concurrency=2,
+        batch_size=3,
+        prefilter=False
+    ))
+    
+    assert sorted(pipeline["batches"], reverse=True) == [3, 3, 1]
+    assert (stats.positions, stats.accepted, stats.inserted) == (7, 7, 7)
+
+
+def test_failed_batches_are_not_counted_as_inserted(pipeline):
+    """A failed insert loses only its batch; the run goes on and counts what was written."""
+    pipeline["fail"].add(1)
+    
+    stats = asyncio.run(generation.generate_puzzles_from_positions(
+        [FEN] * 5,
+        concurrency=1,
+        batch_size=2,
+        prefilter=False
+    ))
+    
+    assert pipeline["batches"] == [2, 2, 1]
+    assert (stats.positions, stats.accepted, stats.inserted) == (5, 5, 3)
+
+
+def test_dry_run_writes_nothing(pipeline):
+    """A dry run generates puzzles without inserting them."""
+    stats = asyncio.run(generation.generate_puzzles_from_positions(
+        [FEN] * 3,
+        concurrency=2,
+        batch_size=2,
+        dry_run=True,
+        prefilter=False
+    ))
+    
+    assert pipeline["batches"] == []
+    assert (stats.accepted, stats.inserted) == (3, 0)
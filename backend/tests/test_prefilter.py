@@ -0,0 +1,72 @@
+import asyncio
+import pytest
+import sys
+import os
+import chess
+
+# Add the parent directory to the path so we can import the src package
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.puzzles import generation
+from src.puzzles.prefilter import capture_sequence_gain, prefilter_position, see
+
+START = chess.STARTING_FEN
+
+# White mates on the back rank with Ra8
+BACK_RANK = "6k1/5ppp/8/8/8/8/5PPP/R5K1 w - - 0 1"
+
+# The black knight on d5 is undefended
+HANGING_KNIGHT = "4k3/8/8/3n4/8/8/8/3RK3 w - - 0 1"
+
+# The d5 pawn is defended; Rxd5 loses the rook and Rd8+ loses it to the king
+DEFENDED_PAWN = "4k3/8/4p3/3p4/8/8/8/3RK3 w - - 0 1"
+
+# Nc7+ forks the king and the undefended rook
+KNIGHT_FORK = "r3k3/8/8/1N6/8/8/8/4K3 w - - 0 1"
+
+
+def test_see_scores_exchanges():
+    """Static exchange evaluation counts recaptures by the least valuable attacker."""
+    board = chess.Board(DEFENDED_PAWN)
+    
+    assert see(board, chess.Move.from_uci("d1d5")) == 100 - 500
+    assert see(chess.Board(HANGING_KNIGHT), chess.Move.from_uci("d1d5")) == 300
+    assert board.fen() == DEFENDED_PAWN
+
+
+def test_capture_sequence_gain_skips_losing_captures():
+    """The capture search wins hanging material and declines losing exchanges."""
+    assert capture_sequence_gain(chess.Board(HANGING_KNIGHT), 4) == 300
+    assert capture_sequence_gain(chess.Board(DEFENDED_PAWN), 4) == 0
+
+
+@pytest.mark.parametrize("fen, expected", [
+    (START, (False, "no_forcing_moves")),
+    (BACK_RANK, (True, "mate_in_one")),
+    (HANGING_KNIGHT, (True, "hanging_piece")),
+    (DEFENDED_PAWN, (False, "quiet")),
+    (KNIGHT_FORK, (True, "forking_check")),
+])
+def test_prefilter_position(fen, expected):
+    """Tactical positions pass and quiet ones are rejected, with the reason."""
+    assert prefilter_position(chess.Board(fen), min_gain=200, capture_depth=4) == expected
+
+
+def test_generation_skips_prefiltered_positions(monkeypatch):
+    """Rejected positions are counted and never reach the engine."""
+    analysed = []
+    
+    async def fake_generate_puzzle(fen):
+        analysed.append(fen)
+        return None
+    
+    monkeypatch.setattr(generation, "generate_puzzle", fake_generate_puzzle)
+    
+    positions = [START, BACK_RANK, DEFENDED_PAWN, "not a fen", KNIGHT_FORK]
+    stats = asyncio.run(generation.generate_puzzles_from_positions(positions, concurrency=2, dry_run=True, prefilter=True))
+    
+    assert sorted(analysed) == sorted([BACK_RANK, KNIGHT_FORK])
+    assert stats.positions == 5
+    assert stats.prefiltered == 3
+    assert stats.rejection_rate == 0.6
+    assert stats.prefilter_reasons["invalid_position"] == 1
@@ -0,0 +1,155 @@
+import asyncio
+import pytest
+import sys
+import os
+
+# Add the parent directory to the path so we can import the src package
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.puzzles import catalog as puzzle_catalog
+from src.puzzles.catalog import PuzzleCatalog
+from src.puzzles.snapshot import PuzzleSnapshot, SnapshotError, write_snapshot
+
+
+@pytest.fixture
+def catalog():
+    return PuzzleCatalog.from_rows([
+        (1, 1200, ["fork"]),
+        (2, 1500, ["pin"]),
+        (3, 1500, ["fork", "pin"]),
+        (4, None, ["fork"]),
+        (5, 1800, ["mate", "fork"])
+    ])
+
+
+def test_query_filters_and_pages(catalog):
+    """Filters combine difficulty bounds and required themes; pages follow (difficulty, id)."""
+    assert catalog.query() == ([1, 2, 3, 5, 4], 5)
+    assert catalog.query(themes=["fork"], offset=1, limit=2) == ([3, 5], 4)
+    assert catalog.query(min_difficulty=1300, themes=["fork", "pin"]) == ([3], 1)
+    assert catalog.query(max_difficulty=1600) == ([1, 2, 3], 3)
+    assert catalog.query(themes=["unknown"]) == ([], 0)
+
+
+def test_writes_are_reflected(catalog):
+    """Upserts and removals apply in place, including appends past the initial capacity."""
+    catalog.upsert(2, 1000, ["mate"])
+    catalog.remove(1)
+    
+    for puzzle_id in range(10, 30):
+        catalog.upsert(puzzle_id, 2000)
+    
+    assert len(catalog) == 24
+    assert catalog.query(themes=["mate"]) == ([2, 5], 2)
+    assert catalog.query(min_difficulty=1900, limit=3) == ([10, 11, 12], 20)
+
+
+def test_snapshot_round_trip(tmp_path):
+    """A mapped snapshot answers the same queries and copies its columns only on write."""
+    path = tmp_path / "puzzles.snap"
+    rows = [
+        {"id": 3, "difficulty": 1500, "themes": ["fork", "pin"], "fen": "8/8/8/8/8/8/8/K6k w - - 0 1", "solution_moves": "a1a2"},
+        {"id": 1, "difficulty": 1200, "themes": ["fork"], "fen": "k7/8/8/8/8/8/8/K7 w - - 0 1", "solution_moves": ""},
+        {"id": 2, "difficulty": None, "themes": None, "fen": "8/8/8/8/8/8/8/k6K b - - 0 1", "solution_moves": "a1b1 h1g1"}
+    ]
+    
+    assert write_snapshot(path, rows) == 3
+    
+    snapshot = PuzzleSnapshot(path)
+    catalog = PuzzleCatalog.from_snapshot(snapshot)
+    
+    assert snapshot.fen(3) == rows[0]["fen"]
+    assert snapshot.solution_moves(2) == "a1b1 h1g1"
+    assert snapshot.fen(4) is None
+    assert catalog.query() == ([1, 3, 2], 3)
+    assert catalog.query(themes=["pin"]) == ([3], 1)
+    
+    catalog.upsert(1, 1600)
+    
+    assert catalog.query(min_difficulty=0) == ([3, 1], 2)
+    assert snapshot.difficulties[0] == 1200
+
+
+def test_invalid_snapshot_is_rejected(tmp_path):
+    """Files that are not snapshots raise SnapshotError."""
+    path = tmp_path / "puzzles.snap"
+    path.write_bytes(b"not a snapshot")
+    
+    with pytest.raises(SnapshotError):
+        PuzzleSnapshot(path)
+
+
+def test_stale_catalog_is_served_while_reloading(monkeypatch):
+    """A stale catalog is returned at once and writes made during the reload are kept."""
+    release = None
+    
+    async def load_rows():
+        await release.wait()
+        return [(1, 1200, ["fork"]), (2, 1500, ["pin"])]
+    
+    async def run():
+        nonlocal release
+        release = asyncio.Event()
+        stale = PuzzleCatalog.from_rows([(1, 1200, ["fork"])])
+        monkeypatch.setattr(puzzle_catalog, "_catalog", stale)
+        monkeypatch.setattr(puzzle_catalog, "_loaded_at", 0.0)
+        monkeypatch.setattr(puzzle_catalog, "_refresh_task", None)
+        monkeypatch.setattr(puzzle_catalog, "load_puzzle_rows", load_rows)
+        monkeypatch.setattr(puzzle_catalog.settings, "PUZZLE_CATALOG_ENABLED", True)
+        monkeypatch.setattr(puzzle_catalog.settings, "PUZZLE_SNAPSHOT_PATH", "")
+        monkeypatch.setattr(puzzle_catalog.settings, "PUZZLE_CATALOG_REFRESH_SECONDS", 1)
+        
+        served = await puzzle_catalog.get_puzzle_catalog()
+        
+        # Let the reload start before writing
+        while puzzle_catalog._pending_writes is None:
+            await asyncio.sleep(0)
+        
+        puzzle_catalog.catalog_puzzle(3, 1800, ["mate"])
+        puzzle_catalog.uncatalog_puzzle(1)
+        release.set()
+        await puzzle_catalog._refresh_task
+        
+        return stale, served, await puzzle_catalog.get_puzzle_catalog()
+    
+    stale, served, fresh = asyncio.run(run())
+    
+    assert served is stale
+    assert fresh is not stale
+    assert fresh.query() == ([2, 3], 2)
+
+
+def test_unchanged_snapshot_is_not_remapped(tmp_path, monkeypatch):
+    """Refreshing keeps this worker's writes until the snapshot file is rebuilt."""
+    path = tmp_path / "puzzles.snap"
+    row = {"id": 1, "difficulty": 1200, "themes": ["fork"], "fen": "k7/8/8/8/8/8/8/K7 w - - 0 1", "solution_moves": ""}
+    write_snapshot(path, [row])
+    
+    async def refresh():
+        monkeypatch.setattr(puzzle_catalog, "_loaded_at", 0.0)
+        await puzzle_catalog.get_puzzle_catalog()
+        await puzzle_catalog._refresh_task
+        return await puzzle_catalog.get_puzzle_catalog()
+    
+    async def run():
+        monkeypatch.setattr(puzzle_catalog, "_catalog", None)
+        monkeypatch.setattr(puzzle_catalog, "_snapshot_stamp", None)
+        monkeypatch.setattr(puzzle_catalog, "_refresh_task", None)
+        monkeypatch.setattr(puzzle_catalog.settings, "PUZZLE_CATALOG_ENABLED", True)
+        monkeypatch.setattr(puzzle_catalog.settings, "PUZZLE_SNAPSHOT_PATH", str(path))
+        monkeypatch.setattr(puzzle_catalog.settings, "PUZZLE_CATALOG_REFRESH_SECONDS", 1)
+        
+        await puzzle_catalog.get_puzzle_catalog()
+        puzzle_catalog.catalog_puzzle(2, 1500, ["pin"])
+        puzzle_catalog.uncatalog_puzzle(1)
+        kept = (await refresh()).query()
+        
+        write_snapshot(path, [row, {**row, "id": 3}])
+        rebuilt = (await refresh()).query()
+        
+        return kept, rebuilt
+    
+    kept, rebuilt = asyncio.run(run())
+    
+    assert kept == ([2], 1)
+    assert rebuilt == ([1, 3], 2)
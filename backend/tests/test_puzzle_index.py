@@ -0,0 +1,139 @@
+import asyncio
+import pytest
+import sys
+import os
+
+# Add the parent directory to the path so we can import the src package
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.puzzles import index as puzzle_index
+from src.puzzles.index import PuzzleIndex
+from src.puzzles import recommendation
+from src.puzzles.recommendation import SeenSet, UserProfile, select_new_puzzles
+
+
+@pytest.fixture
+def index():
+    return PuzzleIndex([
+        (1, 1200, ["fork"]),
+        (2, 1500, ["pin"]),
+        (3, 1550, ["fork", "pin"]),
+        (4, 1800, ["mate"]),
+        (5, None, ["fork"]),
+        (6, 1450, ["fork"])
+    ])
+
+
+def test_range_and_nearest(index):
+    """Range lookups are ordered by difficulty and nearest walks outwards from the target."""
+    assert len(index) == 5
+    assert index.range(1400, 1600) == [6, 2, 3]
+    assert index.nearest(1500, 3) == [2, 6, 3]
+    assert index.nearest(1500, 2, theme_mask=index.themes.lookup(["fork"])) == [6, 3]
+
+
+def test_add_update_remove(index):
+    """Writes keep the arrays sorted and replace earlier entries for the same puzzle."""
+    index.add(7, 1500, ["mate"])
+    index.add(4, 1000)
+    index.remove(2)
+    index.add(6, None)
+    
+    assert index.range() == [4, 1, 7, 3]
+    assert index.difficulty(4) == 1000
+    assert 6 not in index
+
+
+def test_new_puzzles_skip_seen_and_follow_rating(index):
+    """Unseen puzzles closest to the user's rating are chosen, and wins raise the rating."""
+    profile = UserProfile(1500.0)
+    profile.record(2, 1500, True)
+    
+    assert profile.rating == pytest.approx(1516.0)
+    assert 2 in profile.seen and 3 not in profile.seen
+    assert select_new_puzzles(index, profile, 2, exclude={3}) == [6, 4]
+    assert select_new_puzzles(index, profile, 2, themes=["unknown"]) == []
+
+
+def test_stale_index_is_served_while_reloading(monkeypatch):
+    """A stale index is returned at once and writes made during the reload are kept."""
+    release = None
+    
+    async def load_rows():
+        await release.wait()
+        return [(1, 1200, ["fork"]), (2, 1500, ["pin"])]
+    
+    async def run():
+        nonlocal release
+        release = asyncio.Event()
+        stale = PuzzleIndex([(1, 1200, ["fork"])])
+        monkeypatch.setattr(puzzle_index, "_puzzle_index", stale)
+        monkeypatch.setattr(puzzle_index, "_loaded_at", 0.0)
+        monkeypatch.setattr(puzzle_index, "_refresh_task", None)
+        monkeypatch.setattr(puzzle_index, "load_puzzle_rows", load_rows)
+        monkeypatch.setattr(puzzle_index.settings, "PUZZLE_INDEX_REFRESH_SECONDS", 1)
+        
+        served = await puzzle_index.get_puzzle_index()
+        
+        # Let the reload start before writing
+        while puzzle_index._pending_writes is None:
+            await asyncio.sleep(0)
+        
+        puzzle_index.index_puzzle(3, 1800, ["mate"])
+        puzzle_index.unindex_puzzle(1)
+        release.set()
+        await puzzle_index._refresh_task
+        
+        return stale, served, await puzzle_index.get_puzzle_index()
+    
+    stale, served, fresh = asyncio.run(run())
+    
+    assert served is stale
+    assert fresh is not stale
+    assert fresh.range() == [2, 3]
+
+
+def test_seen_set_stays_small_for_large_ids():
+    """Seen puzzles cost a fixed amount each, whatever their IDs."""
+    seen = SeenSet()
+    
+    for puzzle_id in (5_000_000_000, 7, 5_000_000_000, 123_456_789):
+        seen.add(puzzle_id)
+    
+    assert len(seen) == 3
+    assert 7 in seen and 123_456_789 in seen and 5_000_000_000 in seen
+    assert 8 not in seen and 10_000_000_000 not in seen
+    assert seen._ids.itemsize * len(seen._ids) == 24
+
+
+def test_attempts_during_profile_load_are_applied(monkeypatch, index):
+    """An attempt recorded while the profile is loading is part of the loaded profile."""
+    async def run():
+        release = asyncio.Event()
+        
+        async def load_rows(user_id):
+            await release.wait()
+            return [(2, True)]
+        
+        async def get_index():
+            return index
+        
+        monkeypatch.setattr(recommendation, "_load_progress_rows", load_rows)
+        monkeypatch.setattr(recommendation, "get_puzzle_index", get_index)
+        monkeypatch.setattr(recommendation, "loaded_puzzle_index", lambda: index)
+        recommendation._profiles.clear()
+        
+        loading = asyncio.ensure_future(recommendation.get_user_profile("user"))
+        
+        while "user" not in recommendation._pending_attempts:
+            await asyncio.sleep(0)
+        
+        recommendation.record_attempt("user", 3, True)
+        release.set()
+        return await loading
+    
+    profile = asyncio.run(run())
+    
+    assert 2 in profile.seen and 3 in profile.seen
+    assert profile.rating > 1516.0
+
@@ -0,0 +1,92 @@
+import asyncio
+import pytest
+import sys
+import os
+import chess
+
+# Add the parent directory to the path so we can import the src package
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.puzzles.solution import check_solution, solution_line_tree
+from src.puzzles.solution_tree import build_solution_tree
+from src.utils.engine_pool import EnginePool
+
+FAKE_ENGINE = [sys.executable, os.path.join(os.path.dirname(os.path.abspath(__file__)), "fake_uci_engine.py")]
+
+# White mates with Ra8 or Re8; the stored line only has Ra8
+BACK_RANK = "6k1/5ppp/8/8/8/8/5PPP/R3R1K1 w - - 0 1"
+
+# White wins the rook with a knight fork
+FORK = "r3k3/8/8/1q6/8/2N5/8/4K3 w - - 0 1"
+FORK_SOLUTION = "c3d5 b5d7 d5c7 e8e7 c7a8"
+
+
+def test_stored_line_with_replies():
+    """Moves matching the stored line are answered with the stored replies until solved."""
+    first = check_solution(FORK, FORK_SOLUTION, ["c3d5"])
+    
+    assert first.correct and not first.complete
+    assert first.reply == "b5d7"
+    
+    solved = check_solution(FORK, FORK_SOLUTION, ["Nd5", "Nc7+", "Nxa8"])
+    
+    assert solved.correct and solved.complete
+    assert solved.reply is None
+
+
+def test_alternative_mate_is_accepted():
+    """Any mating move is correct, even if the stored solution differs."""
+    assert check_solution(BACK_RANK, "a1a8", ["e1e8"]).complete
+    assert check_solution(BACK_RANK, "a1a8", ["Ra8#"]).complete
+
+
+def test_wrong_illegal_and_extra_moves_fail():
+    """The first wrong, illegal or superfluous move is reported."""
+    wrong = check_solution(FORK, FORK_SOLUTION, ["c3d5", "d5c3"])
+    
+    assert not wrong.correct
+    assert wrong.failed_move == 1
+    assert wrong.fen == "r3k3/3q4/8/3N4/8/8/8/4K3 w - - 2 2"
+    
+    assert check_solution(FORK, FORK_SOLUTION, ["e1e5"]).failed_move == 0
+    assert check_solution(BACK_RANK, "a1a8", ["a1a8", "a8b8"]).failed_move == 1
+
+
+def test_invalid_solution_raises():
+    """A stored reply that is illegal is a data error."""
+    with pytest.raises(ValueError):
+        check_solution(FORK, "c3d5 a1a2", ["c3d5"])
+
+
+def test_precomputed_tree_accepts_alternatives():
+    """Moves in the solution tree are accepted with the tree's replies."""
+    tree = {
+        "c3d5": {"reply": "b5d7", "then": {"d5c7": {"reply": "e8e7", "then": {"c7a8": {"reply": None, "then": {}}}}}},
+        "c3b5": {"reply": None, "then": {}}
+    }
+    
+    assert solution_line_tree(FORK_SOLUTION) == {"c3d5": tree["c3d5"]}
+    assert check_solution(FORK, FORK_SOLUTION, ["Nxb5"], tree).complete
+    assert check_solution(FORK, FORK_SOLUTION, ["Nd5", "Nc7+"], tree).reply == "e8e7"
+    assert not check_solution(FORK, FORK_SOLUTION, ["Nb1"], tree).correct
+
+
+def test_tree_builder_adds_engine_alternatives():
+    """Engine lines within the margin become alternatives; the stored line is kept."""
+    async def run():
+        pool = EnginePool(FAKE_ENGINE, size=1, max_queue=1, acquire_timeout=5.0)
+        try:
+            async with pool.engine() as engine:
+                solution = [chess.Move.from_uci(move) for move in FORK_SOLUTION.split()]
+                return await build_solution_tree(engine, chess.Board(FORK), solution, depth=2)
+        finally:
+            await pool.close()
+    
+    tree = asyncio.run(run())
+    last = tree["c3d5"]["then"]["d5c7"]["then"]
+    
+    # The fake engine gives no replies, so alternatives only appear at the last solver move
+    assert list(tree) == ["c3d5"]
+    assert list(last)[0] == "c7a8"
+    assert len(last) == 3
+    assert check_solution(FORK, FORK_SOLUTION, ["Nd5", "Nc7+", list(last)[1]], tree).complete
@@ -0,0 +1,146 @@
+import asyncio
+import pytest
+import sys
+import os
+
+# Add the parent directory to the path so we can import the src package
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.puzzles import service
+from src.puzzles.schemas import PuzzleFilter
+
+
+def make_row(puzzle_id, difficulty):
+    return {
+        "id": puzzle_id,
+        "fen": "6k1/5ppp/8/8/8/8/5PPP/R5K1 w - - 0 1",
+        "solution_moves": "a1a8",
+        "difficulty": difficulty,
+        "themes": ["mateIn1"],
+        "created_at": "2024-01-01T00:00:00",
+    }
+
+
+@pytest.fixture
+def queries(monkeypatch):
+    """Record execute_query calls and answer them from a fixed table."""
+    calls = []
+    rows = [make_row(1, 1200), make_row(2, 1200), make_row(3, 1500)]
+    
+    async def fake_execute_query(table, query_fn, **kwargs):
+        calls.append(kwargs)
+        data = rows[:kwargs.get("limit", len(rows))]
+        return (data, len(rows)) if kwargs.get("return_count") else data
+    
+    monkeypatch.setattr(service, "execute_query", fake_execute_query)
+    service._count_cache.clear()
+    service._puzzle_cache.clear()
+    return calls
+
+
+def test_cursor_round_trip():
+    """Cursors are opaque but decode back to the keyset position."""
+    cursor = service.encode_puzzle_cursor(1200, 42)
+    
+    assert service.decode_puzzle_cursor(cursor) == (1200, 42)
+    assert service.decode_puzzle_cursor(service.encode_puzzle_cursor(None, 7)) == (None, 7)
+    
+    with pytest.raises(ValueError):
+        service.decode_puzzle_cursor("not-a-cursor")
+
+
+def test_cursor_pagination_uses_keyset_filter(queries):
+    """A cursor page filters on (difficulty, id) instead of using an offset."""
+    cursor = service.encode_puzzle_cursor(1200, 1)
+    
+    puzzles, total, next_cursor = asyncio.run(service.get_puzzles_by_cursor(
+        cursor=cursor,
+        size=2,
+        filters=PuzzleFilter(min_difficulty=1000)
+    ))
+    
+    page_query = queries[0]
+    assert "offset" not in page_query
+    assert page_query["or_filter"] == "difficulty.gt.1200,and(difficulty.eq.1200,id.gt.1),difficulty.is.null"
+    assert page_query["filters"] == [("difficulty", "gte", 1000)]
+    assert page_query["limit"] == 3
+    assert [puzzle.id for puzzle in puzzles] == [1, 2]
+    assert total == 3
+    assert service.decode_puzzle_cursor(next_cursor) == (1200, 2)
+
+
+def test_list_fetches_total_with_page(queries):
+    """A page and its total cost one request, and the total is then reused."""
+    puzzles, total = asyncio.run(service.get_puzzles(page=1, size=2))
+    
+    assert len(queries) == 1
+    assert queries[0]["return_count"] is True
+    assert total == 3
+    assert len(puzzles) == 2
+    
+    asyncio.run(service.get_puzzles(page=2, size=2))
+    
+    assert len(queries) == 2
+    assert "return_count" not in queries[1]
+
+
+def test_get_puzzle_by_id_is_cached_until_written(queries):
+    """Warm puzzles are served without a query; deletes invalidate them."""
+    first = asyncio.run(service.get_puzzle_by_id(1))
+    second = asyncio.run(service.get_puzzle_by_id(1))
+    
+    assert first == second
+    assert len(queries) == 1
+    
+    asyncio.run(service.delete_puzzle(1))
+    asyncio.run(service.get_puzzle_by_id(1))
+    
+    assert len(queries) == 3
+
+
+def test_concurrent_lookups_are_batched(queries):
+    """Lookups made together resolve with one `in` query, in request order."""
+    async def run():
+        return await asyncio.gather(
+            service.get_puzzles_by_ids([3, 1, 99, 3]),
+            service.get_puzzle_by_id(2)
+        )
+    
+    batch, single = asyncio.run(run())
+    
+    assert len(queries) == 1
+    assert queries[0]["filters"][0][:2] == ("id", "in")
+    assert [puzzle.id for puzzle in batch] == [3, 1]
+    assert single.id == 2
+
+
+def test_write_during_fetch_is_not_overwritten(monkeypatch):
+    """A batch fetch that started before a delete does not cache its older row."""
+    release = None
+    
+    async def fake_execute_query(table, query_fn, **kwargs):
+        if kwargs.get("filters", [("", "")])[0][1] == "in":
+            await release.wait()
+        
+        return [make_row(1, 1200)]
+    
+    async def run():
+        nonlocal release
+        release = asyncio.Event()
+        lookup = asyncio.ensure_future(service.get_puzzle_by_id(1))
+        
+        # Let the fetch be sent before deleting
+        while not service._fetch_writes:
+            await asyncio.sleep(0.01)
+        
+        await service.delete_puzzle(1)
+        release.set()
+        return await lookup
+    
+    monkeypatch.setattr(service, "execute_query", fake_execute_query)
+    service._puzzle_cache.clear()
+    
+    fetched = asyncio.run(run())
+    
+    assert fetched.id == 1
+    assert service._puzzle_cache.get(1) is None
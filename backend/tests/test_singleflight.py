@@ -0,0 +1,52 @@
+import asyncio
+import sys
+import os
+
+# Add the parent directory to the path so we can import the src package
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.utils.singleflight import SingleFlight
+
+
+def test_concurrent_calls_share_one_execution():
+    """Callers for the same key await one call; other keys run separately."""
+    flight = SingleFlight()
+    calls = []
+    
+    async def fetch(key):
+        calls.append(key)
+        await asyncio.sleep(0.01)
+        return key * 2
+    
+    async def run():
+        return await asyncio.gather(
+            *(flight.do(1, lambda: fetch(1)) for _ in range(10)),
+            flight.do(2, lambda: fetch(2))
+        )
+    
+    results = asyncio.run(run())
+    
+    assert results == [2] * 10 + [4]
+    assert sorted(calls) == [1, 2]
+    assert flight.stats() == {"started": 2, "shared": 9, "in_flight": 0}
+
+
+def test_failures_are_shared_and_forgotten():
+    """An exception reaches every waiter and the next call starts fresh."""
+    flight = SingleFlight()
+    
+    async def fail():
+        await asyncio.sleep(0.01)
+        raise RuntimeError("boom")
+    
+    async def run():
+        return await asyncio.gather(
+            flight.do("key", fail),
+            flight.do("key", fail),
+            return_exceptions=True
+        )
+    
+    results = asyncio.run(run())
+    
+    assert all(isinstance(result, RuntimeError) for result in results)
+    assert asyncio.run(flight.do("key", lambda: asyncio.sleep(0, result="ok"))) == "ok"
@@ -0,0 +1,87 @@
+import asyncio
+import pytest
+import sys
+import os
+from datetime import date
+
+# Add the parent directory to the path so we can import the src package
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.core.config import settings
+from src.user_progress import service
+from src.user_progress.schemas import UserProgressCreate
+
+USER_ID = "00000000-0000-0000-0000-000000000001"
+
+
+class RecordingDueQueue:
+    def __init__(self):
+        self.scheduled = []
+    
+    def schedule(self, user_id, puzzle_id, review_date):
+        self.scheduled.append((user_id, puzzle_id, review_date))
+
+
+@pytest.fixture
+def rpc(monkeypatch):
+    """Record execute_rpc calls, the due queue updates and the profile updates."""
+    calls = {"rpc": [], "attempts": [], "rows": []}
+    queue = RecordingDueQueue()
+    
+    async def fake_execute_rpc(function, params):
+        calls["rpc"].append((function, params))
+        return calls["rows"]
+    
+    monkeypatch.setattr(service, "execute_rpc", fake_execute_rpc)
+    monkeypatch.setattr(service, "get_due_queue", lambda: queue)
+    monkeypatch.setattr(service, "record_attempt", lambda *args: calls["attempts"].append(args))
+    calls["queue"] = queue
+    return calls
+
+
+def test_attempt_is_recorded_through_one_rpc(rpc):
+    """A submission is sent as one record_puzzle_attempt call and its returned row is applied."""
+    rpc["rows"].append({
+        "id": 7,
+        "user_id": USER_ID,
+        "puzzle_id": 42,
+        "solved": True,
+        "time_taken": 30,
+        "attempts": 2,
+        "next_review_date": "2026-10-23",
+        "ease_factor": 2.6,
+        "interval": 6,
+        "created_at": "2026-10-01T00:00:00",
+        "updated_at": "2026-10-17T00:00:00"
+    })
+    
+    entry = asyncio.run(service.create_or_update_user_progress(
+        USER_ID,
+        UserProgressCreate(puzzle_id=42, solved=True, time_taken=30, attempts=2)
+    ))
+    
+    assert rpc["rpc"] == [(service.RECORD_ATTEMPT_FUNCTION, {
+        "p_user_id": USER_ID,
+        "p_puzzle_id": 42,
+        "p_solved": True,
+        "p_time_taken": 30,
+        "p_attempts": 2,
+        "p_default_ease_factor": settings.DEFAULT_EASE_FACTOR,
+        "p_min_interval": settings.MIN_INTERVAL_DAYS,
+        "p_max_interval": settings.MAX_INTERVAL_DAYS
+    })]
+    assert (entry.id, entry.interval, entry.next_review_date) == (7, 6, date(2026, 10, 23))
+    assert rpc["queue"].scheduled == [(USER_ID, 42, date(2026, 10, 23))]
+    assert rpc["attempts"] == [(USER_ID, 42, True)]
+
+
+def test_empty_rpc_result_is_an_error(rpc):
+    """No returned row means the write failed, and no cache is updated."""
+    with pytest.raises(Exception, match="Failed to create or update user progress"):
+        asyncio.run(service.create_or_update_user_progress(
+            USER_ID,
+            UserProgressCreate(puzzle_id=42, solved=False)
+        ))
+    
+    assert rpc["queue"].scheduled == []
+    assert rpc["attempts"] == []